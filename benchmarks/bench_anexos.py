@@ -0,0 +1,160 @@
+# bench_anexos.py
+# Depósito de anexos (guardar_anexo / miniatura_anexo em gestao_rh_core): o mesmo contrato
+# anexado a muitos colaboradores ocupa o disco uma vez só, a cópia em blocos não carrega o
+# arquivo inteiro na memória, e a prévia da primeira página sai do cache de miniaturas em vez
+# de renderizar o PDF a cada seleção. Confere também a contagem de referências (exclusão de
+# colaboradores só libera arquivo sem uso), o limite de bytes do LRU das miniaturas e um
+# anexo guardado entre o backup completo e um incremental (restaurar_incremental).
+# Sai com código 1 se alguma conferência falhar.
+#
+#   python benchmarks/bench_anexos.py [colaboradores] [contratos]
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gestao_rh_core as rh
+import dados_sinteticos as ds
+
+GRANDE_MB = 64  # arquivo para medir a memória da cópia em blocos
+
+def gerar_contratos(pasta, quantidade, inicio=0):
+    from reportlab.pdfgen import canvas
+    caminhos = []
+    for i in range(inicio, inicio + quantidade):
+        path = os.path.join(pasta, f"contrato_{i}.pdf")
+        c = canvas.Canvas(path)
+        for pagina in range(5):
+            for linha in range(40):
+                c.drawString(60, 780 - linha * 18, f"Contrato modelo {i}, página {pagina + 1}, cláusula {linha + 1}")
+            c.showPage()
+        c.save()
+        caminhos.append(path)
+    return caminhos
+
+def ocupado(pasta):
+    return sum(os.path.getsize(os.path.join(r, f)) for r, _, fs in os.walk(pasta) for f in fs)
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    k = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    falhas = []
+    with tempfile.TemporaryDirectory() as tmp:
+        rh.configurar_diretorio(os.path.join(tmp, "dados"))
+        rh.inicializar_sistema()
+        rh.inserir_em_lote(ds.COLUNAS, ds.gerar_colaboradores(n))
+        contratos = gerar_contratos(tmp, k)
+
+        # cada colaborador recebe um dos k contratos, como no "Anexar PDF" do formulário
+        t0 = time.perf_counter()
+        valores = {}
+        for id_ in range(1, n + 1):
+            origem = contratos[id_ % k]
+            valor = rh.guardar_anexo(origem)
+            valores[id_] = valor
+        t_guardar = time.perf_counter() - t0
+        with rh.usar_conexao() as conn:
+            conn.executemany("UPDATE colaboradores SET anexo_pdf = ? WHERE id = ?", [(v, i) for i, v in valores.items()])
+        copias = sum(os.path.getsize(contratos[i % k]) for i in range(1, n + 1))
+        deposito = ocupado(rh.ANEXOS_DIR)
+        print(f"{n} colaboradores, {k} contratos distintos")
+        print(f"  guardar_anexo: {t_guardar / n * 1000:.2f} ms por anexo")
+        print(f"  disco: {copias / 1024:,.0f} KB em cópias por colaborador x {deposito / 1024:,.0f} KB no depósito")
+        arquivos = sum(len(fs) for _, _, fs in os.walk(rh.ANEXOS_DIR))
+        if len(set(valores.values())) != k or arquivos != k:
+            falhas.append("o depósito não deduplicou os contratos")
+
+        # cópia em blocos: o pico de memória não acompanha o tamanho do arquivo
+        grande = os.path.join(tmp, "grande.pdf")
+        with open(contratos[0], "rb") as f, open(grande, "wb") as g:
+            g.write(f.read())
+            bloco = os.urandom(1024 * 1024)
+            for _ in range(GRANDE_MB):
+                g.write(bloco)
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        rh.guardar_anexo(grande)
+        dt = time.perf_counter() - t0
+        pico = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  arquivo de {GRANDE_MB} MB: {GRANDE_MB / dt:,.0f} MB/s, pico de memória {pico / (1024 * 1024):.1f} MB")
+        if pico > 4 * rh.ANEXO_BLOCO:
+            falhas.append(f"cópia do anexo grande usou {pico / (1024 * 1024):.1f} MB")
+
+        # referências: excluir os colaboradores de um contrato só libera esse contrato
+        alvo = valores[k]  # contrato 0
+        ids = [i for i, v in valores.items() if v == alvo]
+        for id_ in ids[:-1]:
+            rh.excluir_colaborador_db(id_)
+        rh.limpar_anexos(carencia=0)
+        if not os.path.exists(rh.caminho_anexo(alvo)):
+            falhas.append("limpeza apagou um anexo ainda referenciado")
+        rh.excluir_colaborador_db(ids[-1])
+        ok, msg = rh.limpar_anexos()  # dentro da carência: fica
+        if not os.path.exists(rh.caminho_anexo(alvo)):
+            falhas.append("limpeza apagou um anexo dentro da carência")
+        ok, msg = rh.limpar_anexos(carencia=0)
+        print(f"  referências: {msg}")
+        restantes = set(valores.values()) - {alvo}
+        if os.path.exists(rh.caminho_anexo(alvo)) or not all(os.path.exists(rh.caminho_anexo(v)) for v in restantes):
+            falhas.append("limpeza não removeu exatamente o contrato sem referências")
+        ok, msg = rh.verificar_anexos()
+        print(f"  {msg}")
+        if not ok:
+            falhas.append(msg)
+
+        # prévia: renderização da primeira página x cache de miniaturas
+        valor = next(iter(restantes))
+        t0 = time.perf_counter()
+        png = rh.miniatura_anexo(valor)
+        t_render = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for _ in range(100):
+            rh.miniatura_anexo(valor, gerar=False)
+        t_cache = (time.perf_counter() - t0) / 100
+        motor = "pypdfium2" if rh._carregar_pdfium() is not None else "pypdf"
+        print(f"\nprévia ({motor}): primeira vez {t_render * 1000:.1f} ms, do cache {t_cache * 1000:.3f} ms")
+        if png is None and motor == "pypdfium2":
+            falhas.append("miniatura não gerada")
+
+        # LRU: com o limite baixo, o cache fica dentro dele descartando as menos usadas
+        if png is not None:
+            limite = rh.MINIATURAS_MAX_BYTES
+            rh.MINIATURAS_MAX_BYTES = os.path.getsize(png) * 3
+            for lado in range(60, 200, 10):
+                rh.miniatura_anexo(valor, tamanho=(lado, lado))
+            rh.miniatura_anexo(valor)  # a mais usada não sai
+            total = ocupado(rh.MINIATURAS_DIR)
+            print(f"  LRU: {len(os.listdir(rh.MINIATURAS_DIR))} miniaturas, {total:,} de {rh.MINIATURAS_MAX_BYTES:,} bytes")
+            if total > rh.MINIATURAS_MAX_BYTES or not os.path.exists(png):
+                falhas.append("cache de miniaturas passou do limite ou descartou a mais recente")
+            rh.MINIATURAS_MAX_BYTES = limite
+
+        # incremental: o anexo guardado depois da base volta com a linha e as contagens
+        base = os.path.join(tmp, "base.db")
+        rh.backup_db(base)
+        novo = rh.guardar_anexo(gerar_contratos(tmp, 1, inicio=k)[0])
+        rh.atualizar_campo_db(next(i for i, v in valores.items() if v != alvo), "anexo_pdf", novo)
+        delta = os.path.join(tmp, "inc.jsonl.gz")
+        rh.backup_incremental(delta)
+        q = "SELECT caminho, tamanho, referencias FROM anexos ORDER BY caminho"
+        with rh.usar_conexao() as conn:
+            esperado = conn.execute(q).fetchall()
+        ok, msg = rh.restaurar_incremental(base, [delta])
+        with rh.usar_conexao() as conn:
+            restaurado = conn.execute(q).fetchall()
+        rh.limpar_anexos(carencia=0)
+        ok_v, msg_v = rh.verificar_anexos()
+        print(f"\nincremental com anexo novo: {'confere' if restaurado == esperado else 'DIVERGE'}; {msg_v}")
+        if not ok or restaurado != esperado or not ok_v or not os.path.exists(rh.caminho_anexo(novo)):
+            falhas.append(f"restauração incremental perdeu o anexo guardado depois da base: {msg} / {msg_v}")
+        rh.fechar_conexao()
+    if falhas:
+        print("\nFALHA:\n  " + "\n  ".join(falhas))
+        sys.exit(1)
+    print("\nconferências ok")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# bench_backup.py
+# Backup completo x incremental: tempo e tamanho em função do número de linhas alteradas
+# (o incremental deve acompanhar as alterações, não o tamanho da tabela). No fim restaura
+# base + incrementais e confere que o banco volta exatamente ao estado atual; e, num delta à
+# parte, o CPF de um excluído reaproveitado e dois CNPJs trocados (índices únicos). Por fim
+# restaura um backup com outro tamanho de página, com uma conexão de leitura aberta.
+#
+#   python benchmarks/bench_backup.py [n_registros]
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gestao_rh_core as rh
+
+ALTERACOES = (10, 100, 1000, 10000)
+CPF = "123.456.789-09"
+
+def popular(n):
+    cols = ["nome", "cargo", "salario_bruto", "empresa", "cnpj", "cidade", "email"]
+    linhas = ((f"Colaborador {i}", "Analista", 2000.0 + i % 5000, f"Empresa {i % 40}", f"{i % 40:014d}",
+               "São Paulo", f"pessoa{i}@exemplo.com.br") for i in range(n))
+    rh.inserir_em_lote(cols, linhas)
+
+def alterar(rnd, k):
+    # ~80% alterações de salário, 10% exclusões, 10% inclusões
+    ids = [r[0] for r in rh.conectar().execute("SELECT id FROM colaboradores_base").fetchall()]
+    for id_ in rnd.sample(ids, k * 8 // 10):
+        rh.atualizar_campo_db(id_, "salario_bruto", round(rnd.uniform(1500, 9000), 2))
+    for id_ in rnd.sample(ids, k // 10):
+        rh.excluir_colaborador_db(id_)
+    rh.inserir_em_lote(["nome", "cargo", "empresa", "cnpj"],
+                       ((f"Novo {k}-{j}", "Auxiliar", "Empresa 1", f"{1:014d}") for j in range(k - k * 9 // 10)))
+
+def estado():
+    with rh.usar_conexao() as conn:
+        return conn.execute("SELECT * FROM colaboradores ORDER BY id").fetchall()
+
+def reuso_de_chaves(tmp):
+    # o delta só traz o estado final: reaplicar a inclusão antes da exclusão (ou uma empresa
+    # antes da outra) não pode esbarrar nos índices únicos de CPF e CNPJ
+    with rh.usar_conexao() as conn:
+        id_ = conn.execute("SELECT MIN(id) FROM colaboradores_base").fetchone()[0]
+        (e1, c1), (e2, c2) = conn.execute("SELECT id, cnpj FROM empresas ORDER BY id LIMIT 2").fetchall()
+    rh.atualizar_campo_db(id_, "cpf", CPF)
+    base = os.path.join(tmp, "base_chaves.db")
+    rh.backup_db(base)
+    rh.excluir_colaborador_db(id_)
+    rh.inserir_colaborador({"nome": "Readmitido", "cpf": CPF})
+    with rh.usar_conexao() as conn:
+        conn.execute("UPDATE empresas SET cnpj = 'troca' WHERE id = ?", (e1,))
+        conn.execute("UPDATE empresas SET cnpj = ? WHERE id = ?", (c1, e2))
+        conn.execute("UPDATE empresas SET cnpj = ? WHERE id = ?", (c2, e1))
+    delta = os.path.join(tmp, "inc_chaves.jsonl.gz")
+    rh.backup_incremental(delta)
+    esperado = estado()
+    try:
+        ok, msg = rh.restaurar_incremental(base, [delta])
+    except Exception as e:
+        ok, msg = False, f"{type(e).__name__}: {e}"
+    confere = ok and estado() == esperado
+    print(f"CPF reaproveitado e CNPJs trocados: estado {'confere' if confere else 'DIVERGE'}")
+    return confere, msg
+
+def pagina_diferente(tmp):
+    # o backup é reescrito no tamanho de página do banco em uso; o -wal/-shm não é apagado
+    # debaixo da conexão de leitura (busca/exportação) que está aberta
+    copia = os.path.join(tmp, "pagina_8k.db")
+    rh.backup_db(copia)
+    conn = sqlite3.connect(copia)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.execute("PRAGMA page_size=8192")
+    conn.execute("VACUUM")
+    conn.close()
+    esperado = estado()
+    rh.inserir_colaborador({"nome": "Depois do backup"})
+    leitor = rh._abrir_conexao(rh.DB_PATH)
+    try:
+        leitor.execute("SELECT COUNT(*) FROM colaboradores").fetchone()
+        ok, msg = rh.restaurar_db(copia)
+        confere = (ok and estado() == esperado and leitor.execute("PRAGMA quick_check").fetchone()[0] == "ok"
+                   and leitor.execute("SELECT COUNT(*) FROM colaboradores").fetchone()[0] == len(esperado))
+    finally:
+        leitor.close()
+    print(f"backup com páginas de 8 KB, leitor aberto: estado {'confere' if confere else 'DIVERGE'}")
+    return confere, msg
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    rnd = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        rh.configurar_diretorio(os.path.join(tmp, "dados"))
+        rh.inicializar_sistema()
+        popular(n)
+        base = os.path.join(tmp, "base.db.gz")
+        t0 = time.perf_counter()
+        rh.backup_db(base)
+        print(f"{n} registros")
+        print(f"{'backup':<22}{'tempo (ms)':>12}{'tamanho (KB)':>15}")
+        print(f"{'completo':<22}{(time.perf_counter() - t0) * 1000:>12.1f}{os.path.getsize(base) / 1024:>15,.1f}")
+        deltas = []
+        for k in ALTERACOES:
+            if k > n:
+                print(f"{f'incremental ({k} alt.)':<22}  pulado: mais alterações que registros")
+                continue
+            alterar(rnd, k)
+            destino = os.path.join(tmp, f"inc_{k}.jsonl.gz")
+            t0 = time.perf_counter()
+            ok, msg = rh.backup_incremental(destino)
+            dt = time.perf_counter() - t0
+            deltas.append(destino)
+            print(f"{f'incremental ({k} alt.)':<22}{dt * 1000:>12.1f}{os.path.getsize(destino) / 1024:>15,.1f}")
+        esperado = estado()
+        t0 = time.perf_counter()
+        ok, msg = rh.restaurar_incremental(base, deltas)
+        dt = time.perf_counter() - t0
+        confere = ok and estado() == esperado
+        print(f"\nrestaurar base + {len(deltas)} incrementais: {dt:.2f}s, estado {'confere' if confere else 'DIVERGE'}")
+        if confere:
+            confere, msg = reuso_de_chaves(tmp)
+        if confere:
+            confere, msg = pagina_diferente(tmp)
+        rh.fechar_conexao()
+    if not confere:
+        print(msg)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# bench_busca.py
+# Compara a busca antiga (nome/cargo LIKE '%x%') com o índice FTS5 em N linhas sintéticas.
+#
+#   python benchmarks/bench_busca.py [n_registros]
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gestao_rh_core as rh
+
+NOMES = ["João", "Maria", "José", "Ana", "Antônio", "Francisca", "Carlos", "Márcia", "Luís", "Conceição"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Ferreira", "Araújo", "Gonçalves", "Simões"]
+CARGOS = ["Analista", "Auxiliar Administrativo", "Gerente", "Vendedor", "Motorista", "Técnico"]
+CIDADES = ["São Paulo", "Belo Horizonte", "Goiânia", "Curitiba", "Recife", "Porto Alegre"]
+TERMOS = ["joao", "Simões", "gerente", "sao paulo", "Conceição Araújo"]
+
+def popular(n):
+    rnd = random.Random(42)
+    cols = ["nome", "cargo", "empresa", "cpf", "email", "cidade"]
+    def linhas():
+        for i in range(n):
+            nome = f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}"
+            yield (nome, rnd.choice(CARGOS), f"Empresa {i % 50}", f"{rnd.randrange(10**11):011d}",
+                   f"pessoa{i}@exemplo.com.br", rnd.choice(CIDADES))
+    rh.inserir_em_lote(cols, linhas(), batch_size=20000)
+
+def like_antigo(termo):
+    with rh.usar_conexao() as conn:
+        q = "SELECT * FROM colaboradores WHERE nome LIKE ? OR cargo LIKE ? ORDER BY id DESC"
+        return conn.execute(q, (f"%{termo}%", f"%{termo}%")).fetchall()
+
+def like_antigo_pagina(termo):
+    # o que a grade precisa: total + primeira página
+    with rh.usar_conexao() as conn:
+        cond = "nome LIKE ? OR cargo LIKE ?"
+        params = (f"%{termo}%", f"%{termo}%")
+        conn.execute(f"SELECT COUNT(*) FROM colaboradores WHERE {cond}", params).fetchone()
+        return conn.execute(f"SELECT * FROM colaboradores WHERE {cond} ORDER BY id DESC LIMIT 50", params).fetchall()
+
+def fts_pagina(termo):
+    return rh.PaginadorColaboradores(termo).linhas(0, 50)
+
+def cronometrar(fn, termo, repeticoes=3):
+    melhor = None
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        rows = fn(termo)
+        dt = time.perf_counter() - t0
+        melhor = dt if melhor is None else min(melhor, dt)
+    return melhor * 1000, len(rows)
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as tmp:
+        rh.DB_PATH = os.path.join(tmp, "bench.db")
+        rh.inicializar_sistema()
+        t0 = time.perf_counter()
+        popular(n)
+        print(f"{n} linhas geradas em {time.perf_counter() - t0:.1f}s (FTS5: {rh.BUSCA_FTS})")
+        for titulo, antigo, novo in (("listagem completa", like_antigo, rh.listar_colaboradores),
+                                     ("total + 1ª página da grade", like_antigo_pagina, fts_pagina)):
+            print(f"\n{titulo}")
+            print(f"{'termo':<20}{'LIKE (ms)':>12}{'linhas':>9}{'FTS (ms)':>12}{'linhas':>9}")
+            for termo in TERMOS:
+                t_like, n_like = cronometrar(antigo, termo)
+                t_fts, n_fts = cronometrar(novo, termo)
+                print(f"{termo:<20}{t_like:>12.1f}{n_like:>9}{t_fts:>12.1f}{n_fts:>9}")
+        rh.fechar_conexao()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# bench_conexao.py
+# Compara a latência por operação: conexão por chamada (comportamento antigo)
+# x conexão compartilhada em WAL (conectar()/usar_conexao()).
+#
+#   python benchmarks/bench_conexao.py [n_operacoes]
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gestao_rh_core as rh
+
+COLS = [c[0] for c in rh.BASE_COLUMNS if c[0] != "id"]
+
+def registro_exemplo(i):
+    d = {col: "" for col in COLS}
+    d.update(nome=f"Colaborador {i}", cargo="Analista", salario_bruto=3000.0 + i,
+             valor_passagem=150.0, valor_abono=0.0, empresa="Empresa Exemplo")
+    return d
+
+# -- comportamento antigo: abre, executa, commit, fecha
+def antigo_inserir(path, d):
+    conn = sqlite3.connect(path)
+    placeholders = ",".join("?" for _ in COLS)
+    cur = conn.execute(f"INSERT INTO colaboradores ({','.join(COLS)}) VALUES ({placeholders})",
+                       tuple(d.get(col, "") for col in COLS))
+    conn.commit()
+    conn.close()
+    return cur.lastrowid
+
+def antigo_atualizar(path, id_, d):
+    conn = sqlite3.connect(path)
+    set_clause = ",".join(f"{c}=?" for c in COLS)
+    conn.execute(f"UPDATE colaboradores SET {set_clause} WHERE id=?", tuple(d.get(col, "") for col in COLS) + (id_,))
+    conn.commit()
+    conn.close()
+
+def antigo_excluir(path, id_):
+    conn = sqlite3.connect(path)
+    conn.execute("DELETE FROM colaboradores WHERE id=?", (id_,))
+    conn.commit()
+    conn.close()
+
+def antigo_listar(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT * FROM colaboradores ORDER BY id DESC LIMIT 50").fetchall()
+    conn.close()
+    return rows
+
+def novo_listar():
+    with rh.usar_conexao() as conn:
+        return conn.execute("SELECT * FROM colaboradores ORDER BY id DESC LIMIT 50").fetchall()
+
+def cronometrar(fn, n):
+    t0 = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - t0) / n * 1e6  # µs por operação
+
+def preparar(path):
+    rh.fechar_conexao()
+    rh.DB_PATH = path
+    rh.inicializar_sistema()
+    rh.fechar_conexao()
+
+def medir_antigo(path, n):
+    # mesmo esquema, mas journal padrão (DELETE) e conexão por chamada
+    rh.fechar_conexao()
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.close()
+    ids = []
+    res = {}
+    res["inserir"] = cronometrar(lambda i: ids.append(antigo_inserir(path, registro_exemplo(i))), n)
+    res["atualizar"] = cronometrar(lambda i: antigo_atualizar(path, ids[i], registro_exemplo(i + 1)), n)
+    res["listar"] = cronometrar(lambda i: antigo_listar(path), n)
+    res["excluir"] = cronometrar(lambda i: antigo_excluir(path, ids[i]), n)
+    return res
+
+def medir_novo(path, n):
+    rh.fechar_conexao()
+    rh.DB_PATH = path
+    ids = []
+    res = {}
+    res["inserir"] = cronometrar(lambda i: ids.append(rh.inserir_colaborador(registro_exemplo(i))[0]), n)
+    res["atualizar"] = cronometrar(lambda i: rh.atualizar_colaborador_db(ids[i], registro_exemplo(i + 1)), n)
+    res["listar"] = cronometrar(lambda i: novo_listar(), n)
+    res["excluir"] = cronometrar(lambda i: rh.excluir_colaborador_db(ids[i]), n)
+    rh.fechar_conexao()
+    return res
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        path_antigo = os.path.join(tmp, "antigo.db")
+        path_novo = os.path.join(tmp, "novo.db")
+        preparar(path_antigo)
+        preparar(path_novo)
+        antigo = medir_antigo(path_antigo, n)
+        novo = medir_novo(path_novo, n)
+    print(f"{'operação':<12}{'antigo (µs)':>14}{'novo (µs)':>14}{'ganho':>10}")
+    for op in antigo:
+        print(f"{op:<12}{antigo[op]:>14.1f}{novo[op]:>14.1f}{antigo[op] / novo[op]:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
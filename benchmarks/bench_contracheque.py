@@ -0,0 +1,116 @@
+# bench_contracheque.py
+# Custo por contracheque: layout inteiro redesenhado a cada página com o logo lido do
+# disco (comportamento antigo) x template em form XObject + logo pré-decodificado.
+# Mede páginas num PDF único e arquivos avulsos.
+#
+#   python benchmarks/bench_contracheque.py [n_contracheques]
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gestao_rh_core as rh
+from PIL import Image
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+
+def registro_exemplo(i):
+    return {"nome": f"Colaborador {i}", "empresa": "Empresa Exemplo LTDA", "cargo": "Analista",
+            "cnpj": "12.345.678/0001-90", "cpf": f"{i:011d}", "endereco_empresa": "Rua das Flores",
+            "numero_empresa": "100", "salario_bruto": 3000.0 + i, "valor_passagem": 150.0,
+            "valor_abono": 50.0, "salario_liquido": None, "fim_contrato": ""}
+
+# -- comportamento antigo: tudo por página, drawImage(caminho) com os.path.exists
+def antigo_desenhar(c, data, logo_path):
+    w, h = A4
+    c.setFillColor(colors.HexColor("#2b5797"))
+    c.rect(0, h - 90, w, 90, fill=1, stroke=0)
+    c.setFillColor(colors.white)
+    c.setFont("Helvetica-Bold", 18)
+    c.drawString(40, h - 55, "CONTRACHEQUE")
+    if os.path.exists(logo_path):
+        c.drawImage(logo_path, w - 160, h - 80, width=120, height=60, preserveAspectRatio=True)
+    left_x, right_x, y, line_h = 40, w / 2 + 10, h - 120, 16
+    c.setFont("Helvetica", 10)
+    c.setFillColor(colors.black)
+    c.drawString(left_x, y, f"Nome: {data.get('nome') or ''}")
+    c.drawString(right_x, y, f"Empresa: {data.get('empresa') or ''}")
+    y -= line_h
+    c.drawString(left_x, y, f"Cargo: {data.get('cargo') or ''}")
+    c.drawString(right_x, y, f"CNPJ: {data.get('cnpj') or ''}")
+    y -= line_h
+    c.drawString(left_x, y, f"CPF: {data.get('cpf') or ''}")
+    c.drawString(right_x, y, f"Endereço: {data.get('endereco_empresa') or ''} {data.get('numero_empresa') or ''}")
+    y -= line_h * 1.2
+    box_x, box_w, box_h = left_x, w - 2 * left_x, 140
+    c.setStrokeColor(colors.HexColor("#cfcfcf"))
+    c.setLineWidth(0.5)
+    c.rect(box_x, y - box_h + 20, box_w, box_h, stroke=1, fill=0)
+    inner_y = y - 10
+    c.setFont("Helvetica-Bold", 11)
+    c.drawString(box_x + 8, inner_y, "Detalhamento Salarial")
+    inner_y -= 18
+    c.setFont("Helvetica", 10)
+    bruto = float(data.get("salario_bruto") or 0)
+    passagem = float(data.get("valor_passagem") or 0)
+    abono = float(data.get("valor_abono") or 0)
+    liquido = float(data.get("salario_liquido") or max(0, bruto - (passagem + abono)))
+    c.drawString(box_x + 12, inner_y, f"Salário Bruto: R$ {bruto:,.2f}")
+    c.drawRightString(box_x + box_w - 12, inner_y, f"Salário Líquido: R$ {liquido:,.2f}")
+    inner_y -= 16
+    c.drawString(box_x + 12, inner_y, f"Valor Passagem: R$ {passagem:,.2f}")
+    c.drawString(box_x + 220, inner_y, f"Abono Salarial: R$ {abono:,.2f}")
+    inner_y -= 18
+    c.drawString(box_x + 12, inner_y, f"Fim do Contrato: {data.get('fim_contrato') or 'Indeterminado'}")
+    sig_y = y - box_h - 40
+    c.line(left_x + 20, sig_y, left_x + 200, sig_y)
+    c.drawString(left_x + 25, sig_y - 14, "Assinatura do Colaborador")
+    c.line(w - 220, sig_y, w - 40, sig_y)
+    c.drawString(w - 215, sig_y - 14, "Assinatura da Empresa")
+
+def novo_desenhar(c, data, logo_path):
+    rh._desenhar_contracheque(c, data, logo_path)
+
+def pdf_unico(desenhar, path, n, logo_path):
+    c = rh.rcanvas.Canvas(path, pagesize=A4)
+    for i in range(n):
+        desenhar(c, registro_exemplo(i), logo_path)
+        c.showPage()
+    c.save()
+
+def arquivos_avulsos(desenhar, pasta, n, logo_path):
+    for i in range(n):
+        c = rh.rcanvas.Canvas(os.path.join(pasta, f"{i}.pdf"), pagesize=A4)
+        desenhar(c, registro_exemplo(i), logo_path)
+        c.showPage()
+        c.save()
+
+def cronometrar(fn, *args):
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rh._carregar_reportlab()
+    with tempfile.TemporaryDirectory() as tmp:
+        logo_path = os.path.join(tmp, "logo.png")
+        Image.new("RGB", (800, 400), (43, 87, 151)).save(logo_path)
+        print(f"{'cenário':<18}{'antigo (ms/pág)':>17}{'novo (ms/pág)':>15}{'ganho':>8}{'KB antigo':>11}{'KB novo':>9}")
+        for nome, fn in (("PDF único", pdf_unico), ("arquivos avulsos", arquivos_avulsos)):
+            medidas = []
+            for rotulo, desenhar in (("antigo", antigo_desenhar), ("novo", novo_desenhar)):
+                destino = os.path.join(tmp, f"{rotulo}.pdf")
+                if fn is arquivos_avulsos:
+                    destino = os.path.join(tmp, rotulo)
+                    os.makedirs(destino, exist_ok=True)
+                dt = cronometrar(fn, desenhar, destino, n, logo_path)
+                tamanho = (os.path.getsize(destino) if os.path.isfile(destino) else
+                           sum(os.path.getsize(os.path.join(destino, f)) for f in os.listdir(destino)))
+                medidas.append((dt / n * 1000, tamanho / 1024))
+            (t_a, kb_a), (t_n, kb_n) = medidas
+            print(f"{nome:<18}{t_a:>17.2f}{t_n:>15.2f}{t_a / t_n:>7.1f}x{kb_a:>11.0f}{kb_n:>9.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# bench_diagnostico.py
+# Custo da instrumentação de gestao_rh_diagnostico: uma função vazia (só o decorator),
+# chamadas baratas ao banco (busca por id, estatisticas) e uma importação em lote, com o
+# diagnóstico desligado (só o teste do flag no decorator), ligado sem trace e ligado
+# gravando o trace em arquivo.
+# "Sem decorator" chama a função original (__wrapped__), como antes da instrumentação.
+#
+#   python benchmarks/bench_diagnostico.py [n_registros]
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gestao_rh_core as rh
+import gestao_rh_diagnostico as diag
+import dados_sinteticos as ds
+
+CHAMADAS = 2000
+LOTE = 20000
+
+def medir(fn, vezes):
+    t0 = time.perf_counter()
+    for _ in range(vezes):
+        fn()
+    return (time.perf_counter() - t0) / vezes * 1e6  # µs por chamada
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as tmp:
+        rh.configurar_diretorio(tmp)
+        rh.inicializar_sistema()
+        rh.inserir_em_lote(ds.COLUNAS, ds.gerar_colaboradores(n))
+        vazia = diag.instrumentar("bench", "vazia")(lambda: None)
+        casos = [
+            ("função vazia", vazia, lambda f: f()),
+            ("buscar_colaboradores(id)", rh.buscar_colaboradores, lambda f: f(f"id:{n // 2}")),
+            ("estatisticas", rh.estatisticas, lambda f: f()),
+        ]
+        print(f"{n} colaboradores, {CHAMADAS} chamadas por caso (µs/chamada)")
+        print(f"{'caso':<28}{'sem decorator':>15}{'desligado':>12}{'ligado':>12}{'com trace':>12}")
+        trace = os.path.join(tmp, "trace.jsonl")
+        for nome, fn, chamar in casos:
+            base = medir(lambda: chamar(fn.__wrapped__), CHAMADAS)
+            desligado = medir(lambda: chamar(fn), CHAMADAS)
+            diag.ligar()
+            ligado = medir(lambda: chamar(fn), CHAMADAS)
+            diag.ligar(trace=trace)
+            com_trace = medir(lambda: chamar(fn), CHAMADAS)
+            diag.desligar()
+            diag.limpar()
+            print(f"{nome:<28}{base:>15.1f}{desligado:>12.1f}{ligado:>12.1f}{com_trace:>12.1f}")
+
+        # lote: um comando SQL por linha passa pelo gancho de trace do sqlite3
+        # (uma semente por rodada: CPF já cadastrado seria rejeitado pelo índice único)
+        print(f"\ninserir_em_lote de {LOTE} linhas (s)")
+        for semente, (rotulo, ligar) in enumerate((("desligado", False), ("ligado", True)), start=7):
+            if ligar:
+                diag.ligar()
+            t0 = time.perf_counter()
+            rh.inserir_em_lote(ds.COLUNAS, ds.gerar_colaboradores(LOTE, semente=semente))
+            print(f"  {rotulo:<12}{time.perf_counter() - t0:>8.2f}")
+            diag.desligar()
+        rh.fechar_conexao()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# bench_edicao.py
+# Edição de uma coluna em muitas linhas da grade: célula a célula (atualizar_campo_db, uma
+# transação por célula, como a edição direta) x sessão de edição em lote (salvar_edicoes:
+# uma transação, executemany por coluna, líquido recalculado uma vez). Confere também a
+# detecção de conflito (linha alterada por fora depois de editada) e que o resumo da folha
+# continua consistente. Sai com código 1 se alguma conferência falhar.
+#
+#   python benchmarks/bench_edicao.py [n_registros] [celulas]
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gestao_rh_core as rh
+import dados_sinteticos as ds
+
+COLS = [c[0] for c in rh.BASE_COLUMNS]
+
+def ler(ids):
+    with rh.usar_conexao() as conn:
+        return {r[0]: r for r in conn.execute(
+            f"SELECT * FROM colaboradores WHERE id IN ({','.join('?' * len(ids))})", ids)}
+
+def edicoes(ids, coluna, valor):
+    atuais = ler(ids)
+    return [(id_, coluna, atuais[id_][COLS.index(coluna)], valor(id_)) for id_ in ids]
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    celulas = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    falhas = []
+    with tempfile.TemporaryDirectory() as tmp:
+        rh.configurar_diretorio(tmp)
+        rh.inicializar_sistema()
+        rh.inserir_em_lote(ds.COLUNAS, ds.gerar_colaboradores(n))
+        rnd = random.Random(5)
+        print(f"{n} colaboradores, {celulas} células por rodada (ms)")
+        print(f"{'coluna':<16}{'célula a célula':>17}{'em lote':>10}")
+        for coluna, valor in (("salario_bruto", lambda i: round(rnd.uniform(1500, 9000), 2)),
+                              ("cargo", lambda i: f"Cargo {i % 7}")):
+            ids = rnd.sample(range(1, n + 1), celulas)
+            t0 = time.perf_counter()
+            for id_, col, _, novo in edicoes(ids, coluna, valor):
+                rh.atualizar_campo_db(id_, col, novo)
+            uma_a_uma = time.perf_counter() - t0
+            ids = rnd.sample(range(1, n + 1), celulas)
+            lote = edicoes(ids, coluna, valor)
+            t0 = time.perf_counter()
+            linhas, conflitos = rh.salvar_edicoes(lote)
+            em_lote = time.perf_counter() - t0
+            print(f"{coluna:<16}{uma_a_uma * 1000:>17.1f}{em_lote * 1000:>10.1f}")
+            gravado = ler(ids)
+            if conflitos or len(linhas) != celulas or any(
+                    gravado[id_][COLS.index(col)] != novo for id_, col, _, novo in lote):
+                falhas.append(f"{coluna}: edição em lote não gravou o esperado")
+            if coluna == "salario_bruto" and any(r[COLS.index("salario_liquido")] is None for r in gravado.values()):
+                falhas.append("salário líquido não recalculado")
+
+        # conflito: a linha muda por fora depois de editada; nada da sessão pode ser gravado
+        ids = rnd.sample(range(1, n + 1), 3)
+        lote = edicoes(ids, "cargo", lambda i: "Editado")
+        rh.atualizar_campo_db(ids[0], "cargo", "Alterado por fora")
+        rh.excluir_colaborador_db(ids[1])
+        linhas, conflitos = rh.salvar_edicoes(lote)
+        print(f"\nconflitos detectados: {conflitos}")
+        if linhas or {c[0] for c in conflitos} != {ids[0], ids[1]} or ler([ids[2]])[ids[2]][COLS.index("cargo")] == "Editado":
+            falhas.append("conflito não detectado ou sessão gravada parcialmente")
+        linhas, conflitos = rh.salvar_edicoes(lote, sobrescrever=True)
+        if [r[0] for r in linhas] != sorted((ids[0], ids[2]), reverse=True):
+            falhas.append("sobrescrever não gravou as linhas restantes")
+        ok, msg = rh.verificar_resumo_folha()
+        print(msg)
+        if not ok:
+            falhas.append(msg)
+        rh.fechar_conexao()
+    if falhas:
+        print("\nFALHA:\n  " + "\n  ".join(falhas))
+        sys.exit(1)
+    print("\nconferências ok")
+
+if __name__ == "__main__":
+    main()
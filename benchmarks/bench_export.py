@@ -0,0 +1,60 @@
+# bench_export.py
+# Mede o crescimento do pico de RSS e o tempo de export_csv/export_excel com N
+# colaboradores. Cada exportação roda num processo filho para o pico de uma não
+# mascarar a outra. Sai com código 1 se o crescimento passar de LIMITE_MB, que não
+# depende de N.
+#
+#   python benchmarks/bench_export.py [n_registros]
+import os
+import sys
+import tempfile
+import time
+import multiprocessing
+import resource
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gestao_rh_core as rh
+
+LIMITE_MB = 64
+
+def popular(n):
+    cols = [c[0] for c in rh.BASE_COLUMNS if c[0] != "id"]
+    linhas = (tuple(f"{col} {i}" if col not in rh.REAL_COLUMNS else 1000.0 + i for col in cols) for i in range(n))
+    rh.inserir_em_lote(cols, linhas)
+
+def _rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB no Linux
+
+def _exportar(fila, db_path, fn, path):
+    rh.DB_PATH = db_path
+    base = _rss_mb()
+    t0 = time.perf_counter()
+    ok, msg = fn(path)
+    fila.put((time.perf_counter() - t0, _rss_mb() - base, msg))
+
+def medir(nome, db_path, fn, path):
+    fila = multiprocessing.Queue()
+    p = multiprocessing.Process(target=_exportar, args=(fila, db_path, fn, path))
+    p.start()
+    dt, pico_mb, msg = fila.get()
+    p.join()
+    print(f"{nome:<8}{dt:>8.2f}s  +{pico_mb:>7.1f} MB RSS  {msg}")
+    return pico_mb
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = rh.DB_PATH = os.path.join(tmp, "bench.db")
+        rh.inicializar_sistema()
+        popular(n)
+        rh.fechar_conexao()
+        picos = [
+            medir("csv", db_path, rh.export_csv, os.path.join(tmp, "out.csv")),
+            medir("xlsx", db_path, rh.export_excel, os.path.join(tmp, "out.xlsx")),
+        ]
+    if max(picos) > LIMITE_MB:
+        print(f"FALHA: pico acima de {LIMITE_MB} MB")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
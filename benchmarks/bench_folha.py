@@ -0,0 +1,87 @@
+# bench_folha.py
+# Recálculo do salário líquido: laço registro a registro (salario_liquido() + UPDATE por
+# linha, como a tela fazia) x recalcular_folha() vetorizado. Antes, confere que a regra
+# escalar e a vetorizada dão o mesmo valor, centavo a centavo, em valores sorteados e em
+# casos de arredondamento (meio centavo, negativos, texto "1.234,56", vazios).
+#
+#   python benchmarks/bench_folha.py [n_registros]
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+
+import gestao_rh_core as rh
+import gestao_rh_folha as folha
+
+CASOS = [(0.285, 0.005, 0), (1234.565, 10.015, 0.125), (-0.005, 0, 0), (2000, 150.5, 99.995),
+         ("1.234,56", "10,01", ""), (None, None, None), ("", "abc", 3)]
+
+def conferir_regra(n=200000):
+    rnd = random.Random(3)
+    linhas = [(round(rnd.uniform(0, 20000), rnd.choice((2, 3))), round(rnd.uniform(0, 500), 3),
+               round(rnd.uniform(0, 300), 3)) for _ in range(n)]
+    escalar = [round(folha.salario_liquido(dict(zip(folha.COLUNAS_FOLHA, l))) * 100) for l in linhas]
+    arr = np.array(linhas, dtype="f8")
+    vetor = folha.liquido_centavos_np(arr[:, 0], arr[:, 1], arr[:, 2]).tolist()
+    divergentes = sum(a != b for a, b in zip(escalar, vetor))
+    print(f"regra escalar x vetorizada: {n} sorteios, {divergentes} divergência(s)")
+    return divergentes == 0
+
+def popular(n):
+    rnd = random.Random(5)
+    cols = ["nome", "cargo", "salario_bruto", "valor_passagem", "valor_abono", "salario_liquido"]
+    linhas = ((f"Colaborador {i}", "Analista", round(rnd.uniform(1500, 15000), 2), round(rnd.uniform(0, 400), 2),
+               round(rnd.uniform(0, 200), 2), 0) for i in range(n))
+    rh.inserir_em_lote(cols, linhas)
+    rh.inserir_em_lote(["nome"] + list(folha.COLUNAS_FOLHA), ((f"Caso {i}",) + c for i, c in enumerate(CASOS)))
+
+def zerar():
+    with rh.usar_conexao() as conn:
+        conn.execute("UPDATE colaboradores_base SET salario_liquido = 0")
+
+def por_linha():
+    with rh.usar_conexao() as conn:
+        linhas = conn.execute(f"SELECT id, {', '.join(folha.COLUNAS_FOLHA)} FROM colaboradores_base").fetchall()
+        for row in linhas:
+            conn.execute("UPDATE colaboradores_base SET salario_liquido = ? WHERE id = ?",
+                         (folha.salario_liquido(dict(zip(folha.COLUNAS_FOLHA, row[1:]))), row[0]))
+
+def liquidos():
+    with rh.usar_conexao() as conn:
+        return conn.execute("SELECT id, salario_liquido FROM colaboradores_base ORDER BY id").fetchall()
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    confere = conferir_regra()
+    with tempfile.TemporaryDirectory() as tmp:
+        rh.configurar_diretorio(os.path.join(tmp, "dados"))
+        rh.inicializar_sistema()
+        popular(n)
+        zerar()
+        t0 = time.perf_counter()
+        por_linha()
+        t_linha = time.perf_counter() - t0
+        esperado = liquidos()
+        zerar()
+        t0 = time.perf_counter()
+        ok, msg = rh.recalcular_folha()
+        t_vetor = time.perf_counter() - t0
+        mesmo = ok and liquidos() == esperado
+        t0 = time.perf_counter()
+        _, msg_sem = rh.recalcular_folha()
+        t_nada = time.perf_counter() - t0
+        rh.fechar_conexao()
+    print(f"{n + len(CASOS)} registros")
+    print(f"{'por linha':<28}{t_linha:>8.2f}s")
+    print(f"{'vetorizado':<28}{t_vetor:>8.2f}s  ({t_linha / t_vetor:.1f}x)  {msg}")
+    print(f"{'vetorizado, nada a alterar':<28}{t_nada:>8.2f}s  {msg_sem}")
+    print(f"resultado igual ao laço por linha: {'sim' if mesmo else 'NÃO'}")
+    if not (confere and mesmo):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+# bench_importacao_cpf.py
+# Importação por CPF (import_csv(..., por_cpf=True) / mesclar_por_cpf em gestao_rh_core):
+# reimportar o mesmo arquivo não pode gravar nada (dados, diário de alterações, sequência
+# do AUTOINCREMENT) e tem de sair mais rápido que a importação original. Confere também as
+# contagens de uma planilha editada (alterados, novos, CPF repetido no arquivo, CPF
+# inválido), o líquido recalculado, a busca e o resumo da folha; a recusa de um arquivo com
+# dados da empresa sem o CNPJ (não pode trocar a empresa de ninguém); a importação comum com CPF
+# já cadastrado (só essas linhas rejeitadas, não o lote); e um banco antigo com o mesmo CPF
+# em vários registros: a migração não apaga nada (só adia o índice único) e a remoção dos
+# repetidos fica para verificar_cpf_duplicados(corrigir=True). Sai com código 1 se alguma
+# conferência falhar.
+#
+#   python benchmarks/bench_importacao_cpf.py [n_registros]
+import csv
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gestao_rh_core as rh
+import dados_sinteticos as ds
+
+EDITADAS = 500  # linhas alteradas na planilha editada (metade cargo, metade salário)
+NOVAS = 300
+
+def estado():
+    # tudo o que uma reimportação sem mudanças não pode tocar
+    with rh.usar_conexao() as conn:
+        h = hashlib.sha256()
+        for row in conn.execute("SELECT * FROM colaboradores ORDER BY id"):
+            h.update(repr(row).encode())
+        seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'colaboradores_base'").fetchone()
+        return h.hexdigest(), rh._seq_alteracoes(conn), seq
+
+def ler_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+def gravar_csv(path, linhas):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(linhas)
+    return path
+
+def contar(sql, params=()):
+    with rh.usar_conexao() as conn:
+        return conn.execute(sql, params).fetchone()[0]
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    falhas = []
+    with tempfile.TemporaryDirectory() as tmp:
+        rh.configurar_diretorio(tmp)
+        rh.inicializar_sistema()
+        arquivo = ds.escrever_csv(os.path.join(tmp, "colaboradores.csv"), n)
+        t0 = time.perf_counter()
+        ok, msg = rh.import_csv(arquivo)
+        t_import = time.perf_counter() - t0
+        print(f"importação original: {msg}")
+
+        # reimportação do mesmo arquivo: nada muda
+        antes = estado()
+        t0 = time.perf_counter()
+        ok, msg = rh.import_csv(arquivo, por_cpf=True)
+        t_mescla = time.perf_counter() - t0
+        print(f"reimportação por CPF: {msg}")
+        print(f"  {t_mescla:.1f}s x {t_import:.1f}s da importação original")
+        if not ok or f"0 inseridos, 0 atualizados, {n} sem alteração" not in msg:
+            falhas.append(f"reimportação sem mudanças: {msg}")
+        if estado() != antes:
+            falhas.append("reimportação sem mudanças gravou no banco (dados, diário ou sequência)")
+        if t_mescla >= t_import:
+            falhas.append("reimportação sem mudanças mais lenta que a importação original")
+
+        # planilha editada: cargo e salário alterados, colaboradores novos, CPF repetido e inválido
+        linhas = ler_csv(arquivo)
+        cab = linhas[0]
+        i_cargo, i_bruto, i_cpf = cab.index("cargo"), cab.index("salario_bruto"), cab.index("cpf")
+        metade = EDITADAS // 2
+        for row in linhas[1:1 + metade]:
+            row[i_cargo] = "Coordenador de Mesclagem"
+        for row in linhas[1 + metade:1 + EDITADAS]:
+            row[i_bruto] = "12.345,67"
+            row[i_cpf] = row[i_cpf].replace(".", "").replace("-", "")  # mesma pessoa, outra formatação
+        novas = list(ds.gerar_colaboradores(NOVAS, semente=2))
+        linhas += [["" if v is None else str(v) for v in row] for row in novas]
+        linhas += [list(linhas[1]), list(linhas[2])]  # repetidas: vale a primeira
+        linhas.append(list(linhas[3]))
+        linhas[-1][i_cpf] = "000.000.000-00"
+        editado = gravar_csv(os.path.join(tmp, "editado.csv"), linhas)
+        ok, msg = rh.import_csv(editado, por_cpf=True)
+        print(f"\nplanilha editada: {msg}")
+        esperado = f"{NOVAS} inseridos, {EDITADAS} atualizados, {n - EDITADAS} sem alteração"
+        if not ok or esperado not in msg or "1 linhas rejeitadas" not in msg or "2 linhas com CPF repetido" not in msg:
+            falhas.append(f"contagens da planilha editada: {msg} (esperado {esperado}, 1 rejeitada, 2 repetidas)")
+        if contar("SELECT COUNT(*) FROM colaboradores_base") != n + NOVAS:
+            falhas.append("planilha editada mudou o número de colaboradores além dos novos")
+        if contar("SELECT COUNT(*) FROM colaboradores_base WHERE salario_bruto = 12345.67 "
+                  "AND salario_liquido <= salario_bruto AND salario_liquido > 0") != EDITADAS - metade:
+            falhas.append("líquido não recalculado nas linhas com salário alterado")
+        if len(rh.listar_colaboradores("Coordenador de Mesclagem")) != metade:
+            falhas.append("busca não encontra o cargo alterado")
+        ok, msg = rh.verificar_resumo_folha()
+        print(f"  {msg}")
+        if not ok:
+            falhas.append(msg)
+
+        # nome da empresa sem o CNPJ: recusado inteiro, ninguém muda de empresa
+        antes = estado()
+        parcial = [["cpf", "nome", "empresa"]] + [[row[i_cpf], row[cab.index("nome")], "Outra Razão Social"]
+                                                  for row in linhas[1:11]]
+        ok, msg = rh.import_csv(gravar_csv(os.path.join(tmp, "parcial.csv"), parcial), por_cpf=True)
+        print(f"\ncpf,nome,empresa sem cnpj: {msg}")
+        if ok or estado() != antes:
+            falhas.append(f"arquivo com empresa sem CNPJ mudou o cadastro: {msg}")
+
+        # importação comum: CPF já cadastrado rejeita só a linha, não o lote inteiro
+        mistura = [cab] + linhas[1:11] + [["" if v is None else str(v) for v in row]
+                                          for row in ds.gerar_colaboradores(20, semente=3)]
+        ok, msg = rh.import_csv(gravar_csv(os.path.join(tmp, "mistura.csv"), mistura))
+        print(f"\nimportação comum com 10 CPFs já cadastrados: {msg}")
+        if "20 registros importados" not in msg or "10 linhas rejeitadas" not in msg:
+            falhas.append(f"importação comum com CPF repetido: {msg}")
+        try:
+            rh.atualizar_campo_db(1, "cpf", linhas[2][i_cpf])
+            falhas.append("formulário gravou CPF de outro colaborador")
+        except ValueError as e:
+            print(f"  formulário: {e}")
+
+        # migração: banco antigo (versão 3, sem o índice) com o mesmo CPF em vários registros
+        with rh.usar_conexao() as conn:
+            conn.execute("DROP INDEX idx_colaboradores_cpf")
+            conn.execute("PRAGMA user_version = 3")
+            ids = [r[0] for r in conn.execute("SELECT id FROM colaboradores_base ORDER BY id LIMIT 3")]
+            conn.execute("UPDATE colaboradores_base SET anexo_pdf = 'anexos/ab/contrato.pdf' WHERE id = ?", (ids[0],))
+            cpf = conn.execute("SELECT cpf FROM colaboradores_base WHERE id = ?", (ids[0],)).fetchone()[0]
+            for id_, valor in zip(ids[1:], (cpf.replace(".", "").replace("-", ""), cpf.replace(".", " ").replace("-", " "))):
+                conn.execute("UPDATE colaboradores_base SET cpf = ? WHERE id = ?", (valor, id_))
+        rh.fechar_conexao()
+        total = contar("SELECT COUNT(*) FROM colaboradores_base")
+        t0 = time.perf_counter()
+        rh.inicializar_sistema()
+        dt = time.perf_counter() - t0
+        print(f"\nmigração com 3 registros do mesmo CPF: {dt * 1000:.0f} ms, CPF único {'ativo' if rh.CPF_UNICO else 'adiado'}")
+        if (contar("SELECT COUNT(*) FROM colaboradores_base") != total or rh.CPF_UNICO
+                or contar("SELECT COUNT(*) FROM sqlite_master WHERE name = 'idx_colaboradores_cpf'")
+                or contar("PRAGMA user_version") != len(rh.MIGRACOES)):
+            falhas.append("migração apagou registros ou criou o índice único com CPFs repetidos")
+        ok, msg = rh.verificar_cpf_duplicados()
+        print(f"  {msg}")
+        if ok or f"ids {','.join(map(str, ids))}" not in msg:
+            falhas.append(f"verificação não aponta os CPFs repetidos: {msg}")
+        ok, msg = rh.import_csv(arquivo, por_cpf=True)
+        print(f"  importação por CPF: {msg}")
+        if ok or contar("SELECT COUNT(*) FROM colaboradores_base") != total:
+            falhas.append("importação por CPF rodou sem o índice único")
+
+        # remoção explícita: fica o mais recente, os outros vão para o CSV
+        ok, msg = rh.verificar_cpf_duplicados(corrigir=True)
+        relatorios = [f for f in os.listdir(rh.REPORTS_DIR) if f.startswith("cpf_duplicados_removidos_")]
+        removidos = ler_csv(os.path.join(rh.REPORTS_DIR, relatorios[0]))[1:] if relatorios else []
+        print(f"  remoção: {' '.join(msg.split())}")
+        if (not ok or total - contar("SELECT COUNT(*) FROM colaboradores_base") != 2
+                or sorted(int(r[0]) for r in removidos) != ids[:2]
+                or contar("SELECT anexo_pdf FROM colaboradores_base WHERE id = ?", (ids[2],)) != "anexos/ab/contrato.pdf"):
+            falhas.append("remoção não manteve só o registro mais recente (com o anexo do removido)")
+        if not rh.CPF_UNICO or not contar("SELECT 1 FROM sqlite_master WHERE name = 'idx_colaboradores_cpf'"):
+            falhas.append("remoção dos repetidos não criou o índice único")
+        rh.fechar_conexao()
+    if falhas:
+        print("\nFALHA:\n  " + "\n  ".join(falhas))
+        sys.exit(1)
+    print("\nconferências ok")
+
+if __name__ == "__main__":
+    main()
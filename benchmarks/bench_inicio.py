@@ -0,0 +1,90 @@
+# bench_inicio.py
+# Orçamento de abertura a frio. Cada medição é um processo Python novo:
+#   - núcleo: import gestao_rh_core + inicializar_sistema() num banco já existente
+#     (sem pandas/reportlab carregados e com a verificação de esquema pulada);
+#   - janela: o aplicativo com GESTAO_RH_PERFIL_INICIO=sair, até a primeira janela
+#     (só com display disponível).
+# Sai com código 1 se a mediana passar do limite.
+#
+#   python benchmarks/bench_inicio.py [repeticoes]
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LIMITE_NUCLEO_MS = 400
+LIMITE_JANELA_MS = 2500
+
+FILHO_NUCLEO = """
+import sys, time
+t0 = time.perf_counter()
+import gestao_rh_core as rh
+t1 = time.perf_counter()
+rh.inicializar_sistema()
+t2 = time.perf_counter()
+pesados = [m for m in ("pandas", "reportlab", "openpyxl", "customtkinter", "tkinter") if m in sys.modules]
+print(f"{(t1 - t0) * 1000:.1f} {(t2 - t1) * 1000:.1f} {','.join(pesados) or '-'}")
+rh.fechar_conexao()
+"""
+
+def _ambiente(pasta, **extra):
+    env = dict(os.environ, GESTAO_RH_DIR=pasta, PYTHONPATH=RAIZ, **extra)
+    return env
+
+def medir_nucleo(pasta):
+    saida = subprocess.run([sys.executable, "-c", FILHO_NUCLEO], env=_ambiente(pasta), cwd=pasta,
+                           capture_output=True, text=True, check=True).stdout.split()
+    return float(saida[0]), float(saida[1]), saida[2]
+
+def medir_janela(pasta):
+    proc = subprocess.run([sys.executable, os.path.join(RAIZ, "gestao_rh_v1_2_1.py")], cwd=pasta,
+                          env=_ambiente(pasta, GESTAO_RH_PERFIL_INICIO="sair"),
+                          capture_output=True, text=True, timeout=60)
+    m = re.search(r"primeira janela\s+([\d.]+) ms", proc.stderr)
+    if not m:
+        raise RuntimeError(proc.stderr.strip() or "sem relatório de abertura")
+    return float(m.group(1)), proc.stderr
+
+def tem_display():
+    return sys.platform.startswith("win") or sys.platform == "darwin" or bool(os.environ.get("DISPLAY"))
+
+def main():
+    repeticoes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    falhou = False
+    with tempfile.TemporaryDirectory() as pasta:
+        # primeira abertura cria o banco e faz a verificação completa do esquema
+        imp, init, _ = medir_nucleo(pasta)
+        print(f"primeira abertura (cria o banco): import {imp:.1f} ms, inicializar_sistema {init:.1f} ms")
+        medidas = [medir_nucleo(pasta) for _ in range(repeticoes)]
+        imp = statistics.median(m[0] for m in medidas)
+        init = statistics.median(m[1] for m in medidas)
+        pesados = {m[2] for m in medidas} - {"-"}
+        print(f"núcleo (mediana de {repeticoes}): import {imp:.1f} ms + inicializar_sistema {init:.1f} ms "
+              f"= {imp + init:.1f} ms (limite {LIMITE_NUCLEO_MS} ms)")
+        if pesados:
+            print(f"FALHA: módulos carregados na abertura: {', '.join(sorted(pesados))}")
+            falhou = True
+        if imp + init > LIMITE_NUCLEO_MS:
+            print("FALHA: abertura do núcleo acima do limite")
+            falhou = True
+        if tem_display():
+            tempos = []
+            for _ in range(repeticoes):
+                total, relatorio = medir_janela(pasta)
+                tempos.append(total)
+            print(relatorio.rstrip())
+            mediana = statistics.median(tempos)
+            print(f"primeira janela (mediana de {repeticoes}): {mediana:.1f} ms (limite {LIMITE_JANELA_MS} ms)")
+            if mediana > LIMITE_JANELA_MS:
+                print("FALHA: primeira janela acima do limite")
+                falhou = True
+        else:
+            print("sem display: medição da janela ignorada")
+    if falhou:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
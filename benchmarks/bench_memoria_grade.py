@@ -0,0 +1,82 @@
+# bench_memoria_grade.py
+# Memória por colaborador em cache na grade: tuplas cruas do fetchall() x páginas do
+# PaginadorColaboradores (textos repetidos compartilhados), medida com tracemalloc; e
+# tempo para achar a posição de um registro em cache pelo id (varredura x índice).
+#
+#   python benchmarks/bench_memoria_grade.py [n_registros]
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gestao_rh_core as rh
+
+def popular(n, rnd):
+    # dados parecidos com os reais: empresa/cidade/cargo e flags repetem, o resto é único
+    cols = ["nome", "cpf", "email", "telefone", "endereco", "bairro", "cargo", "salario_bruto",
+            "optante_passagem", "valor_passagem", "abono_salarial", "salario_liquido", "empresa",
+            "endereco_empresa", "cidade", "bairro_empresa", "cnpj", "telefone_empresa"]
+    linhas = ((f"Colaborador {i}", f"{i:011d}", f"pessoa{i}@exemplo.com.br", f"11 9{i:08d}",
+               f"Rua {i % 900}", f"Bairro {i % 120}", rnd.choice(("Analista", "Auxiliar", "Gerente", "Caixa")),
+               round(rnd.uniform(1500, 9000), 2), rnd.choice(("Sim", "Não")), 220.0, rnd.choice(("Sim", "Não")),
+               round(rnd.uniform(1200, 8000), 2), f"Loja {i % 30}", f"Av. Central {i % 30}", "São Paulo",
+               "Centro", f"{i % 30:014d}", "11 3000-0000") for i in range(n))
+    rh.inserir_em_lote(cols, linhas)
+
+def medir(fn):
+    tracemalloc.start()
+    obj = fn()
+    usado = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, usado
+
+def tuplas_cruas():
+    with rh.usar_conexao() as conn:
+        return conn.execute("SELECT * FROM colaboradores ORDER BY id DESC").fetchall()
+
+def paginador(n):
+    fonte = rh.PaginadorColaboradores(max_paginas=n // rh.GRID_PAGE_SIZE + 1)
+    fonte.prefetch(0, fonte.total)
+    return fonte
+
+def varredura(fonte, id_):
+    # como _posicao_em_cache fazia antes do índice
+    for n, rows in fonte._paginas.items():
+        if rows and rows[-1][0] <= id_ <= rows[0][0]:
+            for i, r in enumerate(rows):
+                if r[0] == id_:
+                    return n * fonte.page_size + i
+    return None
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rnd = random.Random(13)
+    with tempfile.TemporaryDirectory() as tmp:
+        rh.configurar_diretorio(os.path.join(tmp, "dados"))
+        rh.inicializar_sistema()
+        popular(n, rnd)
+        cruas, b_cruas = medir(tuplas_cruas)
+        del cruas
+        fonte, b_fonte = medir(lambda: paginador(n))
+        print(f"{n} colaboradores em cache")
+        print(f"{'tuplas do fetchall()':<28}{b_cruas / n:>10,.0f} bytes/colaborador")
+        print(f"{'PaginadorColaboradores':<28}{b_fonte / n:>10,.0f} bytes/colaborador "
+              f"({1 - b_fonte / b_cruas:.0%} a menos)")
+        ids = [rnd.randint(1, n) for _ in range(2000)]
+        t0 = time.perf_counter()
+        esperado = [varredura(fonte, i) for i in ids]
+        t_var = (time.perf_counter() - t0) / len(ids) * 1e6
+        t0 = time.perf_counter()
+        obtido = [fonte._posicao_em_cache(i) for i in ids]
+        t_ind = (time.perf_counter() - t0) / len(ids) * 1e6
+        print(f"posição pelo id: varredura {t_var:,.1f} µs, índice {t_ind:,.2f} µs "
+              f"({'confere' if obtido == esperado else 'DIVERGE'})")
+        rh.fechar_conexao()
+    if obtido != esperado:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
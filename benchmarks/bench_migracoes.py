@@ -0,0 +1,181 @@
+# bench_migracoes.py
+# Migrações numeradas (MIGRACOES em gestao_rh_core) sobre bancos de cada época, montados
+# aqui mesmo: tabela plana antiga, impressão digital da ESQUEMA_REVISAO 1 (sem diário nem
+# resumo da folha) e 3 (esquema completo), todos com valores em texto nas colunas REAL como
+# gravava o import_csv antigo, e um banco novo. Confere versão, tipos, resumo da folha, busca
+# e integridade depois da abertura; que um passo que falha não deixa nada pela metade; que
+# reaplicar os passos num banco atual não muda nada; que banco de versão mais nova é recusado;
+# e mede a abertura com o banco já na versão atual. Sai com código 1 se algo falhar.
+#
+#   python benchmarks/bench_migracoes.py [n_registros]
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gestao_rh_core as rh
+import dados_sinteticos as ds
+
+ABERTURAS = 200
+# user_version gravado pelas revisões 1, 2 e 3 da impressão digital do esquema
+IMPRESSOES = {1: 1224457481, 2: 1103924272, 3: 267477272}
+REAIS = [c for c, t in rh.FUNCIONARIO_COLUMNS if t == "REAL"]
+# como o import_csv antigo gravava: texto com vírgula, vazio e texto que não é número
+ESQUEMA = "SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%' ORDER BY name"
+TEXTOS = [("salario_bruto", "1.500,50", 1500.5), ("valor_passagem", "", None),
+          ("valor_abono", "150,25", 150.25), ("salario_inicial", "a combinar", "a combinar")]
+
+def _linhas(n):
+    for i, row in enumerate(ds.gerar_colaboradores(n)):
+        d = dict(zip(ds.COLUNAS, row))
+        if i % 10 == 0:
+            for col, texto, _ in TEXTOS:
+                d[col] = texto
+        yield tuple(d[c] for c in ds.COLUNAS)
+
+def _inserir(conn, tabela, n):
+    conn.executemany(f"INSERT INTO {tabela} ({', '.join(ds.COLUNAS)}) VALUES ({', '.join('?' * len(ds.COLUNAS))})",
+                     _linhas(n))
+
+def banco_plano(path, n):
+    conn = sqlite3.connect(path)
+    conn.execute(f"CREATE TABLE colaboradores ({', '.join(f'{c} {t}' for c, t in rh.BASE_COLUMNS)})")
+    with conn:
+        _inserir(conn, "colaboradores", n)
+    conn.close()
+
+def banco_impressao(path, n, revisao):
+    # esquema da época da impressão digital = passo 1 das migrações; a revisão 1 ainda não
+    # tinha diário de alterações nem resumo da folha
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("BEGIN")
+    rh._migracao_esquema_normalizado(conn)
+    if revisao == 1:
+        for (nome,) in conn.execute("SELECT name FROM sqlite_master WHERE type='trigger' AND "
+                                    "(name LIKE '%diario%' OR name LIKE 'resumo_folha%')").fetchall():
+            conn.execute(f"DROP TRIGGER {nome}")
+        for tabela in ("alteracoes", "backup_checkpoint", "resumo_folha"):
+            conn.execute(f"DROP TABLE {tabela}")
+    _inserir(conn, "colaboradores", n)
+    conn.execute(f"PRAGMA user_version = {IMPRESSOES[revisao]}")
+    conn.execute("COMMIT")
+    conn.close()
+
+def conferir(nome, n, falhas):
+    with rh.usar_conexao() as conn:
+        versao = conn.execute("PRAGMA user_version").fetchone()[0]
+        total = conn.execute("SELECT COUNT(*) FROM colaboradores").fetchone()[0]
+        tipos = dict(conn.execute(
+            "SELECT 'texto', COUNT(*) FROM colaboradores_base WHERE " +
+            " OR ".join(f"(typeof({c}) = 'text' AND {c} <> 'a combinar')" for c in REAIS)).fetchall())
+        exemplo = conn.execute(f"SELECT {', '.join(c for c, _, _ in TEXTOS)} FROM colaboradores_base WHERE id = 1").fetchone()
+        integridade = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    ok_resumo, msg_resumo = rh.verificar_resumo_folha()
+    busca = rh.listar_colaboradores(ds.SOBRENOMES[0].lower())
+    problemas = []
+    if versao != len(rh.MIGRACOES):
+        problemas.append(f"user_version {versao}")
+    if total != n:
+        problemas.append(f"{total} de {n} registros")
+    if tipos.get("texto"):
+        problemas.append(f"{tipos['texto']} linha(s) com número em texto")
+    if n and list(exemplo) != [esperado for _, _, esperado in TEXTOS]:
+        problemas.append(f"valores convertidos {exemplo}")
+    if integridade != "ok":
+        problemas.append(f"integrity_check: {integridade}")
+    if not ok_resumo:
+        problemas.append(msg_resumo)
+    if n and not busca:
+        problemas.append("busca sem resultados")
+    print(f"  {nome:<30}{'ok' if not problemas else '; '.join(problemas)}")
+    falhas += [f"{nome}: {p}" for p in problemas]
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    falhas = []
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"abertura de bancos antigos ({n} colaboradores), versão final {len(rh.MIGRACOES)}")
+        bancos = [("tabela plana", lambda p: banco_plano(p, n), n),
+                  ("impressão revisão 1", lambda p: banco_impressao(p, n, 1), n),
+                  ("impressão revisão 3", lambda p: banco_impressao(p, n, 3), n),
+                  ("banco novo", lambda p: None, 0)]
+        for nome, criar, qtd in bancos:
+            pasta = os.path.join(tmp, nome.replace(" ", "_"))
+            os.makedirs(pasta)
+            criar(os.path.join(pasta, "employees.db"))
+            rh.configurar_diretorio(pasta)
+            t0 = time.perf_counter()
+            rh.inicializar_sistema()
+            dt = time.perf_counter() - t0
+            conferir(f"{nome} ({dt * 1000:.0f} ms)", qtd, falhas)
+
+        # passo que falha no meio: nada dele fica gravado e a versão não avança
+        pasta = os.path.join(tmp, "impressão_revisão_3")
+        rh.configurar_diretorio(pasta)
+        def passo_com_erro(conn):
+            conn.execute("UPDATE colaboradores_base SET cargo = 'migrado'")
+            conn.execute("CREATE TABLE tabela_do_passo (x)")
+            raise sqlite3.OperationalError("falha simulada")
+        rh.MIGRACOES.append(("passo de teste", passo_com_erro))
+        try:
+            rh.inicializar_sistema()
+            falhas.append("passo com erro não interrompeu a abertura")
+        except sqlite3.OperationalError:
+            pass
+        finally:
+            rh.MIGRACOES.pop()
+        with rh.usar_conexao() as conn:
+            sobrou = (conn.execute("PRAGMA user_version").fetchone()[0] != len(rh.MIGRACOES)
+                      or conn.execute("SELECT 1 FROM colaboradores_base WHERE cargo = 'migrado'").fetchone()
+                      or conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tabela_do_passo'").fetchone())
+        print(f"  {'passo com erro':<30}{'desfeito' if not sobrou else 'FICOU PELA METADE'}")
+        if sobrou:
+            falhas.append("passo com erro deixou alterações")
+
+        # idempotência: reaplicar todos os passos num banco atual não muda esquema nem dados
+        # (sqlite_stat1 vem do PRAGMA optimize ao fechar a conexão, não das migrações)
+        with rh.usar_conexao() as conn:
+            antes = (conn.execute(ESQUEMA).fetchall(),
+                     conn.execute("SELECT * FROM colaboradores ORDER BY id").fetchall())
+            conn.execute("PRAGMA user_version = 0")
+        rh.fechar_conexao()
+        rh.inicializar_sistema()
+        with rh.usar_conexao() as conn:
+            depois = (conn.execute(ESQUEMA).fetchall(),
+                      conn.execute("SELECT * FROM colaboradores ORDER BY id").fetchall())
+        print(f"  {'passos reaplicados':<30}{'sem mudanças' if antes == depois else 'MUDOU'}")
+        if antes != depois:
+            falhas.append("reaplicar os passos mudou o banco")
+
+        # banco de versão mais nova: recusado, sem tocar em nada
+        with rh.usar_conexao() as conn:
+            conn.execute(f"PRAGMA user_version = {len(rh.MIGRACOES) + 1}")
+        rh.fechar_conexao()
+        try:
+            rh.inicializar_sistema()
+            falhas.append("banco de versão mais nova foi aberto")
+        except RuntimeError as e:
+            print(f"  {'versão mais nova':<30}recusado: {e}")
+        with rh.usar_conexao() as conn:
+            conn.execute(f"PRAGMA user_version = {len(rh.MIGRACOES)}")
+
+        # abertura com o banco já na versão atual
+        tempos = []
+        for _ in range(ABERTURAS):
+            rh.fechar_conexao()
+            t0 = time.perf_counter()
+            rh.inicializar_sistema()
+            tempos.append(time.perf_counter() - t0)
+        tempos.sort()
+        print(f"\nabertura na versão atual: mediana {tempos[len(tempos) // 2] * 1000:.2f} ms "
+              f"(inclui abrir a conexão e os PRAGMAs dela)")
+        rh.fechar_conexao()
+    if falhas:
+        print("\nFALHA:\n  " + "\n  ".join(falhas))
+        sys.exit(1)
+    print("\nconferências ok")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# bench_resumo.py
+# Totais da folha por empresa/cargo: leitura do resumo_folha (mantido por triggers) x
+# GROUP BY completo em colaboradores_base, e custo dos triggers na importação. No fim,
+# depois de alterações/exclusões sorteadas, confere o resumo contra o recálculo completo.
+#
+#   python benchmarks/bench_resumo.py [n_registros]
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gestao_rh_core as rh
+
+CARGOS = ("Analista", "Auxiliar", "Gerente", "Vendedor", "Caixa", "Estoquista", "Motorista", None)
+
+def popular(n, rnd):
+    cols = ["nome", "cargo", "salario_bruto", "valor_passagem", "valor_abono", "empresa", "cnpj"]
+    linhas = ((f"Colaborador {i}", rnd.choice(CARGOS), round(rnd.uniform(1500, 12000), 2),
+               round(rnd.uniform(0, 300), 2), round(rnd.uniform(0, 200), 2), f"Empresa {i % 60}",
+               f"{i % 60:014d}") for i in range(n))
+    t0 = time.perf_counter()
+    rh.inserir_em_lote(cols, linhas)
+    return time.perf_counter() - t0
+
+def agrupar_direto(por):
+    chave = "c.cargo" if por == "cargo" else "c.empresa_id"
+    with rh.usar_conexao() as conn:
+        return conn.execute(f"SELECT {chave}, COUNT(*), SUM(salario_bruto), SUM(salario_liquido), "
+                            f"SUM(valor_passagem), SUM(valor_abono) FROM colaboradores_base c "
+                            f"GROUP BY {chave}").fetchall()
+
+def cronometrar(fn, repeticoes=5):
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - t0)
+    return min(tempos) * 1000
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    rnd = random.Random(11)
+    with tempfile.TemporaryDirectory() as tmp:
+        rh.configurar_diretorio(os.path.join(tmp, "dados"))
+        rh.inicializar_sistema()
+        t_import = popular(n, rnd)
+        print(f"{n} registros importados em {t_import:.1f}s (com os triggers do resumo)")
+        print(f"{'consulta':<22}{'GROUP BY (ms)':>15}{'resumo (ms)':>13}")
+        for por in rh.RESUMO_AGRUPAMENTOS:
+            direto = cronometrar(lambda: agrupar_direto(por))
+            resumo = cronometrar(lambda: rh.resumo_folha(por))
+            print(f"{f'por {por}':<22}{direto:>15.1f}{resumo:>13.2f}")
+        ids = [r[0] for r in rh.conectar().execute("SELECT id FROM colaboradores_base").fetchall()]
+        for id_ in rnd.sample(ids, 2000):
+            rh.atualizar_campo_db(id_, rnd.choice(("salario_bruto", "valor_passagem")), round(rnd.uniform(0, 9000), 2))
+        for id_ in rnd.sample(ids, 500):
+            rh.atualizar_campo_db(id_, "cargo", rnd.choice(CARGOS))
+        for id_ in rnd.sample(ids, 500):
+            rh.excluir_colaborador_db(id_)
+        rh.recalcular_folha()
+        ok, msg = rh.verificar_resumo_folha()
+        print(msg)
+        rh.fechar_conexao()
+    if not ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+# bench_suite.py
+# Suíte de desempenho do núcleo (gestao_rh_core, sem interface gráfica: roda em Linux sem
+# display), com dados de dados_sinteticos.py em cada tamanho pedido. Mede as funções reais:
+# importação CSV/Excel, inserir_colaborador, listar_colaboradores com e sem filtro,
+# exportação CSV/Excel, gerar_contracheque_pdf e inicializar_sistema (migração de um banco
+# antigo e abertura normal). Grava o resultado em JSON; com --baseline compara caso a caso
+# e sai com código 1 se algum ficar mais lento que o limite.
+#
+#   python benchmarks/bench_suite.py                              # 10k
+#   python benchmarks/bench_suite.py --tamanhos 10k,100k,1M --saida base.json
+#   python benchmarks/bench_suite.py --baseline base.json --limite 0.2
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gestao_rh_core as rh
+import dados_sinteticos as ds
+
+FORMATO = 1
+EXCEL_MAX_LINHAS = 100000  # planilha do import_excel: gerar 1M linhas em .xlsx levaria minutos
+INSERCOES = 500
+CONTRACHEQUES = 50
+FILTRO = "silva"
+MINIMO_MS = 20  # diferenças absolutas menores que isso não contam como regressão
+
+# -----------------------
+# Casos: cada um devolve (segundos, operações) só da parte medida
+
+def _novo_banco(tmp, nome):
+    rh.configurar_diretorio(os.path.join(tmp, nome))
+    rh.inicializar_sistema()
+
+def caso_import_csv(tmp, n, arquivos):
+    _novo_banco(tmp, "import_csv")
+    t0 = time.perf_counter()
+    ok, msg = rh.import_csv(arquivos["csv"])
+    dt = time.perf_counter() - t0
+    if not ok:
+        raise RuntimeError(msg)
+    return dt, n
+
+def caso_import_excel(tmp, n, arquivos):
+    _novo_banco(tmp, "import_excel")
+    t0 = time.perf_counter()
+    ok, msg = rh.import_excel(arquivos["xlsx"])
+    dt = time.perf_counter() - t0
+    if not ok:
+        raise RuntimeError(msg)
+    return dt, min(n, EXCEL_MAX_LINHAS)
+
+def caso_inserir_colaborador(tmp, n, arquivos):
+    # banco já populado (import_csv): inserções uma a uma, como o formulário faz
+    linhas = [dict(zip(ds.COLUNAS, r)) for r in ds.gerar_colaboradores(INSERCOES, semente=99)]
+    t0 = time.perf_counter()
+    for d in linhas:
+        rh.inserir_colaborador(d)
+    return time.perf_counter() - t0, INSERCOES
+
+def caso_listar(filtro):
+    def caso(tmp, n, arquivos):
+        t0 = time.perf_counter()
+        rows = rh.listar_colaboradores(filtro)
+        return time.perf_counter() - t0, len(rows)
+    return caso
+
+def caso_export_csv(tmp, n, arquivos):
+    t0 = time.perf_counter()
+    ok, msg = rh.export_csv(os.path.join(tmp, "export.csv"))
+    dt = time.perf_counter() - t0
+    if not ok:
+        raise RuntimeError(msg)
+    return dt, n
+
+def caso_export_excel(tmp, n, arquivos):
+    t0 = time.perf_counter()
+    ok, msg = rh.export_excel(os.path.join(tmp, "export.xlsx"))
+    dt = time.perf_counter() - t0
+    if not ok:
+        raise RuntimeError(msg)
+    return dt, n
+
+def caso_contracheque_pdf(tmp, n, arquivos):
+    with rh.usar_conexao() as conn:
+        registros = conn.execute("SELECT * FROM colaboradores LIMIT ?", (CONTRACHEQUES,)).fetchall()
+    t0 = time.perf_counter()
+    for r in registros:
+        rh.gerar_contracheque_pdf(r, abrir=False)
+    return time.perf_counter() - t0, len(registros)
+
+def caso_migracao(tmp, n, arquivos):
+    # banco no formato antigo (tabela plana `colaboradores`) migrado pelo inicializar_sistema
+    pasta = os.path.join(tmp, "legado")
+    os.makedirs(pasta, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(pasta, "employees.db"))
+    conn.execute(f"CREATE TABLE colaboradores ({', '.join(f'{c} {t}' for c, t in rh.BASE_COLUMNS)})")
+    with conn:
+        conn.executemany(f"INSERT INTO colaboradores ({', '.join(ds.COLUNAS)}) VALUES ({', '.join('?' * len(ds.COLUNAS))})",
+                         ds.gerar_colaboradores(n))
+    conn.close()
+    rh.configurar_diretorio(pasta)
+    t0 = time.perf_counter()
+    rh.inicializar_sistema()
+    return time.perf_counter() - t0, n
+
+def caso_abertura(tmp, n, arquivos):
+    # banco já no esquema atual: abertura normal (conexão nova + verificação de versão)
+    rh.fechar_conexao()
+    t0 = time.perf_counter()
+    rh.inicializar_sistema()
+    return time.perf_counter() - t0, 1
+
+# ordem importa: import_csv deixa o banco populado para os casos seguintes
+CASOS = [
+    ("import_excel", caso_import_excel, 1),
+    ("import_csv", caso_import_csv, 1),
+    ("listar_sem_filtro", caso_listar(""), 3),
+    ("listar_com_filtro", caso_listar(FILTRO), 3),
+    ("export_csv", caso_export_csv, 1),
+    ("export_excel", caso_export_excel, 1),
+    ("contracheque_pdf", caso_contracheque_pdf, 3),
+    ("inserir_colaborador", caso_inserir_colaborador, 1),
+    ("abertura", caso_abertura, 5),
+    ("migracao_inicializar", caso_migracao, 1),
+]
+
+# -----------------------
+def _tamanho(txt):
+    txt = txt.strip().lower()
+    mult = {"k": 1000, "m": 1000000}.get(txt[-1:], 1)
+    return int(float(txt.rstrip("km")) * mult)
+
+def rodar_tamanho(n, casos, repeticoes=None):
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"\n== {n} colaboradores (gerando arquivos...)")
+        arquivos = {"csv": ds.escrever_csv(os.path.join(tmp, "dados.csv"), n)}
+        if any(nome == "import_excel" for nome, _, _ in casos):
+            arquivos["xlsx"] = ds.escrever_excel(os.path.join(tmp, "dados.xlsx"), min(n, EXCEL_MAX_LINHAS))
+        for nome, fn, rep in casos:
+            tempos = []
+            for _ in range(repeticoes or rep):
+                dt, ops = fn(tmp, n, arquivos)
+                tempos.append(dt)
+            melhor = min(tempos)
+            resultados[nome] = {"segundos": melhor, "mediana": statistics.median(tempos),
+                                "operacoes": ops, "por_segundo": ops / melhor if melhor else None}
+            print(f"  {nome:<22}{melhor * 1000:>12.1f} ms{ops / melhor if melhor else 0:>14,.0f} op/s")
+        rh.fechar_conexao()
+    return resultados
+
+def comparar(atual, base, limite):
+    regressoes = []
+    print(f"\n{'tamanho':>9}  {'caso':<22}{'base (ms)':>12}{'atual (ms)':>12}{'variação':>10}")
+    for tamanho, casos in atual["resultados"].items():
+        for nome, r in casos.items():
+            b = base.get("resultados", {}).get(tamanho, {}).get(nome)
+            if not b:
+                continue
+            variacao = r["segundos"] / b["segundos"] - 1 if b["segundos"] else 0.0
+            regrediu = variacao > limite and (r["segundos"] - b["segundos"]) * 1000 > MINIMO_MS
+            marca = "  REGRESSÃO" if regrediu else ""
+            print(f"{tamanho:>9}  {nome:<22}{b['segundos'] * 1000:>12.1f}{r['segundos'] * 1000:>12.1f}"
+                  f"{variacao:>+10.1%}{marca}")
+            if regrediu:
+                regressoes.append((tamanho, nome, variacao))
+    return regressoes
+
+def main():
+    parser = argparse.ArgumentParser(description="suíte de desempenho do gestao_rh_core")
+    parser.add_argument("--tamanhos", default="10k", help="lista separada por vírgulas (ex.: 10k,100k,1M)")
+    parser.add_argument("--casos", help="só estes casos (separados por vírgulas)")
+    parser.add_argument("--repeticoes", type=int, help="repetições por caso (padrão: do caso); vale o menor tempo")
+    parser.add_argument("--saida", help="arquivo JSON do resultado (padrão: bench_suite_<data>.json)")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--limite", type=float, default=0.20, help="regressão tolerada (0.20 = 20%% mais lento)")
+    args = parser.parse_args()
+
+    casos = CASOS
+    if args.casos:
+        pedidos = set(args.casos.split(","))
+        desconhecidos = pedidos - {nome for nome, _, _ in CASOS}
+        if desconhecidos:
+            parser.error(f"casos desconhecidos: {', '.join(sorted(desconhecidos))}")
+        # import_csv popula o banco dos casos seguintes: roda sempre
+        casos = [c for c in CASOS if c[0] in pedidos or c[0] == "import_csv"]
+    atual = {
+        "formato": FORMATO,
+        "criado_em": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(), "resultados": {},
+    }
+    for n in (_tamanho(t) for t in args.tamanhos.split(",")):
+        atual["resultados"][str(n)] = rodar_tamanho(n, casos, args.repeticoes)
+
+    saida = args.saida or f"bench_suite_{datetime.now():%Y%m%d_%H%M%S}.json"
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(atual, f, indent=2, ensure_ascii=False)
+    print(f"\nresultado salvo em {saida}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            base = json.load(f)
+        regressoes = comparar(atual, base, args.limite)
+        if regressoes:
+            print(f"\nFALHA: {len(regressoes)} caso(s) mais lentos que o limite de {args.limite:.0%}")
+            sys.exit(1)
+        print(f"\nsem regressões acima de {args.limite:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# bench_tarefas.py
+# Tarefas em segundo plano (gestao_rh_tarefas), sem display: um "loop da tela" simulado
+# (tique a cada TIQUE_MS, como o after() do Tk) mede o maior atraso entre tiques com a
+# importação na própria thread (como era) e no Agendador, com a grade lendo uma página a cada
+# tique (PaginadorColaboradores, fora do lock da importação). Também confere, com as funções
+# reais do núcleo, que tarefas exclusivas não se sobrepõem a nenhuma outra, que a fila
+# respeita a ordem de envio e que cancelar importação/exportação não deixa nada gravado.
+# Sai com código 1 se alguma conferência falhar.
+#
+#   python benchmarks/bench_tarefas.py [n_registros]
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gestao_rh_core as rh
+import dados_sinteticos as ds
+from gestao_rh_tarefas import Agendador, CANCELADA, CONCLUIDA
+
+TIQUE_MS = 10
+LEITURA_MAX_MS = 500  # atraso aceitável do tique com a grade lendo durante a importação
+
+def contar():
+    with rh.usar_conexao() as conn:
+        return conn.execute("SELECT COUNT(*) FROM colaboradores_base").fetchone()[0]
+
+def loop_da_tela(enquanto, tique=None):
+    # maior atraso (ms) de um tique em relação ao previsto, enquanto enquanto() for verdadeiro;
+    # tique(): trabalho feito a cada volta, como o redesenho da grade
+    pior = 0.0
+    previsto = time.perf_counter() + TIQUE_MS / 1000
+    while enquanto():
+        if tique is not None:
+            tique()
+        time.sleep(max(0.0, previsto - time.perf_counter()))
+        agora = time.perf_counter()
+        pior = max(pior, (agora - previsto) * 1000)
+        previsto = agora + TIQUE_MS / 1000
+    return pior
+
+def responsividade(csv_path, csv_agendador):
+    # arquivos com CPFs diferentes: no segundo, o índice único rejeitaria todas as linhas
+    print(f"maior atraso do loop da tela (tique de {TIQUE_MS} ms) durante import_csv")
+    t0 = time.perf_counter()
+    rh.import_csv(csv_path)  # na thread da tela: nenhum tique acontece até terminar
+    print(f"  {'na thread da tela':<22}{(time.perf_counter() - t0) * 1000:>10.0f} ms")
+    agendador = Agendador()
+    tarefa = agendador.enviar("Importação", lambda t: rh.import_csv(csv_agendador, progresso=lambda n, _: t.progresso(n)),
+                              exclusiva=True)
+    leituras = []
+    pior = loop_da_tela(lambda: not tarefa.terminada,
+                        lambda: leituras.append(len(rh.PaginadorColaboradores("").linhas(0, 50))))
+    print(f"  {'no Agendador':<22}{pior:>10.1f} ms  ({len(leituras)} páginas lidas pela grade)")
+    falhas = [] if tarefa.ok else ["importação no Agendador falhou"]
+    if pior > LEITURA_MAX_MS:
+        falhas.append(f"grade bloqueada pela importação: tique atrasou {pior:.0f} ms")
+    return falhas
+
+def conflitos(tmp, csv_path, n):
+    agendador = Agendador()
+    backup = os.path.join(tmp, "base.db")
+    ok, msg = rh.backup_db(backup)
+    assert ok, msg
+    pedidos = [
+        ("export csv", lambda t: rh.export_csv(os.path.join(tmp, "a.csv"), progresso=t.progresso), False),
+        ("importação", lambda t: rh.import_csv(csv_path), True),
+        ("export xlsx", lambda t: rh.export_excel(os.path.join(tmp, "a.xlsx")), False),
+        ("backup", lambda t: rh.backup_db(os.path.join(tmp, "b.db")), False),
+        ("restauração", lambda t: rh.restaurar_db(backup), True),
+        ("estatísticas", lambda t: (True, str(rh.estatisticas()["colaboradores"])), False),
+    ]
+    tarefas = [agendador.enviar(rotulo, fn, exclusiva=exc) for rotulo, fn, exc in pedidos]
+    agendador.aguardar()
+    print("\nlinha do tempo (ms desde o primeiro envio)")
+    base = min(t.criada for t in tarefas)
+    for t in tarefas:
+        print(f"  {t.rotulo:<14}{'exclusiva' if t.exclusiva else '':<11}{(t.inicio - base) * 1000:>8.0f}"
+              f"{(t.fim - base) * 1000:>8.0f}  {t.estado}: {' '.join(t.msg.split())[:60]}")
+    falhas = [f"{t.rotulo}: {t.msg}" for t in tarefas if t.estado != CONCLUIDA or not t.ok]
+    for a in tarefas:
+        for b in tarefas:
+            if a is not b and (a.exclusiva or b.exclusiva) and a.inicio < b.fim and b.inicio < a.fim:
+                falhas.append(f"{a.rotulo} sobrepôs {b.rotulo}")
+    if not tarefas[1].msg.startswith(f"{n} registros importados") or "rejeitadas" in tarefas[1].msg:
+        falhas.append(f"importação exclusiva não gravou as {n} linhas: {tarefas[1].msg}")
+    inicios = [t.inicio for t in tarefas]
+    if inicios != sorted(inicios):
+        falhas.append("tarefas iniciadas fora da ordem de envio")
+    return falhas
+
+def cancelamento(tmp, csv_path):
+    falhas = []
+    agendador = Agendador()
+    antes = contar()
+    metade = threading.Event()
+    def importar(t):
+        def progresso(n, _):
+            t.progresso(n)
+            metade.set()
+        return rh.import_csv(csv_path, batch_size=1000, progresso=progresso, cancelar=t.cancelamento)
+    tarefa = agendador.enviar("Importação", importar, exclusiva=True)
+    fila = agendador.enviar("Exportação", lambda t: rh.export_csv(os.path.join(tmp, "nunca.csv")))
+    metade.wait()
+    agendador.cancelar(tarefa)
+    agendador.cancelar(fila)  # ainda na fila (esperando a importação exclusiva)
+    agendador.aguardar()
+    print(f"\nimportação cancelada após {tarefa.feitos} linhas: {tarefa.estado} ({tarefa.msg})")
+    print(f"exportação cancelada na fila: {fila.estado} ({fila.msg})")
+    if tarefa.estado != CANCELADA or contar() != antes:
+        falhas.append(f"importação cancelada gravou {contar() - antes} linhas")
+    if fila.estado != CANCELADA or fila.inicio is not None or os.path.exists(os.path.join(tmp, "nunca.csv")):
+        falhas.append("exportação cancelada na fila chegou a rodar")
+
+    destino = os.path.join(tmp, "parcial.csv")
+    def exportar(t):
+        def progresso(n, total):
+            t.progresso(n, total)
+            t.cancelar()  # cancela depois do primeiro bloco
+        return rh.export_csv(destino, progresso=progresso, cancelar=t.cancelamento)
+    tarefa = agendador.enviar("Exportação", exportar)
+    tarefa.aguardar()
+    print(f"exportação cancelada após {tarefa.feitos} linhas: {tarefa.estado} ({tarefa.msg})")
+    if tarefa.estado != CANCELADA or os.path.exists(destino):
+        falhas.append("exportação cancelada deixou arquivo parcial")
+    return falhas
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    with tempfile.TemporaryDirectory() as tmp:
+        rh.configurar_diretorio(os.path.join(tmp, "dados"))
+        rh.inicializar_sistema()
+        csv_path = ds.escrever_csv(os.path.join(tmp, "dados.csv"), n)
+        print(f"{n} colaboradores por importação")
+        csv_agendador = ds.escrever_csv(os.path.join(tmp, "dados2.csv"), n, semente=2)
+        falhas = responsividade(csv_path, csv_agendador)
+        # CPFs novos em cada importação: a exclusiva grava de fato enquanto as outras esperam,
+        # e o cancelamento desfaz linhas que seriam gravadas (não rejeitadas pelo CPF único)
+        falhas += conflitos(tmp, ds.escrever_csv(os.path.join(tmp, "dados3.csv"), n, semente=3), n)
+        falhas += cancelamento(tmp, ds.escrever_csv(os.path.join(tmp, "dados4.csv"), n, semente=4))
+        rh.fechar_conexao()
+    if falhas:
+        print("\nFALHA:\n  " + "\n  ".join(falhas))
+        sys.exit(1)
+    print("\nconferências ok")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# dados_sinteticos.py
+# Colaboradores sintéticos parecidos com os reais, reprodutíveis pela semente: nomes em
+# português, CPF/CNPJ com dígitos verificadores válidos, salário por cargo (log-normal em
+# torno da mediana do cargo), vale-transporte/abono só para parte dos colaboradores e
+# empresas (filiais) compartilhadas. Usado pela bench_suite.py; também grava CSV/Excel
+# prontos para importar.
+#
+#   python benchmarks/dados_sinteticos.py 100000 colaboradores.csv [--semente 1]
+#   python benchmarks/dados_sinteticos.py 10000 colaboradores.xlsx
+import argparse
+import csv
+import math
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import gestao_rh_core as rh
+
+COLUNAS = [c[0] for c in rh.BASE_COLUMNS if c[0] != "id"]
+
+NOMES = ("Ana", "Maria", "Juliana", "Fernanda", "Patrícia", "Aline", "Camila", "Bruna", "Letícia",
+         "Beatriz", "Larissa", "Vanessa", "Renata", "Gabriela", "Mariana", "José", "João", "Antônio",
+         "Carlos", "Paulo", "Pedro", "Lucas", "Luiz", "Marcos", "Gabriel", "Rafael", "Daniel",
+         "Marcelo", "Bruno", "Eduardo", "Felipe", "Rodrigo", "Thiago", "Gustavo", "Matheus", "Vinícius")
+SOBRENOMES = ("Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira",
+              "Lima", "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares",
+              "Fernandes", "Vieira", "Barbosa", "Rocha", "Dias", "Nascimento", "Andrade", "Moreira",
+              "Nunes", "Marques", "Machado", "Mendes", "Freitas", "Cardoso", "Ramos", "Araújo", "Conceição")
+# cargo: (peso na população, mediana do salário bruto)
+CARGOS = {"Operador de Caixa": (18, 1750), "Repositor": (14, 1650), "Auxiliar de Limpeza": (8, 1550),
+          "Vendedor": (16, 2300), "Estoquista": (8, 1900), "Auxiliar Administrativo": (8, 2400),
+          "Motorista": (5, 2900), "Analista Administrativo": (6, 4200), "Assistente de RH": (3, 3100),
+          "Supervisor": (5, 4800), "Gerente de Loja": (3, 8500), "Coordenador": (2, 7200),
+          "Analista de Sistemas": (3, 7800), "Diretor": (1, 22000)}
+CIDADES = {"São Paulo": ("Centro", "Mooca", "Pinheiros", "Tatuapé", "Santana", "Itaquera"),
+           "Campinas": ("Centro", "Cambuí", "Taquaral", "Barão Geraldo"),
+           "Rio de Janeiro": ("Centro", "Tijuca", "Copacabana", "Méier", "Madureira"),
+           "Belo Horizonte": ("Centro", "Savassi", "Pampulha", "Barreiro"),
+           "Curitiba": ("Centro", "Batel", "Portão", "Boqueirão"),
+           "Salvador": ("Centro", "Barra", "Pituba", "Liberdade")}
+LOGRADOUROS = ("Rua das Flores", "Av. Brasil", "Rua São João", "Rua XV de Novembro", "Av. Paulista",
+               "Rua Sete de Setembro", "Rua Tiradentes", "Av. Getúlio Vargas", "Rua Santos Dumont")
+REDES = ("Supermercados Bom Preço", "Drogaria Saúde", "Lojas Horizonte", "Atacadão Central",
+         "Padaria Pão Dourado", "Magazine Estrela")
+
+def _digito_verificador(numeros, pesos):
+    resto = sum(n * p for n, p in zip(numeros, pesos)) % 11
+    return 0 if resto < 2 else 11 - resto
+
+def cpf(rnd, numero=None):
+    # numero: os 9 dígitos da base (sem ele, sorteados)
+    base = [int(c) for c in f"{numero:09d}"] if numero is not None else [rnd.randint(0, 9) for _ in range(9)]
+    base.append(_digito_verificador(base, range(10, 1, -1)))
+    base.append(_digito_verificador(base, range(11, 1, -1)))
+    d = "".join(map(str, base))
+    return f"{d[:3]}.{d[3:6]}.{d[6:9]}-{d[9:]}"
+
+def cnpj(rnd):
+    base = [rnd.randint(0, 9) for _ in range(8)] + [0, 0, 0, rnd.randint(1, 9)]
+    base.append(_digito_verificador(base, (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)))
+    base.append(_digito_verificador(base, (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)))
+    d = "".join(map(str, base))
+    return f"{d[:2]}.{d[2:5]}.{d[5:8]}/{d[8:12]}-{d[12:]}"
+
+def cpf_valido(valor):
+    d = [int(c) for c in valor if c.isdigit()]
+    return (len(d) == 11 and d[9] == _digito_verificador(d[:9], range(10, 1, -1))
+            and d[10] == _digito_verificador(d[:10], range(11, 1, -1)))
+
+def cnpj_valido(valor):
+    d = [int(c) for c in valor if c.isdigit()]
+    return (len(d) == 14 and d[12] == _digito_verificador(d[:12], (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2))
+            and d[13] == _digito_verificador(d[:13], (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)))
+
+def _telefone(rnd, celular=True):
+    ddd = rnd.choice((11, 19, 21, 31, 41, 71))
+    return f"({ddd}) 9{rnd.randint(1000, 9999)}-{rnd.randint(0, 9999):04d}" if celular else \
+           f"({ddd}) 3{rnd.randint(100, 999)}-{rnd.randint(0, 9999):04d}"
+
+def _data(rnd, inicio, fim):
+    return (inicio + timedelta(days=rnd.randrange((fim - inicio).days))).strftime("%d/%m/%Y")
+
+def gerar_empresas(rnd, quantidade):
+    empresas = []
+    for i in range(quantidade):
+        cidade = rnd.choice(list(CIDADES))
+        rede = REDES[i % len(REDES)]
+        empresas.append({
+            "empresa": f"{rede} - Filial {i // len(REDES) + 1:02d}",
+            "endereco_empresa": rnd.choice(LOGRADOUROS), "numero_empresa": str(rnd.randint(10, 3000)),
+            "cidade": cidade, "bairro_empresa": rnd.choice(CIDADES[cidade]), "cnpj": cnpj(rnd),
+            "telefone_empresa": _telefone(rnd, celular=False),
+            "email_empresa": f"rh.filial{i + 1}@{rede.split()[0].lower()}.com.br",
+        })
+    return empresas
+
+CPF_PASSO = 48271  # primo com 10**8: i -> i * CPF_PASSO mod 10**8 não repete
+
+def gerar_colaboradores(n, semente=1, empresas=None):
+    # gera tuplas na ordem de COLUNAS; ~1 filial para cada 250 colaboradores
+    rnd = random.Random(semente)
+    empresas = empresas or gerar_empresas(rnd, max(1, n // 250))
+    cargos = list(CARGOS)
+    pesos = [CARGOS[c][0] for c in cargos]
+    hoje = date(2025, 1, 1)
+    # CPF único como no cadastro (idx_colaboradores_cpf): base = primeiro dígito pela semente +
+    # 8 dígitos de uma permutação de i, então sementes com final diferente também não colidem
+    salto = rnd.randrange(10 ** 8)
+    for i in range(n):
+        nome = f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}"
+        cargo = rnd.choices(cargos, pesos)[0]
+        bruto = round(CARGOS[cargo][1] * math.exp(rnd.gauss(0, 0.18)), 2)
+        optante = rnd.random() < 0.6
+        passagem = round(min(bruto * 0.06, rnd.uniform(180, 420)), 2) if optante else 0.0
+        tem_abono = rnd.random() < 0.15
+        abono = round(rnd.uniform(50, 400), 2) if tem_abono else 0.0
+        emp = empresas[rnd.randrange(len(empresas))]
+        cidade = emp["cidade"]
+        usuario = nome.lower().split()
+        d = {
+            "nome": nome, "identidade": f"{rnd.randint(10, 99)}.{rnd.randint(100, 999)}.{rnd.randint(100, 999)}-{rnd.randint(0, 9)}",
+            "nome_mae": f"{rnd.choice(NOMES[:15])} {rnd.choice(SOBRENOMES)}",
+            "nome_pai": f"{rnd.choice(NOMES[15:])} {rnd.choice(SOBRENOMES)}" if rnd.random() < 0.85 else "",
+            "cpf": cpf(rnd, (semente % 10) * 10 ** 8 + (i * CPF_PASSO + salto) % 10 ** 8), "cep": f"{rnd.randint(1000, 99999):05d}-{rnd.randint(0, 999):03d}",
+            "endereco": rnd.choice(LOGRADOUROS), "numero": str(rnd.randint(1, 2500)),
+            "bairro": rnd.choice(CIDADES[cidade]), "complemento": rnd.choice(("", "", "", "Apto 12", "Casa 2", "Bloco B")),
+            "nascimento": _data(rnd, date(1960, 1, 1), date(2006, 1, 1)), "telefone": _telefone(rnd),
+            "email": f"{usuario[0]}.{usuario[-1]}{i}@email.com.br", "cargo": cargo,
+            "salario_inicial": round(bruto * rnd.uniform(0.8, 1.0), 2), "salario_bruto": bruto,
+            "optante_passagem": "Sim" if optante else "Não", "valor_passagem": passagem,
+            "abono_salarial": "Sim" if tem_abono else "Não", "valor_abono": abono,
+            "salario_liquido": None,  # calculado pelo sistema na importação
+            "fim_contrato": _data(rnd, hoje, hoje + timedelta(days=730)) if rnd.random() < 0.1 else "",
+            "anexo_pdf": "",
+        }
+        d.update(emp)
+        yield tuple(d[c] for c in COLUNAS)
+
+def escrever_csv(path, n, semente=1):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(COLUNAS)
+        w.writerows(gerar_colaboradores(n, semente))
+    return path
+
+def escrever_excel(path, n, semente=1):
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("colaboradores")
+    ws.append(COLUNAS)
+    for row in gerar_colaboradores(n, semente):
+        ws.append(row)
+    wb.save(path)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="gera colaboradores sintéticos em CSV/Excel")
+    parser.add_argument("quantidade", type=int)
+    parser.add_argument("arquivo", help=".csv ou .xlsx")
+    parser.add_argument("--semente", type=int, default=1)
+    args = parser.parse_args()
+    if args.arquivo.lower().endswith(".xlsx"):
+        escrever_excel(args.arquivo, args.quantidade, args.semente)
+    else:
+        escrever_csv(args.arquivo, args.quantidade, args.semente)
+    print(f"{args.quantidade} colaboradores em {args.arquivo}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+# gestao_rh_cli.py
+# Linha de comando para rotinas agendadas (importação, exportação, contracheques, backup)
+# sem carregar customtkinter/tkinter. Pasta de dados: --dir ou GESTAO_RH_DIR.
+#
+#   python -m gestao_rh_cli --dir /srv/gestaorh import planilha.xlsx
+#   python -m gestao_rh_cli export colaboradores.csv --filtro "analista"
+#   python -m gestao_rh_cli payslips --combinado --saida /srv/gestaorh/folha
+#   python -m gestao_rh_cli payroll
+#   python -m gestao_rh_cli backup /srv/backups/employees.db.gz --verificar
+#   python -m gestao_rh_cli backup --incremental /srv/backups/employees_0800.jsonl.gz
+#   python -m gestao_rh_cli restore /srv/backups/employees.db.gz /srv/backups/employees_*.jsonl.gz
+#   python -m gestao_rh_cli stats
+#   python -m gestao_rh_cli summary --por cargo --csv > folha_por_cargo.csv
+#   python -m gestao_rh_cli attachments --limpar
+#   python -m gestao_rh_cli cpf --remover-duplicados
+#   python -m gestao_rh_cli --diagnostico --trace import.jsonl import planilha.xlsx
+#   python -m gestao_rh_cli diagnostico import.jsonl --top 20
+import argparse
+import csv
+import os
+import sys
+from datetime import datetime
+
+import gestao_rh_core as core
+import gestao_rh_diagnostico as diag
+
+def _mostrar_progresso(texto):
+    # uma linha só, reescrita; vai para stderr para não misturar com a saída do comando
+    sys.stderr.write(f"\r{texto}")
+    sys.stderr.flush()
+
+def cmd_import(args):
+    def progresso(linhas, taxa):
+        _mostrar_progresso(f"Importando... {linhas} linhas ({taxa:,.0f}/s)")
+    if args.arquivo.lower().endswith((".xls", ".xlsx")):
+        ok, msg = core.import_excel(args.arquivo, progresso=progresso, por_cpf=args.por_cpf)
+    else:
+        ok, msg = core.import_csv(args.arquivo, progresso=progresso, por_cpf=args.por_cpf)
+    sys.stderr.write("\n")
+    return ok, msg
+
+def cmd_export(args):
+    colunas = args.colunas.split(",") if args.colunas else None
+    if args.arquivo.lower().endswith(".xlsx"):
+        return core.export_excel(args.arquivo, args.filtro, colunas)
+    return core.export_csv(args.arquivo, args.filtro, colunas)
+
+def cmd_payslips(args):
+    def progresso(feitos, total):
+        _mostrar_progresso(f"Contracheques: {feitos}/{total}")
+    res = core.gerar_contracheques_lote(args.filtro, pasta=args.saida, combinado=args.combinado,
+                                        workers=args.workers, progresso=progresso)
+    sys.stderr.write("\n")
+    return res
+
+def cmd_payroll(args):
+    def progresso(feitos, total):
+        _mostrar_progresso(f"Folha: {feitos}/{total}")
+    res = core.recalcular_folha(args.filtro, progresso=progresso)
+    sys.stderr.write("\n")
+    return res
+
+def cmd_summary(args):
+    if args.verificar or args.corrigir:
+        return core.verificar_resumo_folha(corrigir=args.corrigir)
+    linhas = core.resumo_folha(args.por)
+    if args.csv:
+        saida = csv.writer(sys.stdout, lineterminator="\n")
+        saida.writerow((args.por,) + core.COLUNAS_RESUMO[1:])
+        saida.writerows(linhas)
+        return True, ""
+    largura = max([len(args.por)] + [len(r[0]) for r in linhas])
+    texto = [f"{args.por.capitalize():<{largura}}  {'Qtd':>7}" +
+             "".join(f"{c.capitalize():>16}" for c in core.COLUNAS_RESUMO[2:])]
+    for grupo, qtd, *valores in linhas:
+        texto.append(f"{grupo:<{largura}}  {qtd:>7}" + "".join(f"{v:>16,.2f}" for v in valores))
+    return True, "\n".join(texto)
+
+def _progresso_paginas(rotulo, unidade="páginas"):
+    def progresso(copiadas, total):
+        _mostrar_progresso(f"{rotulo}: {copiadas}/{total} {unidade}")
+    return progresso
+
+def cmd_backup(args):
+    ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if args.incremental:
+        destino = args.destino or os.path.join(core.APP_DIR, f"employees_incremental_{ts}.jsonl.gz")
+        res = core.backup_incremental(destino, progresso=_progresso_paginas("Incremental", "linhas"))
+        sys.stderr.write("\n")
+        return res
+    destino = args.destino or os.path.join(core.APP_DIR, f"employees_backup_{ts}.db")
+    res = core.backup_db(destino, progresso=_progresso_paginas("Backup"), verificar=args.verificar,
+                         comprimir=True if args.comprimir else None)
+    sys.stderr.write("\n")
+    return res
+
+def cmd_restore(args):
+    if args.incrementais:
+        return core.restaurar_incremental(args.origem, args.incrementais, verificar=not args.sem_verificar)
+    res = core.restaurar_db(args.origem, progresso=_progresso_paginas("Restauração"),
+                            verificar=not args.sem_verificar)
+    sys.stderr.write("\n")
+    return res
+
+def cmd_stats(args):
+    est = core.estatisticas()
+    linhas = [
+        f"Banco:          {est['banco']} ({est['tamanho_mb']:.1f} MB)",
+        f"Colaboradores:  {est['colaboradores']}",
+        f"Empresas:       {est['empresas']}",
+        f"Folha bruta:    R$ {est['folha_bruta']:,.2f}",
+        f"Folha líquida:  R$ {est['folha_liquida']:,.2f}",
+        f"Busca FTS5:     {'sim' if est['busca_fts'] else 'não'}",
+        f"CPF único:      {'sim' if est['cpf_unico'] else 'não (CPFs repetidos: veja o comando cpf)'}",
+        f"Anexos:         {est['anexos']} arquivo(s), {est['anexos_mb']:.1f} MB, "
+        f"{est['anexos_referencias']} referência(s)",
+    ]
+    return True, "\n".join(linhas)
+
+def cmd_attachments(args):
+    if args.internalizar:
+        def progresso(feitos, total):
+            _mostrar_progresso(f"Anexos: {feitos}/{total}")
+        ok, msg = core.internalizar_anexos(progresso=progresso)
+        sys.stderr.write("\n")
+        if not ok:
+            return ok, msg
+        print(msg)
+    if args.limpar:
+        return core.limpar_anexos(carencia=args.carencia * 3600)
+    return core.verificar_anexos(corrigir=args.corrigir)
+
+def cmd_cpf(args):
+    ok, msg = core.verificar_cpf_duplicados(corrigir=args.remover_duplicados)
+    if not ok:
+        msg += "\nPara remover: python -m gestao_rh_cli cpf --remover-duplicados"
+    return ok, msg
+
+def cmd_diagnostico(args):
+    if not os.path.exists(args.arquivo):
+        return False, f"Arquivo não encontrado: {args.arquivo}"
+    if not diag.carregar_trace(args.arquivo):
+        return False, f"Nenhuma operação em {args.arquivo}."
+    return True, diag.relatorio(args.top)
+
+def criar_parser():
+    parser = argparse.ArgumentParser(prog="gestao_rh_cli", description="Gestão RH sem interface gráfica")
+    parser.add_argument("--dir", help=f"pasta de dados (padrão: ${core.APP_DIR_ENV} ou {core.APP_DIR})")
+    parser.add_argument("--diagnostico", action="store_true",
+                        help="mede operações e SQL e mostra o relatório no fim (em stderr)")
+    parser.add_argument("--trace", help="grava cada operação medida neste arquivo JSON Lines")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("import", help="importa colaboradores de CSV/Excel")
+    p.add_argument("arquivo")
+    p.add_argument("--por-cpf", action="store_true",
+                   help="CPF já cadastrado atualiza o registro em vez de ser rejeitado")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("export", help="exporta colaboradores para CSV/Excel (.xlsx)")
+    p.add_argument("arquivo")
+    p.add_argument("--filtro", default="", help="mesmo texto da busca do aplicativo")
+    p.add_argument("--colunas", help="lista separada por vírgulas (padrão: todas)")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("payslips", help="gera contracheques em lote")
+    p.add_argument("--filtro", default="")
+    p.add_argument("--saida", help="pasta de destino (padrão: Relatorios/contracheques_<data>)")
+    p.add_argument("--combinado", action="store_true", help="um único PDF com todas as páginas")
+    p.add_argument("--workers", type=int, help="processos paralelos (padrão: nº de CPUs)")
+    p.set_defaults(func=cmd_payslips)
+
+    p = sub.add_parser("payroll", help="recalcula o salário líquido (regras de gestao_rh_folha)")
+    p.add_argument("--filtro", default="", help="só os colaboradores da busca (padrão: todos)")
+    p.set_defaults(func=cmd_payroll)
+
+    p = sub.add_parser("backup", help="copia o banco de dados a quente (API de backup do SQLite)")
+    p.add_argument("destino", nargs="?", help="arquivo .db ou .db.gz (padrão: na pasta de dados)")
+    p.add_argument("--verificar", action="store_true", help="roda integrity_check na cópia")
+    p.add_argument("--comprimir", action="store_true", help="grava compactado (.gz)")
+    p.add_argument("--incremental", action="store_true",
+                   help="só as alterações desde o último backup (completo ou incremental)")
+    p.set_defaults(func=cmd_backup)
+
+    p = sub.add_parser("restore", help="restaura um backup (.db ou .db.gz) no banco atual")
+    p.add_argument("origem", help="backup completo (base)")
+    p.add_argument("incrementais", nargs="*", help="backups incrementais a reaplicar sobre a base")
+    p.add_argument("--sem-verificar", action="store_true", help="pula o integrity_check do backup")
+    p.set_defaults(func=cmd_restore)
+
+    p = sub.add_parser("stats", help="resumo do cadastro e da folha")
+    p.set_defaults(func=cmd_stats)
+
+    p = sub.add_parser("summary", help="totais da folha por empresa ou cargo")
+    p.add_argument("--por", choices=core.RESUMO_AGRUPAMENTOS, default="empresa")
+    p.add_argument("--csv", action="store_true", help="saída em CSV")
+    p.add_argument("--verificar", action="store_true", help="confere o resumo contra um recálculo completo")
+    p.add_argument("--corrigir", action="store_true", help="como --verificar, reconstruindo o resumo se divergir")
+    p.set_defaults(func=cmd_summary)
+
+    p = sub.add_parser("attachments", help="depósito de anexos: confere, copia caminhos antigos, limpa sem uso")
+    p.add_argument("--internalizar", action="store_true",
+                   help="copia para o depósito os anexos gravados como caminho de arquivo")
+    p.add_argument("--limpar", action="store_true", help="apaga os anexos sem nenhuma referência")
+    p.add_argument("--carencia", type=float, default=core.ANEXOS_CARENCIA_S / 3600,
+                   help="horas sem referência antes de apagar (padrão: %(default)g)")
+    p.add_argument("--corrigir", action="store_true", help="recalcula as contagens de referência divergentes")
+    p.set_defaults(func=cmd_attachments)
+
+    p = sub.add_parser("cpf", help="CPFs repetidos que mantêm o CPF único desativado")
+    p.add_argument("--remover-duplicados", action="store_true",
+                   help="mantém o registro mais recente de cada CPF; os outros vão para um CSV em Relatorios")
+    p.set_defaults(func=cmd_cpf)
+
+    p = sub.add_parser("diagnostico", help="relatório de um arquivo gravado com --trace")
+    p.add_argument("arquivo", help="arquivo JSON Lines gravado com --trace")
+    p.add_argument("--top", type=int, default=10, help="quantas operações lentas listar")
+    p.set_defaults(func=cmd_diagnostico)
+    return parser
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    if args.dir:
+        core.configurar_diretorio(args.dir)
+    if args.diagnostico or args.trace:
+        diag.ligar(trace=args.trace)
+    core.inicializar_sistema()
+    if not core.CPF_UNICO and args.func is not cmd_cpf:
+        print(f"Aviso: {core.CPF_UNICO_DESATIVADO} (python -m gestao_rh_cli cpf).", file=sys.stderr)
+    try:
+        ok, msg = args.func(args)
+    except Exception as e:
+        ok, msg = False, f"Erro: {e}"
+    finally:
+        core.fechar_conexao()
+    if msg:
+        print(msg, file=sys.stdout if ok else sys.stderr)
+    if args.diagnostico:
+        print("\n" + diag.relatorio(), file=sys.stderr)
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    # necessário para o ProcessPoolExecutor no executável congelado (PyInstaller)
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
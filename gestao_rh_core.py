@@ -0,0 +1,2409 @@
+# gestao_rh_core.py
+# Banco, importação/exportação e contracheques, sem interface gráfica: usado pelo
+# aplicativo (gestao_rh_v1_2_1.py) e pela linha de comando (gestao_rh_cli.py).
+import os
+import re
+import shutil
+import sqlite3
+import itertools
+import gzip
+import hashlib
+import importlib.util
+import json
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError
+from contextlib import contextmanager
+from datetime import datetime
+
+from gestao_rh_folha import COLUNAS_FOLHA, para_real as _para_real, valor_moeda, salario_liquido
+import gestao_rh_folha as folha
+import gestao_rh_diagnostico as diag
+
+# opcionais: carregados no primeiro uso (importar/exportar/PDF), não na abertura
+pd = np = None
+rcanvas = A4 = colors = ImageReader = None
+pdfium = None
+_opcionais = set()  # já tentados
+
+def _carregar_pandas():
+    global pd
+    if "pandas" not in _opcionais:
+        try:
+            import pandas as pd
+        except Exception:
+            pd = None
+        _opcionais.add("pandas")
+    return pd
+
+def _carregar_numpy():
+    global np
+    if "numpy" not in _opcionais:
+        try:
+            import numpy as np
+        except Exception:
+            np = None
+        _opcionais.add("numpy")
+    return np
+
+def _carregar_reportlab():
+    global rcanvas, A4, colors, ImageReader
+    if "reportlab" not in _opcionais:
+        try:
+            from reportlab.lib.pagesizes import A4
+            from reportlab.lib import colors
+            from reportlab.pdfgen import canvas as rcanvas
+            from reportlab.lib.utils import ImageReader
+        except Exception:
+            rcanvas = None
+        _opcionais.add("reportlab")
+    return rcanvas is not None
+
+def _carregar_pdfium():
+    # renderiza a página do PDF nas miniaturas de anexos; sem ele, pypdf (ver _renderizar_primeira_pagina)
+    global pdfium
+    if "pypdfium2" not in _opcionais:
+        try:
+            import pypdfium2 as pdfium
+        except Exception:
+            pdfium = None
+        _opcionais.add("pypdfium2")
+    return pdfium
+
+# -----------------------
+# CONFIG
+# pasta de dados: variável de ambiente GESTAO_RH_DIR ou configurar_diretorio()
+APP_DIR_ENV = "GESTAO_RH_DIR"
+
+def _pasta_padrao():
+    # Windows mantém C:\GestaoRH (instalações existentes); nos demais sistemas um caminho
+    # relativo cairia no diretório corrente, então usa a pasta de dados do usuário (XDG)
+    if os.name == "nt":
+        return r"C:\GestaoRH"
+    base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "GestaoRH")
+
+APP_DIR = os.environ.get(APP_DIR_ENV) or _pasta_padrao()
+DB_PATH = os.path.join(APP_DIR, "employees.db")
+LOGO_PATH = os.path.join(APP_DIR, "logo.png")
+REPORTS_DIR = os.path.join(APP_DIR, "Relatorios")
+ANEXOS_DIR = os.path.join(APP_DIR, "anexos")
+MINIATURAS_DIR = os.path.join(APP_DIR, "cache", "miniaturas")
+
+def configurar_diretorio(app_dir):
+    # troca a pasta de dados (fecha a conexão aberta no banco anterior)
+    global APP_DIR, DB_PATH, LOGO_PATH, REPORTS_DIR, ANEXOS_DIR, MINIATURAS_DIR, _miniaturas
+    fechar_conexao()
+    APP_DIR = app_dir
+    DB_PATH = os.path.join(APP_DIR, "employees.db")
+    LOGO_PATH = os.path.join(APP_DIR, "logo.png")
+    REPORTS_DIR = os.path.join(APP_DIR, "Relatorios")
+    ANEXOS_DIR = os.path.join(APP_DIR, "anexos")
+    MINIATURAS_DIR = os.path.join(APP_DIR, "cache", "miniaturas")
+    with _miniaturas_lock:
+        _miniaturas = None
+
+# -----------------------
+# DB: esquema base (colunas atuais)
+BASE_COLUMNS = [
+    ("id", "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    ("nome", "TEXT"),
+    ("identidade", "TEXT"),
+    ("nome_mae", "TEXT"),
+    ("nome_pai", "TEXT"),
+    ("cpf", "TEXT"),
+    ("cep", "TEXT"),
+    ("endereco", "TEXT"),
+    ("numero", "TEXT"),
+    ("bairro", "TEXT"),
+    ("complemento", "TEXT"),
+    ("nascimento", "TEXT"),
+    ("telefone", "TEXT"),
+    ("email", "TEXT"),
+    ("cargo", "TEXT"),
+    ("salario_inicial", "REAL"),
+    ("salario_bruto", "REAL"),
+    ("optante_passagem", "TEXT"),
+    ("valor_passagem", "REAL"),
+    ("abono_salarial", "TEXT"),
+    ("valor_abono", "REAL"),
+    ("salario_liquido", "REAL"),
+    ("fim_contrato", "TEXT"),
+    ("empresa", "TEXT"),
+    ("endereco_empresa", "TEXT"),
+    ("numero_empresa", "TEXT"),
+    ("cidade", "TEXT"),
+    ("bairro_empresa", "TEXT"),
+    ("cnpj", "TEXT"),
+    ("telefone_empresa", "TEXT"),
+    ("email_empresa", "TEXT"),
+    ("anexo_pdf", "TEXT")  # PDF anexado (opcional): anexos/.. no depósito ou caminho antigo
+]
+
+# -----------------------
+# WIZARD / INIT
+@diag.instrumentar("db")
+def inicializar_sistema():
+    global BUSCA_FTS, CPF_UNICO
+    os.makedirs(APP_DIR, exist_ok=True)
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    # cria logo exemplo se não existir
+    if not os.path.exists(LOGO_PATH):
+        try:
+            from PIL import Image, ImageDraw
+            img = Image.new("RGB", (480, 140), color="#2b5797")
+            draw = ImageDraw.Draw(img)
+            text = "Gestão RH"
+            # centraliza texto grosso
+            # textsize() saiu no Pillow 10; sem o logo gravado, toda abertura tentaria de novo
+            esq, topo, dir_, base = draw.textbbox((0, 0), text)
+            w, h = dir_ - esq, base - topo
+            draw.text(((480 - w) / 2, (140 - h) / 2), text, fill="white")
+            img.save(LOGO_PATH)
+        except Exception:
+            pass
+    # criar DB e migrar esquema (banco já na versão atual: só a leitura do user_version)
+    with usar_conexao() as conn:
+        versao = _versao_banco(conn)
+        legado = versao < len(MIGRACOES) and conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='colaboradores'").fetchone()
+        _migrar(conn, versao)
+        BUSCA_FTS = conn.execute("SELECT 1 FROM sqlite_master WHERE name='colaboradores_fts'").fetchone() is not None
+        # banco com CPFs repetidos fica sem o índice único até o usuário resolvê-los
+        CPF_UNICO = _garantir_indice_cpf(conn)
+    if legado:
+        # devolve ao sistema de arquivos o espaço das colunas de empresa repetidas
+        with _db_lock:
+            conectar().execute("VACUUM")
+
+# -----------------------
+# Migrações numeradas: o passo n leva o banco da versão n-1 para n numa transação só, que
+# grava também PRAGMA user_version = n (transacional), então um passo que falha não deixa
+# nada pela metade e é refeito na próxima abertura. Passo novo entra no fim de MIGRACOES
+# (ex.: coluna nova em BASE_COLUMNS: _garantir_colunas + _criar_view_colaboradores(conn,
+# recriar=True)); passo já publicado não muda mais.
+#
+# Antes das migrações numeradas o user_version guardava uma impressão digital (crc32) do
+# esquema; esses bancos já têm o esquema da versão 1, que é idempotente e os confere.
+VERSOES_IMPRESSAO = {1224457481, 1103924272, 267477272}  # ESQUEMA_REVISAO 1, 2 e 3
+
+def _versao_banco(conn):
+    versao = conn.execute("PRAGMA user_version").fetchone()[0]
+    if versao in VERSOES_IMPRESSAO:
+        return 0
+    if versao > len(MIGRACOES):
+        raise RuntimeError(f"Banco de dados de uma versão mais nova do sistema (esquema {versao}; "
+                           f"esta versão conhece até {len(MIGRACOES)}). Atualize o programa.")
+    return versao
+
+def _migrar(conn, versao):
+    # aplica os passos pendentes a partir de `versao`; devolve os números aplicados
+    aplicados = []
+    for numero, (descricao, passo) in enumerate(MIGRACOES[versao:], start=versao + 1):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            passo(conn)
+            conn.execute(f"PRAGMA user_version = {numero}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        aplicados.append(numero)
+    return aplicados
+
+def _executar_script(conn, script):
+    # como executescript, mas sem o COMMIT implícito: cada comando entra na transação aberta
+    # (complete_statement sabe que o ";" dentro de um CREATE TRIGGER não encerra o comando)
+    inicio = 0
+    for i, ch in enumerate(script):
+        if ch == ";" and sqlite3.complete_statement(script[inicio:i + 1]):
+            conn.execute(script[inicio:i + 1])
+            inicio = i + 1
+
+def _migracao_esquema_normalizado(conn):
+    # esquema base: empresas + colaboradores_base, view plana, busca, diário e resumo da folha.
+    # Idempotente: cria o que falta num banco novo, num antigo de tabela plana ou num da
+    # época da impressão digital
+    legado = conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='colaboradores'").fetchone()
+    if legado:
+        # banco antigo (tabela plana): completa as colunas antes de migrar
+        _garantir_colunas(conn, "colaboradores", BASE_COLUMNS)
+    _executar_script(conn, f"""
+        CREATE TABLE IF NOT EXISTS empresas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            {", ".join(f"{c} TEXT" for c in EMPRESA_COLUMNS)}
+        );
+        CREATE TABLE IF NOT EXISTS colaboradores_base (
+            {", ".join(f"{n} {t}" for n, t in FUNCIONARIO_COLUMNS)},
+            empresa_id INTEGER REFERENCES empresas(id)
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_empresas_cnpj ON empresas(cnpj);
+        CREATE INDEX IF NOT EXISTS idx_empresas_empresa ON empresas(empresa);
+        CREATE INDEX IF NOT EXISTS idx_colaboradores_cargo ON colaboradores_base(cargo);
+        CREATE INDEX IF NOT EXISTS idx_colaboradores_empresa ON colaboradores_base(empresa_id);
+    """)
+    alterou = _garantir_colunas(conn, "colaboradores_base", FUNCIONARIO_COLUMNS)
+    alterou |= _garantir_colunas(conn, "empresas", [(c, "TEXT") for c in EMPRESA_COLUMNS])
+    if legado:
+        _migrar_tabela_plana(conn)
+    _criar_view_colaboradores(conn, recriar=alterou)
+    _garantir_indice_busca(conn, reconstruir=bool(legado))
+    _garantir_diario_alteracoes(conn)
+    _garantir_resumo_folha(conn)
+
+def _migracao_valores_reais(conn):
+    # colunas REAL com texto gravado pelo import_csv antigo ("1.234,56", ""): vira número
+    # (ou NULL, se vazio); texto que não é número fica como está, para não perder o dado
+    conn.create_function("real_ou_texto", 1, _real_ou_texto, deterministic=True)
+    reais = [c for c, t in FUNCIONARIO_COLUMNS if t == "REAL"]
+    sets = ", ".join(f"{c} = CASE WHEN typeof({c}) = 'text' THEN real_ou_texto({c}) ELSE {c} END" for c in reais)
+    texto = " OR ".join(f"(typeof({c}) = 'text' AND real_ou_texto({c}) IS NOT {c})" for c in reais)
+    conn.execute(f"UPDATE colaboradores_base SET {sets} WHERE {texto}")
+
+def _migracao_anexos(conn):
+    # depósito de anexos por conteúdo: tabela de referências e triggers (ver _garantir_anexos)
+    _garantir_anexos(conn)
+
+def _migracao_cpf_unico(conn):
+    # índice único pela chave do CPF. A migração não apaga nada: com CPFs repetidos o índice
+    # fica para depois (verificar_cpf_duplicados, a pedido do usuário)
+    _garantir_indice_cpf(conn)
+
+MIGRACOES = [
+    ("esquema normalizado (empresas, view, busca, diário, resumo da folha)", _migracao_esquema_normalizado),
+    ("valores numéricos gravados como texto nas colunas REAL", _migracao_valores_reais),
+    ("depósito de anexos com contagem de referências", _migracao_anexos),
+    ("CPF único (índice adiado se houver CPFs repetidos)", _migracao_cpf_unico),
+]
+
+def _garantir_colunas(conn, tabela, colunas):
+    cur_cols = {r[1] for r in conn.execute(f"PRAGMA table_info({tabela})")}
+    alterou = False
+    # add missing columns
+    for col_name, col_type in colunas:
+        if col_name in cur_cols or col_name == "id":
+            continue
+        conn.execute(f"ALTER TABLE {tabela} ADD COLUMN {col_name} {col_type}")
+        alterou = True
+    return alterou
+
+# -----------------------
+# Esquema normalizado: os dados do empregador ficam uma vez em `empresas` (chave: CNPJ)
+# e `colaboradores_base` guarda só empresa_id. A view `colaboradores` mantém o formato
+# plano de BASE_COLUMNS (formulário, importação, exportação, SELECT *), e os triggers
+# INSTEAD OF gravam nas duas tabelas.
+EMPRESA_COLUMNS = ["empresa", "endereco_empresa", "numero_empresa", "cidade",
+                   "bairro_empresa", "cnpj", "telefone_empresa", "email_empresa"]
+FUNCIONARIO_COLUMNS = [c for c in BASE_COLUMNS if c[0] not in EMPRESA_COLUMNS]
+_EMPRESA_DADOS = [c for c in EMPRESA_COLUMNS if c != "cnpj"]
+
+def _sql_tem_cnpj(p):
+    return f"COALESCE(TRIM({p}.cnpj), '') <> ''"
+
+def _sql_tem_empresa(p):
+    return "(" + " OR ".join(f"COALESCE({p}.{c}, '') <> ''" for c in _EMPRESA_DADOS) + ")"
+
+def _sql_empresa_sem_cnpj(p):
+    # empresa sem CNPJ: identificada pela combinação dos demais campos
+    return "e.cnpj IS NULL AND " + " AND ".join(f"e.{c} IS {p}.{c}" for c in _EMPRESA_DADOS)
+
+def _sql_empresa_id(p):
+    return (f"CASE WHEN {_sql_tem_cnpj(p)} "
+            f"THEN (SELECT e.id FROM empresas e WHERE e.cnpj = TRIM({p}.cnpj)) "
+            f"ELSE (SELECT e.id FROM empresas e WHERE {_sql_empresa_sem_cnpj(p)}) END")
+
+def _sql_gravar_empresa(p, origem=None):
+    # upsert pelo CNPJ; campo vazio não apaga o que a empresa já tem cadastrado.
+    # p é a linha `new` do trigger ou, com origem, o apelido de uma tabela com várias linhas
+    de = f" FROM {origem} {p}" if origem else ""
+    distintas = "DISTINCT " if origem else ""
+    dados = ", ".join(_EMPRESA_DADOS)
+    novos = ", ".join(f"{p}.{c}" for c in _EMPRESA_DADOS)
+    mescla = {c: f"COALESCE(NULLIF(excluded.{c}, ''), {c})" for c in _EMPRESA_DADOS}
+    sets = ", ".join(f"{c} = {m}" for c, m in mescla.items())
+    mudou = " OR ".join(f"{m} IS NOT {c}" for c, m in mescla.items())
+    return f"""
+        INSERT INTO empresas (cnpj, {dados}) SELECT TRIM({p}.cnpj), {novos}{de} WHERE {_sql_tem_cnpj(p)}
+            ON CONFLICT(cnpj) DO UPDATE SET {sets} WHERE {mudou};
+        INSERT INTO empresas (cnpj, {dados}) SELECT {distintas}NULL, {novos}{de}
+            WHERE NOT {_sql_tem_cnpj(p)} AND {_sql_tem_empresa(p)}
+            AND NOT EXISTS (SELECT 1 FROM empresas e WHERE {_sql_empresa_sem_cnpj(p)});"""
+
+def _migrar_tabela_plana(conn):
+    dados = ", ".join(_EMPRESA_DADOS)
+    func = ", ".join(c[0] for c in FUNCIONARIO_COLUMNS)
+    _executar_script(conn, f"""
+        -- com CNPJ: vale o cadastro mais recente de cada CNPJ
+        INSERT OR IGNORE INTO empresas (cnpj, {dados})
+            SELECT TRIM(cnpj), {dados} FROM colaboradores
+            WHERE id IN (SELECT MAX(id) FROM colaboradores WHERE {_sql_tem_cnpj('colaboradores')} GROUP BY TRIM(cnpj));
+        INSERT INTO empresas (cnpj, {dados})
+            SELECT DISTINCT NULL, {dados} FROM colaboradores c
+            WHERE NOT {_sql_tem_cnpj('c')} AND {_sql_tem_empresa('c')};
+        INSERT INTO colaboradores_base ({func}, empresa_id)
+            SELECT {", ".join(f"c.{c[0]}" for c in FUNCIONARIO_COLUMNS)}, {_sql_empresa_id('c')}
+            FROM colaboradores c;
+        -- preserva o contador do AUTOINCREMENT (ids excluídos não são reaproveitados)
+        UPDATE sqlite_sequence SET seq = MAX(seq, (SELECT seq FROM sqlite_sequence WHERE name = 'colaboradores'))
+            WHERE name = 'colaboradores_base';
+        INSERT INTO sqlite_sequence (name, seq)
+            SELECT 'colaboradores_base', seq FROM sqlite_sequence WHERE name = 'colaboradores'
+            AND NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = 'colaboradores_base');
+        DELETE FROM sqlite_sequence WHERE name = 'colaboradores';
+        DROP TABLE colaboradores;
+    """)
+
+def _criar_view_colaboradores(conn, recriar=False):
+    if recriar:
+        conn.execute("DROP VIEW IF EXISTS colaboradores")  # leva junto os triggers INSTEAD OF
+    campos = ", ".join(f"e.{c} AS {c}" if c in EMPRESA_COLUMNS else f"c.{c} AS {c}" for c, _ in BASE_COLUMNS)
+    func = [c[0] for c in FUNCIONARIO_COLUMNS if c[0] != "id"]
+    _executar_script(conn, f"""
+        CREATE VIEW IF NOT EXISTS colaboradores AS
+            SELECT {campos} FROM colaboradores_base c LEFT JOIN empresas e ON e.id = c.empresa_id;
+        CREATE TRIGGER IF NOT EXISTS colaboradores_ins INSTEAD OF INSERT ON colaboradores BEGIN
+            {_sql_gravar_empresa('new')}
+            INSERT INTO colaboradores_base (id, {", ".join(func)}, empresa_id)
+                VALUES (new.id, {", ".join(f"new.{c}" for c in func)}, {_sql_empresa_id('new')});
+        END;
+        CREATE TRIGGER IF NOT EXISTS colaboradores_upd INSTEAD OF UPDATE ON colaboradores BEGIN
+            {_sql_gravar_empresa('new')}
+            UPDATE colaboradores_base SET {", ".join(f"{c} = new.{c}" for c in func)},
+                empresa_id = {_sql_empresa_id('new')}
+                WHERE id = old.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS colaboradores_del INSTEAD OF DELETE ON colaboradores BEGIN
+            DELETE FROM colaboradores_base WHERE id = old.id;
+        END;
+    """)
+
+# -----------------------
+# CPF único: o CPF fica gravado como foi digitado ("123.456.789-09", "12345678909"); o índice
+# único é sobre a chave normalizada (só dígitos, zeros à esquerda que o Excel come
+# devolvidos). Placeholder ("000.000.000-00"), vazio ou texto que não é CPF fica fora do
+# índice e não bloqueia nada. _chave_cpf é o espelho em Python das expressões SQL.
+_CPF_SEPARADORES = (".", "-", "/", " ")
+
+def _sql_chave_cpf(c):
+    d = c
+    for sep in _CPF_SEPARADORES:
+        d = f"replace({d}, '{sep}', '')"
+    return f"CASE WHEN length({d}) BETWEEN 1 AND 10 THEN substr('0000000000' || {d}, -11) ELSE {d} END"
+
+def _sql_cpf_identifica(c):
+    k = _sql_chave_cpf(c)
+    return f"(length({k}) = 11 AND {k} NOT GLOB '*[^0-9]*' AND replace({k}, substr({k}, 1, 1), '') <> '')"
+
+def _chave_cpf(v):
+    # mesma chave de _sql_chave_cpf; None quando o valor não identifica ninguém
+    if v is None:
+        return None
+    d = str(v)
+    for sep in _CPF_SEPARADORES:
+        d = d.replace(sep, "")
+    if 1 <= len(d) <= 10:
+        d = d.rjust(11, "0")
+    if len(d) != 11 or d.strip("0123456789") or d == d[0] * 11:
+        return None
+    return d
+
+def _cpf_repetido(erro):
+    return isinstance(erro, sqlite3.IntegrityError) and "idx_colaboradores_cpf" in str(erro)
+
+@contextmanager
+def _cpf_unico(cpf=None):
+    # CPF já cadastrado em outro colaborador: mensagem para o formulário em vez do erro do SQLite
+    try:
+        yield
+    except sqlite3.IntegrityError as e:
+        if not _cpf_repetido(e):
+            raise
+        raise ValueError(f"Já existe um colaborador com o CPF {cpf}" if cpf else
+                         "Já existe um colaborador com esse CPF") from None
+
+CPF_UNICO = False  # idx_colaboradores_cpf ativo (atualizado em inicializar_sistema)
+CPF_UNICO_DESATIVADO = ("CPF único desativado: há colaboradores com o mesmo CPF no banco. "
+                        "Corrija os CPFs no cadastro ou remova os registros repetidos")
+
+def _cpf_duplicados(conn):
+    # [(chave do CPF, "id,id,...")] de cada CPF que aparece em mais de um registro
+    chave, identifica = _sql_chave_cpf("cpf"), _sql_cpf_identifica("cpf")
+    return conn.execute(f"SELECT {chave}, group_concat(id) FROM colaboradores_base WHERE {identifica} "
+                        f"GROUP BY 1 HAVING COUNT(*) > 1 ORDER BY 1").fetchall()
+
+def _remover_cpf_duplicados(conn):
+    # fica o registro mais recente (maior id) de cada CPF; os outros saem do banco e vão para
+    # um CSV em Relatorios, que pode ser conferido e reimportado. Anexo do removido passa
+    # para o que fica, se este não tiver
+    import csv
+    chave, identifica = _sql_chave_cpf("cpf"), _sql_cpf_identifica("cpf")
+    sobras = [r[0] for r in conn.execute(
+        f"SELECT id FROM colaboradores_base WHERE {identifica} AND id NOT IN "
+        f"(SELECT MAX(id) FROM colaboradores_base WHERE {identifica} GROUP BY {chave}) ORDER BY id")]
+    if not sobras:
+        return None
+    ids = json.dumps(sobras)
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    destino = os.path.join(REPORTS_DIR, f"cpf_duplicados_removidos_{datetime.now():%Y%m%d_%H%M%S}.csv")
+    cur = conn.execute("SELECT * FROM colaboradores WHERE id IN (SELECT value FROM json_each(?)) ORDER BY id", (ids,))
+    with open(destino, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow([c[0] for c in cur.description])
+        w.writerows(cur)
+    conn.execute(f"""
+        UPDATE colaboradores_base SET anexo_pdf = d.anexo_pdf
+        FROM (SELECT {_sql_chave_cpf('cpf')} AS chave, MAX(id), anexo_pdf FROM colaboradores_base
+              WHERE id IN (SELECT value FROM json_each(?1)) AND IFNULL(anexo_pdf, '') <> '' GROUP BY chave) AS d
+        WHERE {_sql_chave_cpf('colaboradores_base.cpf')} = d.chave AND IFNULL(colaboradores_base.anexo_pdf, '') = ''
+            AND colaboradores_base.id NOT IN (SELECT value FROM json_each(?1))""", (ids,))
+    conn.execute("DELETE FROM colaboradores_base WHERE id IN (SELECT value FROM json_each(?))", (ids,))
+    return destino
+
+def _garantir_indice_cpf(conn):
+    # True se o índice único existe (ou pôde ser criado); com CPFs repetidos não cria nem apaga
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'idx_colaboradores_cpf'").fetchone():
+        return True
+    chave, identifica = _sql_chave_cpf("cpf"), _sql_cpf_identifica("cpf")
+    if conn.execute(f"SELECT 1 FROM colaboradores_base WHERE {identifica} GROUP BY {chave} "
+                    f"HAVING COUNT(*) > 1 LIMIT 1").fetchone():
+        return False
+    conn.execute(f"CREATE UNIQUE INDEX idx_colaboradores_cpf ON colaboradores_base({chave}) WHERE {identifica}")
+    return True
+
+@diag.instrumentar("db")
+def verificar_cpf_duplicados(corrigir=False):
+    # sem corrigir só relata os CPFs repetidos; corrigir=True mantém o registro mais recente
+    # de cada um, leva os outros para um CSV em Relatorios e cria o índice único
+    global CPF_UNICO
+    with usar_conexao() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        repetidos = _cpf_duplicados(conn)
+        destino = _remover_cpf_duplicados(conn) if repetidos and corrigir else None
+        CPF_UNICO = _garantir_indice_cpf(conn)
+    if not repetidos:
+        return True, "CPF único ativo: nenhum CPF repetido"
+    registros = sum(len(ids.split(",")) for _, ids in repetidos)
+    if destino:
+        return True, (f"{registros - len(repetidos)} registro(s) com CPF repetido removido(s) para:\n{destino}\n"
+                      f"CPF único ativado")
+    exemplos = "; ".join(f"{k[:3]}.{k[3:6]}.{k[6:9]}-{k[9:]} (ids {ids})" for k, ids in repetidos[:5])
+    return False, (f"{CPF_UNICO_DESATIVADO} (fica o mais recente de cada CPF; os outros vão para um CSV em "
+                   f"Relatorios).\n{len(repetidos)} CPF(s) em {registros} registros: {exemplos}"
+                   + (" ..." if len(repetidos) > 5 else ""))
+
+# -----------------------
+# Busca: índice FTS5 (external content sobre a view) nas colunas pesquisáveis, mantido
+# por triggers nas duas tabelas. remove_diacritics faz "joao" encontrar "João"; sem
+# FTS5 no SQLite, a busca volta ao LIKE.
+FTS_COLUMNS = ["nome", "cargo", "empresa", "cpf", "email", "cidade"]
+BUSCA_FTS = False
+
+def _garantir_indice_busca(conn, reconstruir=False):
+    global BUSCA_FTS
+    existe = conn.execute("SELECT 1 FROM sqlite_master WHERE name='colaboradores_fts'").fetchone()
+    cols = ", ".join(FTS_COLUMNS)
+    func_cols = ", ".join(c for c in FTS_COLUMNS if c not in EMPRESA_COLUMNS)
+    emp_cols = [c for c in FTS_COLUMNS if c in EMPRESA_COLUMNS]
+    def valores(func, emp):
+        return ", ".join(f"{emp}.{c}" if c in EMPRESA_COLUMNS else f"{func}.{c}" for c in FTS_COLUMNS)
+    mudou_emp = " OR ".join(f"old.{c} IS NOT new.{c}" for c in emp_cols)
+    try:
+        _executar_script(conn, f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS colaboradores_fts USING fts5(
+                {cols}, content='colaboradores', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS colaboradores_fts_ai AFTER INSERT ON colaboradores_base BEGIN
+                INSERT INTO colaboradores_fts(rowid, {cols})
+                    SELECT new.id, {valores('new', 'e')} FROM (SELECT 1) LEFT JOIN empresas e ON e.id = new.empresa_id;
+            END;
+            CREATE TRIGGER IF NOT EXISTS colaboradores_fts_ad AFTER DELETE ON colaboradores_base BEGIN
+                INSERT INTO colaboradores_fts(colaboradores_fts, rowid, {cols})
+                    SELECT 'delete', old.id, {valores('old', 'e')} FROM (SELECT 1) LEFT JOIN empresas e ON e.id = old.empresa_id;
+            END;
+            CREATE TRIGGER IF NOT EXISTS colaboradores_fts_au AFTER UPDATE OF {func_cols}, empresa_id ON colaboradores_base BEGIN
+                INSERT INTO colaboradores_fts(colaboradores_fts, rowid, {cols})
+                    SELECT 'delete', old.id, {valores('old', 'e')} FROM (SELECT 1) LEFT JOIN empresas e ON e.id = old.empresa_id;
+                INSERT INTO colaboradores_fts(rowid, {cols})
+                    SELECT new.id, {valores('new', 'e')} FROM (SELECT 1) LEFT JOIN empresas e ON e.id = new.empresa_id;
+            END;
+            -- empresa renomeada / mudou de cidade: reindexa só os colaboradores dela
+            CREATE TRIGGER IF NOT EXISTS empresas_fts_au AFTER UPDATE OF {", ".join(emp_cols)} ON empresas
+            WHEN {mudou_emp} BEGIN
+                INSERT INTO colaboradores_fts(colaboradores_fts, rowid, {cols})
+                    SELECT 'delete', b.id, {valores('b', 'old')} FROM colaboradores_base b WHERE b.empresa_id = old.id;
+                INSERT INTO colaboradores_fts(rowid, {cols})
+                    SELECT b.id, {valores('b', 'new')} FROM colaboradores_base b WHERE b.empresa_id = new.id;
+            END;
+        """)
+        if not existe or reconstruir:
+            # backfill único para bancos que já tinham registros
+            conn.execute("INSERT INTO colaboradores_fts(colaboradores_fts) VALUES ('rebuild')")
+        BUSCA_FTS = True
+    except sqlite3.OperationalError:
+        # SQLite sem FTS5
+        BUSCA_FTS = False
+
+def _expressao_fts(filtro):
+    # cada palavra vira um prefixo ("silv" acha "Silva"); todas precisam casar
+    termos = re.findall(r"\w+", filtro)
+    return " ".join(f'"{t}"*' for t in termos)
+
+# -----------------------
+# DB helpers
+# Uma única conexão por processo, aberta sob demanda e reutilizada por todos os helpers.
+# O acesso é serializado por um RLock, então threads de trabalho podem usá-la com segurança.
+DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # em WAL, fsync só no checkpoint
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",  # ~20 MB de page cache
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA foreign_keys=ON",
+)
+DB_STATEMENT_CACHE = 256
+
+_db_lock = threading.RLock()
+_db_conn = None
+
+def _abrir_conexao(path):
+    conn = sqlite3.connect(path, check_same_thread=False, cached_statements=DB_STATEMENT_CACHE)
+    for pragma in DB_PRAGMAS:
+        conn.execute(pragma)
+    diag.observar_conexao(conn)
+    return conn
+
+def _plano_consulta(sql):
+    # EXPLAIN QUERY PLAN dos comandos lentos (gestao_rh_diagnostico); sem abrir conexão nova
+    with _db_lock:
+        if _db_conn is None:
+            return []
+        return _db_conn.execute(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+
+diag.planejador = _plano_consulta
+
+def conectar():
+    global _db_conn
+    with _db_lock:
+        if _db_conn is None:
+            _db_conn = _abrir_conexao(DB_PATH)
+        return _db_conn
+
+@contextmanager
+def usar_conexao():
+    # segura o lock durante todo o bloco; commit no fim ou rollback em caso de erro
+    with _db_lock:
+        conn = conectar()
+        with conn:
+            yield conn
+
+# Leituras da interface (grade, painel) numa segunda conexão, fora do _db_lock: em WAL ela
+# enxerga o último commit sem esperar a transação de uma importação ou recálculo em curso.
+_leitura_lock = threading.RLock()
+_leitura_conn = None
+_leitura_dono = None  # thread que está com a conexão de leitura (interromper_leitura)
+_leitura_dono_lock = threading.Lock()
+
+@contextmanager
+def usar_leitura():
+    global _leitura_conn, _leitura_dono
+    with _leitura_lock:
+        if _leitura_conn is None:
+            _leitura_conn = _abrir_conexao(DB_PATH)
+        with _leitura_dono_lock:
+            anterior, _leitura_dono = _leitura_dono, threading.get_ident()
+        try:
+            yield _leitura_conn
+        finally:
+            with _leitura_dono_lock:
+                _leitura_dono = anterior
+
+def interromper_leitura(thread_id):
+    # interrompe a consulta em curso na conexão de leitura se ela for da thread indicada
+    # (busca substituída por uma mais nova); a leitura de outra thread não é afetada
+    with _leitura_dono_lock:
+        if _leitura_dono == thread_id and _leitura_conn is not None:
+            _leitura_conn.interrupt()
+
+def _fechar_leitura():
+    global _leitura_conn
+    with _leitura_lock:
+        if _leitura_conn is not None:
+            _leitura_conn.close()
+            _leitura_conn = None
+
+def fechar_conexao():
+    global _db_conn
+    _fechar_leitura()
+    with _db_lock:
+        if _db_conn is None:
+            return
+        try:
+            _db_conn.execute("PRAGMA optimize")
+        except Exception:
+            pass
+        _db_conn.close()
+        _db_conn = None
+
+def checkpoint_db():
+    # grava o conteúdo do WAL no arquivo principal (antes de copiar o .db)
+    with _db_lock:
+        conectar().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+def _condicao_filtro(filtro):
+    if filtro and BUSCA_FTS:
+        expr = _expressao_fts(filtro)
+        if expr:
+            return "id IN (SELECT rowid FROM colaboradores_fts WHERE colaboradores_fts MATCH ?)", (expr,)
+    if filtro:
+        return "(nome LIKE ? OR cargo LIKE ?)", (f"%{filtro}%", f"%{filtro}%")
+    return "1", ()
+
+@diag.instrumentar("db", linhas=len)
+def listar_colaboradores(filtro=""):
+    cond, params = _condicao_filtro(filtro)
+    with usar_conexao() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT * FROM colaboradores WHERE {cond} ORDER BY id DESC", params)
+        return cur.fetchall()
+
+@diag.instrumentar("db", linhas=len)
+def buscar_colaboradores(texto, limite=50):
+    # resultados ordenados por relevância (bm25); sem FTS5 cai na listagem por LIKE
+    expr = _expressao_fts(texto) if BUSCA_FTS else ""
+    if not expr:
+        return listar_colaboradores(texto)[:limite]
+    q = ("SELECT c.* FROM colaboradores_fts f JOIN colaboradores c ON c.id = f.rowid "
+         "WHERE colaboradores_fts MATCH ? ORDER BY f.rank LIMIT ?")
+    with usar_conexao() as conn:
+        return conn.execute(q, (expr, limite)).fetchall()
+
+# acesso posicional à listagem (ordem id DESC) para a grade virtual da aba Registros:
+# só as páginas tocadas são lidas (keyset em id) e as mais recentes ficam num LRU pequeno
+# As linhas em cache passam por um dicionário de textos (empresa, cidade, cargo, "Sim"/"Não"
+# se repetem entre colaboradores e viriam do SQLite como objetos distintos) e um índice
+# id -> posição dá a posição de um registro em cache em O(1).
+GRID_PAGE_SIZE = 200
+GRID_CACHE_PAGES = 8
+GRID_TEXTOS_MAX = 50000  # entradas no dicionário de textos antes de recomeçar
+
+class PaginadorColaboradores:
+    # lê pela conexão de leitura (usar_leitura), fora do lock das gravações
+    def __init__(self, filtro="", page_size=GRID_PAGE_SIZE, max_paginas=GRID_CACHE_PAGES):
+        self.filtro = filtro
+        self.page_size = page_size
+        self.max_paginas = max_paginas
+        self._cond, self._params = _condicao_filtro(filtro)
+        self._paginas = OrderedDict()  # nº da página -> lista de linhas
+        self._inicio = {}  # nº da página -> id do primeiro registro (chave do keyset)
+        self._indice = {}  # id -> posição, só dos registros em cache
+        self._textos = {}
+        with usar_leitura() as conn:
+            self.total = conn.execute(f"SELECT COUNT(*) FROM colaboradores WHERE {self._cond}", self._params).fetchone()[0]
+
+    def _id_inicial(self, n):
+        if n in self._inicio:
+            return self._inicio[n]
+        anterior = self._paginas.get(n - 1)
+        with usar_leitura() as conn:
+            if anterior and len(anterior) == self.page_size:
+                q = f"SELECT id FROM colaboradores WHERE {self._cond} AND id < ? ORDER BY id DESC LIMIT 1"
+                row = conn.execute(q, self._params + (anterior[-1][0],)).fetchone()
+            else:
+                # salto direto (barra de rolagem / último): localiza a fronteira só pelo id
+                q = f"SELECT id FROM colaboradores WHERE {self._cond} ORDER BY id DESC LIMIT 1 OFFSET ?"
+                row = conn.execute(q, self._params + (n * self.page_size,)).fetchone()
+        self._inicio[n] = row[0] if row else None
+        return self._inicio[n]
+
+    def _compactar(self, row):
+        textos = self._textos
+        return tuple([textos.setdefault(v, v) if type(v) is str else v for v in row])
+
+    def _indexar(self, n):
+        base = n * self.page_size
+        self._indice.update((r[0], base + i) for i, r in enumerate(self._paginas[n]))
+
+    def _esquecer(self, n):
+        for r in self._paginas.pop(n):
+            self._indice.pop(r[0], None)
+
+    def pagina(self, n):
+        if n in self._paginas:
+            self._paginas.move_to_end(n)
+            return self._paginas[n]
+        rows = []
+        with diag.operacao("db", "PaginadorColaboradores.pagina") as op:
+            id_ini = self._id_inicial(n)
+            if id_ini is not None:
+                q = f"SELECT * FROM colaboradores WHERE {self._cond} AND id <= ? ORDER BY id DESC LIMIT ?"
+                if len(self._textos) > GRID_TEXTOS_MAX:
+                    self._textos = {}
+                with usar_leitura() as conn:
+                    rows = [self._compactar(r) for r in conn.execute(q, self._params + (id_ini, self.page_size))]
+            op.linhas = len(rows)
+        self._paginas[n] = rows
+        self._indexar(n)
+        if len(self._paginas) > self.max_paginas:
+            self._esquecer(next(iter(self._paginas)))
+        return rows
+
+    def linha(self, idx):
+        if idx < 0 or idx >= self.total:
+            return None
+        rows = self.pagina(idx // self.page_size)
+        pos = idx % self.page_size
+        return rows[pos] if pos < len(rows) else None
+
+    def linhas(self, inicio, quantidade):
+        inicio = max(0, inicio)
+        fim = min(self.total, inicio + quantidade)
+        out = []
+        for n in range(inicio // self.page_size, (fim - 1) // self.page_size + 1 if fim > inicio else 0):
+            rows = self.pagina(n)
+            base = n * self.page_size
+            out.extend(rows[max(0, inicio - base):fim - base])
+        return out
+
+    def prefetch(self, inicio, fim):
+        inicio, fim = max(0, inicio), min(self.total, fim)
+        for n in range(inicio // self.page_size, (fim - 1) // self.page_size + 1 if fim > inicio else 0):
+            self.pagina(n)
+
+    # --- propagação de mudanças: corrige só a página afetada; as seguintes mudam de
+    # fronteira e são descartadas (relidas sob demanda). Retornam (tipo, posição).
+    def _corresponde(self, id_):
+        with usar_leitura() as conn:
+            q = f"SELECT 1 FROM colaboradores WHERE id=? AND {self._cond}"
+            return conn.execute(q, (id_,) + self._params).fetchone() is not None
+
+    def _posicao_em_cache(self, id_):
+        return self._indice.get(id_)
+
+    def _descartar_apos(self, n):
+        for k in [k for k in self._paginas if k > n]:
+            self._esquecer(k)
+        for k in [k for k in self._inicio if k > n]:
+            del self._inicio[k]
+
+    def _recontar(self):
+        self._paginas.clear()
+        self._inicio.clear()
+        self._indice.clear()
+        with usar_leitura() as conn:
+            self.total = conn.execute(f"SELECT COUNT(*) FROM colaboradores WHERE {self._cond}", self._params).fetchone()[0]
+
+    def _inserir_em(self, pos, row):
+        self.total += 1
+        n = pos // self.page_size
+        self._descartar_apos(n)
+        rows = self._paginas.get(n)
+        if rows is None:
+            self._inicio.pop(n, None)
+            return
+        rows.insert(pos % self.page_size, self._compactar(row))
+        if len(rows) > self.page_size:
+            self._indice.pop(rows.pop()[0], None)  # passa a pertencer à página seguinte
+        self._inicio[n] = rows[0][0]
+        self._indexar(n)
+
+    def _remover_em(self, pos):
+        self.total -= 1
+        n = pos // self.page_size
+        self._descartar_apos(n)
+        rows = self._paginas[n]
+        self._indice.pop(rows.pop(pos % self.page_size)[0], None)
+        if rows and len(rows) < self.page_size and (n + 1) * self.page_size <= self.total:
+            # completa a página com o próximo registro do keyset
+            q = f"SELECT * FROM colaboradores WHERE {self._cond} AND id < ? ORDER BY id DESC LIMIT 1"
+            with usar_leitura() as conn:
+                prox = conn.execute(q, self._params + (rows[-1][0],)).fetchone()
+            if prox:
+                rows.append(self._compactar(prox))
+        if rows:
+            self._inicio[n] = rows[0][0]
+            self._indexar(n)
+        else:
+            del self._paginas[n]
+            self._inicio.pop(n, None)
+
+    def _posicao_por_id(self, id_):
+        with usar_leitura() as conn:
+            q = f"SELECT COUNT(*) FROM colaboradores WHERE {self._cond} AND id > ?"
+            return conn.execute(q, self._params + (id_,)).fetchone()[0]
+
+    def aplicar_insercao(self, row):
+        if row is None or not self._corresponde(row[0]):
+            return None, None
+        pos = self._posicao_por_id(row[0])
+        self._inserir_em(pos, row)
+        return "inserido", pos
+
+    def aplicar_atualizacao(self, row):
+        if row is None:
+            return None, None
+        pos = self._posicao_em_cache(row[0])
+        corresponde = self._corresponde(row[0])
+        if pos is not None:
+            if corresponde:
+                n = pos // self.page_size
+                self._paginas[n][pos % self.page_size] = self._compactar(row)
+                return "atualizado", pos
+            self._remover_em(pos)  # saiu do filtro
+            return "removido", pos
+        if self.filtro:
+            # fora do cache: só muda algo se o registro entrou ou saiu do filtro
+            antes = self.total
+            self._recontar()
+            if self.total > antes:
+                return "inserido", self._posicao_por_id(row[0])
+            if self.total < antes:
+                return "removido", None
+        return None, None
+
+    def aplicar_remocao(self, id_):
+        pos = self._posicao_em_cache(id_)
+        if pos is None:
+            antes = self.total
+            self._recontar()
+            return ("removido", None) if self.total != antes else (None, None)
+        self._remover_em(pos)
+        return "removido", pos
+
+# os helpers de escrita devolvem a linha afetada (mesma ordem do SELECT *) para a grade
+# aplicar só a mudança. `colaboradores` é uma view (sem RETURNING nem lastrowid), então a
+# linha é relida pelo id dentro da mesma transação.
+def _ler_colaborador(conn, id_):
+    return conn.execute("SELECT * FROM colaboradores WHERE id=?", (id_,)).fetchone()
+
+@diag.instrumentar("db")
+def inserir_colaborador(d):
+    cols = [c[0] for c in BASE_COLUMNS if c[0] != "id"]
+    placeholders = ",".join("?" for _ in cols)
+    q = f"INSERT INTO colaboradores ({','.join(cols)}) VALUES ({placeholders})"
+    params = tuple(d.get(col, "") for col in cols)
+    with _cpf_unico(d.get("cpf")), usar_conexao() as conn:
+        conn.execute(q, params)
+        # AUTOINCREMENT + lock de escrita: o registro novo é o de maior id
+        id_ = conn.execute("SELECT MAX(id) FROM colaboradores_base").fetchone()[0]
+        return _ler_colaborador(conn, id_)
+
+def _atualizar_retornando(conn, set_clause, params, id_):
+    conn.execute(f"UPDATE colaboradores SET {set_clause} WHERE id=?", params + (id_,))
+    return _ler_colaborador(conn, id_)
+
+@diag.instrumentar("db")
+def atualizar_colaborador_db(id_, d):
+    cols = [c[0] for c in BASE_COLUMNS if c[0] != "id"]
+    set_clause = ",".join(f"{c}=?" for c in cols)
+    with _cpf_unico(d.get("cpf")), usar_conexao() as conn:
+        return _atualizar_retornando(conn, set_clause, tuple(d.get(col, "") for col in cols), id_)
+
+@diag.instrumentar("db")
+def atualizar_campo_db(id_, col_name, valor):
+    if col_name not in {c[0] for c in BASE_COLUMNS if c[0] != "id"}:
+        raise ValueError(f"Coluna desconhecida: {col_name}")
+    with _cpf_unico(valor), usar_conexao() as conn:
+        if col_name in COLUNAS_FOLHA:
+            conn.execute(f"UPDATE colaboradores SET {col_name}=? WHERE id=?", (valor, id_))
+            _recalcular_folha(conn, "id = ?", (id_,))
+            return _ler_colaborador(conn, id_)
+        return _atualizar_retornando(conn, f"{col_name}=?", (valor,), id_)
+
+@diag.instrumentar("db", linhas=lambda r: len(r[0]))
+def salvar_edicoes(edicoes, sobrescrever=False):
+    # sessão de edição da grade: edicoes = [(id, coluna, original, novo)], com `original` como
+    # lido do SELECT * quando a célula foi editada. Uma transação só, um executemany por coluna
+    # e o líquido recalculado uma vez para as linhas em que mudou uma coluna da folha.
+    # Conflito: no banco a célula já não tem o valor original (gravada por outra tela/usuário
+    # depois), ou o registro foi excluído, caso em que vem como (id, None, None, None).
+    # Havendo conflito e sem sobrescrever, nada é gravado; com sobrescrever, os excluídos são
+    # ignorados e o resto é gravado. Devolve (linhas relidas, conflitos [(id, coluna, original, atual)]).
+    validas = {c[0] for c in BASE_COLUMNS if c[0] != "id"}
+    por_coluna = {}
+    for id_, col, original, novo in edicoes:
+        if col not in validas:
+            raise ValueError(f"Coluna desconhecida: {col}")
+        por_coluna.setdefault(col, []).append((id_, original, novo))
+    if not por_coluna:
+        return [], []
+    em_ids = "id IN (SELECT value FROM json_each(?))"
+    ids = json.dumps(sorted({e[0] for e in edicoes}))
+    cols = list(por_coluna)
+    with _cpf_unico(), usar_conexao() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")  # trava a escrita já na conferência
+        atuais = {r[0]: r[1:] for r in conn.execute(f"SELECT id, {', '.join(cols)} FROM colaboradores WHERE {em_ids}", (ids,))}
+        conflitos = [(id_, None, None, None) for id_ in json.loads(ids) if id_ not in atuais]
+        for j, col in enumerate(cols):
+            for id_, original, _ in por_coluna[col]:
+                if id_ in atuais and atuais[id_][j] != original:
+                    conflitos.append((id_, col, original, atuais[id_][j]))
+        if conflitos and not sobrescrever:
+            return [], conflitos
+        for col, itens in por_coluna.items():
+            conn.executemany(f"UPDATE colaboradores SET {col}=? WHERE id=?",
+                             [(novo, id_) for id_, _, novo in itens if id_ in atuais])
+        folha_ids = {id_ for col in COLUNAS_FOLHA for id_, _, _ in por_coluna.get(col, ()) if id_ in atuais}
+        if folha_ids:
+            _recalcular_folha(conn, em_ids, (json.dumps(sorted(folha_ids)),))
+        linhas = conn.execute(f"SELECT * FROM colaboradores WHERE {em_ids} ORDER BY id DESC", (ids,)).fetchall()
+    return linhas, conflitos
+
+def alteraria_empresa(d):
+    # True se gravar o registro plano d mudaria os dados da empresa do CNPJ informado,
+    # isto é, também a linha de outros colaboradores (a grade precisa ser recarregada)
+    cnpj = str(d.get("cnpj") or "").strip()
+    if not cnpj:
+        return False
+    with usar_conexao() as conn:
+        atual = conn.execute(f"SELECT {', '.join(_EMPRESA_DADOS)} FROM empresas WHERE cnpj=?", (cnpj,)).fetchone()
+    if atual is None:
+        return False
+    return any(d.get(c) not in (None, "") and str(d.get(c)) != str(v) for c, v in zip(_EMPRESA_DADOS, atual))
+
+@diag.instrumentar("db")
+def excluir_colaborador_db(id_):
+    with usar_conexao() as conn:
+        row = _ler_colaborador(conn, id_)
+        conn.execute("DELETE FROM colaboradores WHERE id=?", (id_,))
+        return row
+
+# export/import helpers
+EXPORT_CHUNK_SIZE = 2000
+
+def _colunas_export(colunas):
+    todas = [c[0] for c in BASE_COLUMNS]
+    if not colunas:
+        return todas
+    invalidas = [c for c in colunas if c not in todas]
+    if invalidas:
+        raise ValueError(f"Colunas desconhecidas: {', '.join(invalidas)}")
+    return list(colunas)
+
+def iterar_colaboradores(filtro="", colunas=None, chunk=EXPORT_CHUNK_SIZE):
+    # percorre o resultado em blocos de fetchmany numa conexão de leitura própria:
+    # em WAL ela enxerga um snapshot consistente sem segurar o lock da conexão compartilhada
+    cols = _colunas_export(colunas)
+    cond, params = _condicao_filtro(filtro)
+    conn = _abrir_conexao(DB_PATH)
+    conn.execute("PRAGMA mmap_size=0")  # varredura única: não mapear o arquivo inteiro na memória
+    try:
+        cur = conn.execute(f"SELECT {','.join(cols)} FROM colaboradores WHERE {cond} ORDER BY id DESC", params)
+        while True:
+            rows = cur.fetchmany(chunk)
+            if not rows:
+                return
+            yield rows
+    finally:
+        conn.close()
+
+def _blocos_export(filtro, cols, progresso, cancelar):
+    # progresso(feitos, None) a cada bloco (o total exigiria um COUNT a mais);
+    # cancelar: threading.Event (ou similar), conferido entre blocos
+    feitos = 0
+    blocos = iterar_colaboradores(filtro, cols)
+    try:
+        for rows in blocos:
+            if cancelar is not None and cancelar.is_set():
+                raise CancelledError
+            yield rows
+            feitos += len(rows)
+            if progresso:
+                progresso(feitos, None)
+    finally:
+        blocos.close()
+
+@diag.instrumentar("db")
+def export_csv(path, filtro="", colunas=None, progresso=None, cancelar=None):
+    import csv
+    cols = _colunas_export(colunas)
+    total = 0
+    try:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(cols)
+            for rows in _blocos_export(filtro, cols, progresso, cancelar):
+                w.writerows(rows)
+                total += len(rows)
+    except CancelledError:
+        os.remove(path)
+        return False, "Exportação cancelada"
+    if not total:
+        os.remove(path)
+        return False, "Nenhum registro"
+    return True, f"CSV salvo em {path} ({total} registros)"
+
+@diag.instrumentar("db")
+def export_excel(path, filtro="", colunas=None, progresso=None, cancelar=None):
+    try:
+        from openpyxl import Workbook
+    except Exception:
+        return False, "openpyxl não instalado"
+    cols = _colunas_export(colunas)
+    # write_only: as linhas vão direto para o arquivo, sem manter a planilha em memória
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("colaboradores")
+    ws.append(cols)
+    total = 0
+    try:
+        for rows in _blocos_export(filtro, cols, progresso, cancelar):
+            for r in rows:
+                ws.append(r)
+            total += len(rows)
+    except CancelledError:
+        ws.close()  # encerra o arquivo temporário da planilha; nada é gravado em path
+        return False, "Exportação cancelada"
+    if not total:
+        ws.close()
+        return False, "Nenhum registro"
+    wb.save(path)
+    return True, f"Excel salvo em {path} ({total} registros)"
+
+# importação em lote: um único executemany por lote, tudo dentro de uma transação
+IMPORT_BATCH_SIZE = 5000
+
+def _lotes(iteravel, tamanho):
+    it = iter(iteravel)
+    while True:
+        lote = list(itertools.islice(it, tamanho))
+        if not lote:
+            return
+        yield lote
+
+@contextmanager
+def _subjournal_em_arquivo():
+    # importação: um SAVEPOINT por lote numa transação longa. Com temp_store=MEMORY o
+    # sub-journal desses savepoints fica na memória e cada lote sai mais lento que o anterior
+    # (80 mil linhas: 30 s x 13 s com o índice do CPF); em arquivo temporário, que o sistema
+    # mantém em cache, o custo por lote fica constante. Só muda fora de transação
+    with usar_conexao() as conn:
+        anterior = conn.execute("PRAGMA temp_store").fetchone()[0]
+        if not conn.in_transaction:
+            conn.execute("PRAGMA temp_store=FILE")
+    try:
+        yield
+    finally:
+        with usar_conexao() as conn:
+            if not conn.in_transaction:
+                conn.execute(f"PRAGMA temp_store={anterior}")
+
+@diag.instrumentar("db", linhas=lambda r: r[0])
+def inserir_em_lote(colunas, linhas, batch_size=IMPORT_BATCH_SIZE, progresso=None, cancelar=None):
+    # linhas: iterável de tuplas na ordem de `colunas`; consumido sob demanda (memória constante)
+    # cada lote roda num SAVEPOINT: se falhar, só ele é desfeito e contado como rejeitado.
+    # cancelar (threading.Event ou similar) é conferido entre lotes: CancelledError desfaz tudo
+    q = f"INSERT INTO colaboradores ({','.join(colunas)}) VALUES ({','.join('?' for _ in colunas)})"
+    inseridos = rejeitados = 0
+    t0 = time.perf_counter()
+    with _subjournal_em_arquivo(), usar_conexao() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        ultimo_id = conn.execute("SELECT IFNULL(MAX(id), 0) FROM colaboradores_base").fetchone()[0]
+        for lote in _lotes(linhas, batch_size):
+            if cancelar is not None and cancelar.is_set():
+                raise CancelledError
+            conn.execute("SAVEPOINT lote_import")
+            try:
+                try:
+                    conn.executemany(q, lote)
+                except sqlite3.IntegrityError as e:
+                    if not _cpf_repetido(e):
+                        raise
+                    # CPF já cadastrado ou repetido no arquivo: o lote é refeito sem essas linhas
+                    conn.execute("ROLLBACK TO lote_import")
+                    novas = _linhas_cpf_novo(conn, lote, colunas.index("cpf"))
+                    rejeitados += len(lote) - len(novas)
+                    lote = novas
+                    conn.executemany(q, lote)
+                conn.execute("RELEASE lote_import")
+                inseridos += len(lote)
+            except sqlite3.Error:
+                conn.execute("ROLLBACK TO lote_import")
+                conn.execute("RELEASE lote_import")
+                rejeitados += len(lote)
+            if progresso:
+                dt = time.perf_counter() - t0
+                progresso(inseridos + rejeitados, (inseridos + rejeitados) / dt if dt else 0.0)
+        if inseridos:
+            # líquido calculado para as linhas novas que não o trouxeram preenchido
+            _recalcular_folha(conn, "id > ? AND IFNULL(TRIM(salario_liquido), '') = ''", (ultimo_id,))
+    return inseridos, rejeitados, time.perf_counter() - t0
+
+def _linhas_cpf_novo(conn, linhas, pos):
+    # linhas cujo CPF não está no cadastro nem apareceu antes na lista (sem CPF válido passam)
+    chaves = json.dumps(sorted({_chave_cpf(row[pos]) for row in linhas} - {None}))
+    chave = _sql_chave_cpf("cpf")
+    vistos = {r[0] for r in conn.execute(
+        f"SELECT {chave} FROM colaboradores_base WHERE {chave} IN (SELECT value FROM json_each(?)) "
+        f"AND {_sql_cpf_identifica('cpf')}", (chaves,))}
+    novas = []
+    for row in linhas:
+        k = _chave_cpf(row[pos])
+        if k is None or k not in vistos:
+            vistos.add(k)
+            novas.append(row)
+    return novas
+
+@diag.instrumentar("db", linhas=lambda r: r[0] + r[1] + r[2])
+def mesclar_por_cpf(colunas, linhas, batch_size=IMPORT_BATCH_SIZE, progresso=None, cancelar=None):
+    # importação que atualiza: o CPF identifica o colaborador. CPF novo é inserido; CPF já
+    # cadastrado atualiza só as colunas que vieram no arquivo, e só se algo mudou (reimportar
+    # o mesmo arquivo não grava nada: nem diário, nem busca, nem resumo da folha). CPF
+    # repetido no arquivo: vale a primeira linha. Linha sem CPF válido é rejeitada.
+    # Cada lote vai para uma tabela temporária com a chave do CPF já calculada e entra em
+    # colaboradores_base (a view não aceita UPSERT) por um UPDATE ... FROM e um INSERT dos
+    # CPFs que faltam, os dois pelo índice idx_colaboradores_cpf. Não é INSERT ... ON CONFLICT
+    # porque no SQLite cada linha em conflito consome um id do AUTOINCREMENT: reimportar
+    # 200 mil linhas sem mudança avançaria a sequência em 200 mil.
+    # Devolve (inseridos, atualizados, inalterados, rejeitados, duplicados, segundos)
+    if "cpf" not in colunas:
+        raise ValueError("A importação por CPF precisa da coluna cpf")
+    empresa = [c for c in colunas if c in EMPRESA_COLUMNS]
+    if empresa and "cnpj" not in colunas:
+        # sem o CNPJ não dá para saber de que empresa são os dados: o colaborador já cadastrado
+        # iria para uma empresa nova, sem CNPJ, e perderia o cadastro da atual
+        raise ValueError(f"A importação por CPF com dados da empresa ({', '.join(empresa)}) precisa da coluna cnpj")
+    pos = colunas.index("cpf")
+    func = [c for c in colunas if c in {f[0] for f in FUNCIONARIO_COLUMNS}]
+    com_empresa = bool(empresa)
+    # líquido é calculado: não conta como mudança (é recalculado nas linhas que mudaram)
+    mudaveis = [c for c in func if c not in ("cpf", "salario_liquido")] + (["empresa_id"] if com_empresa else [])
+    estagio = ", ".join(f"{n} {t}" for n, t in BASE_COLUMNS if n != "id")
+    # chave_cpf sem tipo: com afinidade TEXT a comparação com a expressão do índice não o usa
+    q_estagio = (f"INSERT INTO temp.importacao_cpf ({', '.join(colunas)}, chave_cpf) "
+                 f"VALUES ({', '.join('?' for _ in colunas)}, ?)")
+    mesmo_cpf = f"{_sql_chave_cpf('c.cpf')} = s.chave_cpf AND {_sql_cpf_identifica('c.cpf')}"
+    q_atualizar = f"""
+        UPDATE colaboradores_base AS c SET {", ".join(f"{col} = s.{col}" for col in mudaveis)}
+        FROM temp.importacao_cpf s
+        WHERE {mesmo_cpf} AND ({" OR ".join(f"c.{col} IS NOT s.{col}" for col in mudaveis)})
+        RETURNING id"""
+    q_inserir = f"""
+        INSERT INTO colaboradores_base ({", ".join(func)}, empresa_id)
+            SELECT {", ".join(f"s.{col}" for col in func)}, s.empresa_id FROM temp.importacao_cpf s
+            WHERE NOT EXISTS (SELECT 1 FROM colaboradores_base c WHERE {mesmo_cpf})
+        RETURNING id"""
+    gravar_empresas = _sql_gravar_empresa("s", origem="temp.importacao_cpf")
+    inseridos = atualizados = inalterados = rejeitados = duplicados = 0
+    vistos = set()
+    t0 = time.perf_counter()
+    with _subjournal_em_arquivo(), usar_conexao() as conn:
+        if not _garantir_indice_cpf(conn):
+            # sem o índice cada linha varreria a tabela e atualizaria todos os registros do CPF
+            raise ValueError(CPF_UNICO_DESATIVADO)
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS importacao_cpf ({estagio}, chave_cpf, empresa_id INTEGER)")
+        for lote in _lotes(linhas, batch_size):
+            if cancelar is not None and cancelar.is_set():
+                raise CancelledError
+            validas, chaves = [], set()
+            for row in lote:
+                k = _chave_cpf(row[pos])
+                if k is None:
+                    rejeitados += 1
+                elif k in vistos or k in chaves:
+                    duplicados += 1
+                else:
+                    chaves.add(k)
+                    validas.append(row + (k,))
+            if validas:
+                conn.execute("SAVEPOINT lote_import")
+                try:
+                    conn.execute("DELETE FROM temp.importacao_cpf")
+                    conn.executemany(q_estagio, validas)
+                    if com_empresa:
+                        _executar_script(conn, gravar_empresas)
+                        conn.execute(f"UPDATE temp.importacao_cpf AS s SET empresa_id = {_sql_empresa_id('s')}")
+                    mudaram = [r[0] for r in conn.execute(q_atualizar)] if mudaveis else []
+                    novos = [r[0] for r in conn.execute(q_inserir)]
+                    em_ids = "id IN (SELECT value FROM json_each(?))"
+                    if mudaram:
+                        _recalcular_folha(conn, em_ids, (json.dumps(mudaram),))
+                    if novos:
+                        # linha nova mantém o líquido que veio no arquivo (como inserir_em_lote)
+                        _recalcular_folha(conn, f"{em_ids} AND IFNULL(TRIM(salario_liquido), '') = ''",
+                                          (json.dumps(novos),))
+                    conn.execute("RELEASE lote_import")
+                except sqlite3.Error:
+                    conn.execute("ROLLBACK TO lote_import")
+                    conn.execute("RELEASE lote_import")
+                    rejeitados += len(validas)
+                else:
+                    vistos |= chaves
+                    inseridos += len(novos)
+                    atualizados += len(mudaram)
+                    inalterados += len(validas) - len(novos) - len(mudaram)
+            if progresso:
+                feitos = inseridos + atualizados + inalterados + rejeitados + duplicados
+                dt = time.perf_counter() - t0
+                progresso(feitos, feitos / dt if dt else 0.0)
+        conn.execute("DROP TABLE temp.importacao_cpf")
+    return inseridos, atualizados, inalterados, rejeitados, duplicados, time.perf_counter() - t0
+
+def _resumo_mescla(inseridos, atualizados, inalterados, rejeitados, duplicados, segundos):
+    total = inseridos + atualizados + inalterados + rejeitados + duplicados
+    taxa = total / segundos if segundos else 0.0
+    msg = (f"{total} linhas em {segundos:.1f}s ({taxa:,.0f} linhas/s): {inseridos} inseridos, "
+           f"{atualizados} atualizados, {inalterados} sem alteração")
+    if rejeitados:
+        msg += f" - {rejeitados} linhas rejeitadas (sem CPF válido ou lote com erro)"
+    if duplicados:
+        msg += f" - {duplicados} linhas com CPF repetido no arquivo ignoradas (vale a primeira)"
+    return msg
+
+def _gravar_importacao(colunas, linhas, batch_size, progresso, cancelar, por_cpf):
+    # destino comum de import_csv/import_excel: acrescenta tudo ou mescla pelo CPF
+    try:
+        if por_cpf:
+            if "cpf" not in colunas:
+                return False, "A importação por CPF precisa da coluna cpf no arquivo"
+            try:
+                contagens = mesclar_por_cpf(colunas, linhas, batch_size, progresso, cancelar)
+            except ValueError as e:
+                return False, str(e)
+            return True, _resumo_mescla(*contagens)
+        return True, _resumo_importacao(*inserir_em_lote(colunas, linhas, batch_size, progresso, cancelar))
+    except CancelledError:
+        return False, IMPORTACAO_CANCELADA
+
+def _resumo_importacao(inseridos, rejeitados, segundos):
+    taxa = inseridos / segundos if segundos else 0.0
+    msg = f"{inseridos} registros importados em {segundos:.1f}s ({taxa:,.0f} linhas/s)"
+    if rejeitados:
+        msg += f" - {rejeitados} linhas rejeitadas"
+    return msg
+
+IMPORTACAO_CANCELADA = "Importação cancelada: nenhum registro foi gravado"
+
+def _mapear_cabecalho(header):
+    # posição no arquivo -> coluna do cadastro (id é sempre gerado pelo banco)
+    validas = {c[0] for c in BASE_COLUMNS if c[0] != "id"}
+    mapa = [(i, str(col).strip()) for i, col in enumerate(header) if col is not None and str(col).strip() in validas]
+    return [col for _, col in mapa], [i for i, _ in mapa]
+
+@diag.instrumentar("db")
+def import_csv(path, batch_size=IMPORT_BATCH_SIZE, progresso=None, cancelar=None, por_cpf=False):
+    import csv
+    with open(path, newline="", encoding="utf-8") as f:
+        r = csv.reader(f)
+        header = next(r, None)
+        if not header:
+            return False, "Arquivo CSV vazio"
+        colunas, indices = _mapear_cabecalho(header)
+        if not colunas:
+            return False, "Nenhuma coluna do CSV corresponde ao cadastro"
+        linhas = (tuple(row[i] if i < len(row) else "" for i in indices) for row in r if row)
+        conv = [_real_ou_texto if col in REAL_COLUMNS else None for col in colunas]
+        if any(conv):
+            # colunas REAL: "1.234,56" gravado como número, não como texto
+            linhas = (tuple(f(v) if f else v for f, v in zip(conv, linha)) for linha in linhas)
+        return _gravar_importacao(colunas, linhas, batch_size, progresso, cancelar, por_cpf)
+
+REAL_COLUMNS = {c[0] for c in BASE_COLUMNS if c[1] == "REAL"}
+# acima disso o .xlsx é lido em modo streaming (openpyxl read_only) em vez do pandas
+EXCEL_STREAMING_MIN_BYTES = 20 * 1024 * 1024
+
+def _real_ou_texto(v):
+    # coluna REAL vinda de texto: "1.234,56" vira número, vazio vira NULL e o que não é
+    # número fica como veio (não se perde o dado digitado)
+    if v is None or (isinstance(v, str) and not v.strip()):
+        return None
+    r = _para_real(v)
+    return v if r is None else r
+
+def _para_texto(v):
+    if v is None or (isinstance(v, float) and v != v):
+        return None
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))  # CPF/telefone lidos como número
+    return str(v)
+
+def _coagir_dataframe(df):
+    # conversão vetorizada por coluna: REAL -> float (NaN vira NULL), demais -> texto
+    for col in df.columns:
+        if col in REAL_COLUMNS:
+            txt = df[col].astype("string").str.strip()
+            br = txt.str.contains(",", regex=False, na=False)
+            txt = txt.where(~br, txt.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+            df[col] = pd.to_numeric(txt, errors="coerce")
+        else:
+            df[col] = df[col].astype("string")
+    return df.astype(object).where(df.notna(), None)
+
+def _linhas_dataframe(df, colunas, tamanho):
+    for inicio in range(0, len(df), tamanho):
+        bloco = _coagir_dataframe(df.iloc[inicio:inicio + tamanho][colunas].copy())
+        yield from bloco.itertuples(index=False, name=None)
+
+def _linhas_excel_streaming(ws, colunas, indices):
+    conv = [_para_real if col in REAL_COLUMNS else _para_texto for col in colunas]
+    pares = list(zip(indices, conv))
+    for row in ws.iter_rows(min_row=2, values_only=True):
+        if not row or all(v is None for v in row):
+            continue
+        yield tuple(f(row[i]) if i < len(row) else None for i, f in pares)
+
+@diag.instrumentar("db")
+def import_excel(path, batch_size=IMPORT_BATCH_SIZE, progresso=None, streaming=None, cancelar=None, por_cpf=False):
+    if streaming is None:
+        streaming = _carregar_pandas() is None or (path.lower().endswith(".xlsx") and os.path.getsize(path) >= EXCEL_STREAMING_MIN_BYTES)
+    if streaming:
+        try:
+            from openpyxl import load_workbook
+        except Exception:
+            return False, "openpyxl não instalado"
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            ws = wb.active
+            header = next(ws.iter_rows(max_row=1, values_only=True), None)
+            colunas, indices = _mapear_cabecalho(header or ())
+            if not colunas:
+                return False, "Nenhuma coluna da planilha corresponde ao cadastro"
+            linhas = _linhas_excel_streaming(ws, colunas, indices)
+            return _gravar_importacao(colunas, linhas, batch_size, progresso, cancelar, por_cpf)
+        finally:
+            wb.close()
+    validas = {c[0] for c in BASE_COLUMNS if c[0] != "id"}
+    # seleciona só as colunas conhecidas já na leitura; tudo como object para não perder zeros/CPF
+    if _carregar_pandas() is None:
+        return False, "pandas não instalado"
+    df = pd.read_excel(path, dtype=object, usecols=lambda col: str(col).strip() in validas)
+    df.columns = [str(col).strip() for col in df.columns]
+    df = df.loc[:, ~df.columns.duplicated()].dropna(how="all")
+    colunas = list(df.columns)
+    if not colunas:
+        return False, "Nenhuma coluna da planilha corresponde ao cadastro"
+    linhas = _linhas_dataframe(df, colunas, batch_size)
+    return _gravar_importacao(colunas, linhas, batch_size, progresso, cancelar, por_cpf)
+
+# -----------------------
+# PDF contracheque
+# A parte fixa do layout (faixa azul, título, logo, moldura, assinaturas) vira um form
+# XObject gravado uma vez por documento e reaplicado em cada página. O logo é decodificado
+# e reduzido uma única vez para o tamanho em que é impresso, e só é relido quando o
+# arquivo muda (mtime).
+_TEMPLATE_FORM = "contracheque_base"
+LOGO_PDF_PX = (480, 240)  # 4x a caixa de 120x60 pt do cabeçalho
+_logo_cache = {"chave": None, "imagem": None}
+
+def _logo_contracheque(logo_path):
+    try:
+        chave = (logo_path, os.path.getmtime(logo_path))
+    except OSError:
+        return None
+    if _logo_cache["chave"] != chave:
+        try:
+            from PIL import Image
+            img = Image.open(logo_path)
+            img.thumbnail(LOGO_PDF_PX)
+            imagem = ImageReader(img)
+        except Exception:
+            imagem = None
+        _logo_cache.update(chave=chave, imagem=imagem)
+    return _logo_cache["imagem"]
+
+_layout = {}
+
+def _layout_contracheque():
+    if not _layout:
+        w, h = A4
+        left_x = 40
+        line_h = 16
+        y = h - 120
+        box_y = y - line_h * 2 - line_h * 1.2
+        box_h = 140
+        _layout.update(w=w, h=h, left_x=left_x, right_x=w / 2 + 10, y=y, line_h=line_h,
+                       box_x=left_x, box_w=w - 2 * left_x, box_h=box_h, box_y=box_y,
+                       sig_y=box_y - box_h - 40)
+    return _layout
+
+def _preparar_template(c, logo_path):
+    # um form por canvas: PDFs não compartilham XObjects entre documentos
+    if getattr(c, "_contracheque_template", False):
+        return
+    L = _layout_contracheque()
+    w, h = L["w"], L["h"]
+    c.beginForm(_TEMPLATE_FORM)
+    # header band
+    c.setFillColor(colors.HexColor("#2b5797"))
+    c.rect(0, h - 90, w, 90, fill=1, stroke=0)
+    c.setFillColor(colors.white)
+    c.setFont("Helvetica-Bold", 18)
+    c.drawString(40, h - 55, "CONTRACHEQUE")
+    # logo right
+    logo = _logo_contracheque(logo_path)
+    if logo is not None:
+        try:
+            c.drawImage(logo, w - 160, h - 80, width=120, height=60, preserveAspectRatio=True)
+        except Exception:
+            pass
+    # financial block border
+    box_x, box_y, box_w, box_h = L["box_x"], L["box_y"], L["box_w"], L["box_h"]
+    c.setStrokeColor(colors.HexColor("#cfcfcf"))
+    c.setLineWidth(0.5)
+    c.rect(box_x, box_y - box_h + 20, box_w, box_h, stroke=1, fill=0)
+    c.setFillColor(colors.black)
+    c.setFont("Helvetica-Bold", 11)
+    c.drawString(box_x + 8, box_y - 10, "Detalhamento Salarial")
+    # signature lines
+    c.setFont("Helvetica", 10)
+    sig_y = L["sig_y"]
+    c.line(L["left_x"] + 20, sig_y, L["left_x"] + 200, sig_y)
+    c.drawString(L["left_x"] + 25, sig_y - 14, "Assinatura do Colaborador")
+    c.line(w - 220, sig_y, w - 40, sig_y)
+    c.drawString(w - 215, sig_y - 14, "Assinatura da Empresa")
+    c.endForm()
+    c._contracheque_template = True
+
+def _desenhar_contracheque(c, data, logo_path=None):
+    # desenha uma página (sem showPage) a partir do dict data (colunas do BASE_COLUMNS)
+    _preparar_template(c, LOGO_PATH if logo_path is None else logo_path)
+    c.doForm(_TEMPLATE_FORM)
+    L = _layout_contracheque()
+    left_x, right_x, y, line_h = L["left_x"], L["right_x"], L["y"], L["line_h"]
+    c.setFont("Helvetica", 10)
+    # employee & company
+    c.setFillColor(colors.black)
+    c.drawString(left_x, y, f"Nome: {data.get('nome') or ''}")
+    c.drawString(right_x, y, f"Empresa: {data.get('empresa') or ''}")
+    y -= line_h
+    c.drawString(left_x, y, f"Cargo: {data.get('cargo') or ''}")
+    c.drawString(right_x, y, f"CNPJ: {data.get('cnpj') or ''}")
+    y -= line_h
+    c.drawString(left_x, y, f"CPF: {data.get('cpf') or ''}")
+    c.drawString(right_x, y, f"Endereço: {data.get('endereco_empresa') or ''} {data.get('numero_empresa') or ''}")
+
+    # financial block values
+    box_x, box_w = L["box_x"], L["box_w"]
+    inner_y = L["box_y"] - 28
+    bruto = valor_moeda(data.get("salario_bruto"))
+    passagem = valor_moeda(data.get("valor_passagem"))
+    abono = valor_moeda(data.get("valor_abono"))
+    liquido = _para_real(data.get("salario_liquido"))
+    if liquido is None:
+        liquido = salario_liquido(data)
+    c.drawString(box_x + 12, inner_y, f"Salário Bruto: R$ {bruto:,.2f}")
+    c.drawRightString(box_x + box_w - 12, inner_y, f"Salário Líquido: R$ {liquido:,.2f}")
+    inner_y -= 16
+    c.drawString(box_x + 12, inner_y, f"Valor Passagem: R$ {passagem:,.2f}")
+    c.drawString(box_x + 220, inner_y, f"Abono Salarial: R$ {abono:,.2f}")
+    inner_y -= 18
+    c.drawString(box_x + 12, inner_y, f"Fim do Contrato: {data.get('fim_contrato') or 'Indeterminado'}")
+
+def _nome_arquivo_seguro(nome):
+    return re.sub(r"[^\w.-]+", "_", nome or "colaborador").strip("_") or "colaborador"
+
+@diag.instrumentar("pdf")
+def gerar_contracheque_pdf(record, abrir=True):
+    if not _carregar_reportlab():
+        raise RuntimeError("reportlab não instalado")
+    # record is tuple matching SELECT *
+    cols = [c[0] for c in BASE_COLUMNS]
+    data = dict(zip(cols, record))
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    safe_name = (data.get("nome") or "colaborador").replace(" ", "_")
+    out_path = os.path.join(REPORTS_DIR, f"contracheque_{safe_name}_{ts}.pdf")
+    c = rcanvas.Canvas(out_path, pagesize=A4)
+    _desenhar_contracheque(c, data)
+    c.showPage()
+    c.save()
+    if not abrir:
+        return out_path
+    # open file
+    try:
+        os.startfile(out_path)
+    except Exception:
+        pass  # sem visualizador (ex.: Linux): quem chamou mostra o caminho
+    return out_path
+
+# -----------------------
+# Contracheques em lote: os registros são divididos em blocos renderizados em paralelo
+# por um ProcessPoolExecutor (reportlab é CPU-bound). Nenhum visualizador é aberto.
+PAYSLIP_CHUNK_SIZE = 50
+
+def _desenhar_paginas(c, records, logo_path):
+    cols = [col[0] for col in BASE_COLUMNS]
+    for record in records:
+        _desenhar_contracheque(c, dict(zip(cols, record)), logo_path)
+        c.showPage()
+
+def _renderizar_contracheques(records, pasta, logo_path, arquivo_unico=None):
+    # roda no processo filho: um PDF por colaborador ou, com arquivo_unico, um PDF
+    # parcial com uma página por colaborador
+    _carregar_reportlab()
+    cols = [c[0] for c in BASE_COLUMNS]
+    if arquivo_unico:
+        c = rcanvas.Canvas(arquivo_unico, pagesize=A4)
+        _desenhar_paginas(c, records, logo_path)
+        c.save()
+        return len(records)
+    for record in records:
+        data = dict(zip(cols, record))
+        out_path = os.path.join(pasta, f"contracheque_{data['id']}_{_nome_arquivo_seguro(data.get('nome'))}.pdf")
+        c = rcanvas.Canvas(out_path, pagesize=A4)
+        _desenhar_contracheque(c, data, logo_path)
+        c.showPage()
+        c.save()
+    return len(records)
+
+def _juntar_pdfs(partes, destino):
+    from pypdf import PdfWriter
+    writer = PdfWriter()
+    for parte in partes:
+        writer.append(parte)
+    with open(destino, "wb") as f:
+        writer.write(f)
+    writer.close()
+
+@diag.instrumentar("pdf")
+def gerar_contracheques_lote(filtro="", pasta=None, combinado=False, workers=None, progresso=None, cancelar=None):
+    # combinado=True gera um único PDF (várias páginas); senão, um arquivo por colaborador.
+    # progresso(feitos, total) é chamado a cada bloco; cancelar: threading.Event (ou similar)
+    if not _carregar_reportlab():
+        return False, "reportlab não instalado"
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    pasta = pasta or os.path.join(REPORTS_DIR, f"contracheques_{ts}")
+    os.makedirs(pasta, exist_ok=True)
+    with usar_conexao() as conn:
+        cond, params = _condicao_filtro(filtro)
+        total = conn.execute(f"SELECT COUNT(*) FROM colaboradores WHERE {cond}", params).fetchone()[0]
+    if not total:
+        return False, "Nenhum registro"
+    # pypdf só é necessário para juntar as partes
+    juntar = combinado and importlib.util.find_spec("pypdf") is not None
+    t0 = time.perf_counter()
+    feitos = 0
+    partes = []
+    cancelado = False
+    if combinado and not juntar:
+        # sem pypdf não dá para juntar partes: um único canvas neste processo, alimentado
+        # bloco a bloco (sem carregar a tabela inteira), com progresso e cancelamento
+        destino = os.path.join(pasta, f"contracheques_{ts}.pdf")
+        c = rcanvas.Canvas(destino, pagesize=A4)
+        blocos = iterar_colaboradores(filtro, chunk=PAYSLIP_CHUNK_SIZE)
+        for bloco in blocos:
+            if cancelar is not None and cancelar.is_set():
+                cancelado = True
+                break
+            _desenhar_paginas(c, bloco, LOGO_PATH)
+            feitos += len(bloco)
+            if progresso:
+                progresso(feitos, total)
+        blocos.close()
+        if not cancelado:
+            c.save()  # o canvas só grava o arquivo no save(): cancelado, nada fica na pasta
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pendentes = set()
+            blocos = iterar_colaboradores(filtro, chunk=PAYSLIP_CHUNK_SIZE)
+            limite = (workers or os.cpu_count() or 1) * 2  # não enfileira a tabela inteira
+            for i, bloco in enumerate(blocos):
+                if cancelar is not None and cancelar.is_set():
+                    cancelado = True
+                    break
+                parte = os.path.join(pasta, f"parte_{i:06d}.pdf") if juntar else None
+                if parte:
+                    partes.append(parte)
+                pendentes.add(pool.submit(_renderizar_contracheques, bloco, pasta, LOGO_PATH, parte))
+                while len(pendentes) >= limite:
+                    prontos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                    feitos += sum(f.result() for f in prontos)
+                    if progresso:
+                        progresso(feitos, total)
+            blocos.close()
+            if cancelado:
+                for f in pendentes:
+                    f.cancel()
+            for f in pendentes:
+                if not f.cancelled():
+                    feitos += f.result()
+                    if progresso:
+                        progresso(feitos, total)
+            if juntar and not cancelado:
+                destino = os.path.join(pasta, f"contracheques_{ts}.pdf")
+                _juntar_pdfs(partes, destino)
+            for parte in partes:
+                if os.path.exists(parte):
+                    os.remove(parte)
+    segundos = time.perf_counter() - t0
+    taxa = feitos / segundos if segundos else 0.0
+    if cancelado:
+        return False, f"Geração cancelada: {feitos} de {total} contracheques em {pasta}"
+    local = destino if combinado else pasta
+    return True, f"{feitos} contracheques em {segundos:.1f}s ({taxa:,.1f} páginas/s)\n{local}"
+
+@diag.instrumentar("db")
+def estatisticas():
+    # totais pelo resumo_folha (uma linha por empresa/cargo), sem varrer os colaboradores
+    with usar_conexao() as conn:
+        colaboradores, bruto, liquido = conn.execute(
+            "SELECT COALESCE(SUM(quantidade), 0), COALESCE(SUM(bruto), 0), COALESCE(SUM(liquido), 0) "
+            "FROM resumo_folha").fetchone()
+        empresas = conn.execute("SELECT COUNT(*) FROM empresas").fetchone()[0]
+        anexos, anexos_bytes, referencias = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(tamanho), 0), COALESCE(SUM(referencias), 0) FROM anexos").fetchone()
+    tamanho = sum(os.path.getsize(DB_PATH + s) for s in ("", "-wal") if os.path.exists(DB_PATH + s))
+    return {"banco": DB_PATH, "tamanho_mb": tamanho / (1024 * 1024), "colaboradores": colaboradores,
+            "empresas": empresas, "folha_bruta": bruto / 100, "folha_liquida": liquido / 100, "busca_fts": BUSCA_FTS,
+            "cpf_unico": CPF_UNICO, "anexos": anexos, "anexos_mb": anexos_bytes / (1024 * 1024), "anexos_referencias": referencias}
+
+# -----------------------
+# Folha: recálculo do salário líquido em lote. As colunas de entrada são lidas em blocos
+# (por id) para arrays NumPy, a regra de gestao_rh_folha é aplicada vetorizada em centavos
+# e só as linhas cujo líquido mudou são gravadas, com executemany. Valores gravados como
+# texto ("1.234,56", de importações antigas) seguem pelo cálculo escalar, com a mesma regra.
+FOLHA_BLOCO = 100000
+
+def _sql_numero(col):
+    # número como está; vazio/NULL = 0; outro texto = NULL (vai para o caminho escalar)
+    return (f"CASE WHEN typeof({col}) IN ('integer', 'real') THEN {col} "
+            f"WHEN {col} IS NULL OR TRIM({col}) = '' THEN 0.0 END")
+
+def _recalcular_folha(conn, cond="1", params=(), progresso=None):
+    entradas = [_sql_numero(c) for c in COLUNAS_FOLHA]
+    regular = " AND ".join(f"({e}) IS NOT NULL" for e in entradas)
+    liquido_ok = "typeof(salario_liquido) IN ('integer', 'real')"
+    upd = "UPDATE colaboradores_base SET salario_liquido = ? WHERE id = ?"
+    total = conn.execute(f"SELECT COUNT(*) FROM colaboradores_base WHERE {cond}", params).fetchone()[0]
+    feitos = alterados = 0
+    if _carregar_numpy() is not None:
+        q = (f"SELECT id, {', '.join(entradas)}, {liquido_ok}, "
+             f"CASE WHEN {liquido_ok} THEN salario_liquido ELSE 0.0 END "
+             f"FROM colaboradores_base WHERE ({cond}) AND {regular} AND id > ? ORDER BY id LIMIT {FOLHA_BLOCO}")
+        tipos = [("id", "i8"), ("bruto", "f8"), ("passagem", "f8"), ("abono", "f8"), ("ok", "i8"), ("liquido", "f8")]
+        ultimo = -1
+        while True:
+            bloco = np.fromiter(conn.execute(q, params + (ultimo,)), dtype=tipos)
+            if not len(bloco):
+                break
+            ultimo = int(bloco["id"][-1])
+            novo = folha.liquido_centavos_np(bloco["bruto"], bloco["passagem"], bloco["abono"])
+            mudou = (bloco["ok"] == 0) | (novo != folha.centavos_np(bloco["liquido"]))
+            conn.executemany(upd, zip((novo[mudou] / 100).tolist(), bloco["id"][mudou].tolist()))
+            alterados += int(mudou.sum())
+            feitos += len(bloco)
+            if progresso:
+                progresso(feitos, total)
+        irregular = f"NOT ({regular})"
+    else:
+        irregular = "1"  # sem NumPy: tudo pelo caminho escalar
+    cols = ", ".join(COLUNAS_FOLHA)
+    pendentes = []
+    for row in conn.execute(f"SELECT id, {cols}, salario_liquido FROM colaboradores_base "
+                            f"WHERE ({cond}) AND {irregular}", params):
+        novo = salario_liquido(dict(zip(COLUNAS_FOLHA, row[1:4])))
+        if not isinstance(row[4], (int, float)) or folha.centavos(row[4]) != folha.centavos(novo):
+            pendentes.append((novo, row[0]))
+        feitos += 1
+    conn.executemany(upd, pendentes)
+    alterados += len(pendentes)
+    if progresso and pendentes:
+        progresso(feitos, total)
+    return feitos, alterados
+
+@diag.instrumentar("db")
+def recalcular_folha(filtro="", progresso=None):
+    # todos os colaboradores ou só os do filtro da busca; progresso(feitos, total)
+    t0 = time.perf_counter()
+    cond, params = _condicao_filtro(filtro)
+    with usar_conexao() as conn:
+        feitos, alterados = _recalcular_folha(conn, cond, params, progresso)
+    return True, (f"Folha recalculada: {alterados} salário(s) líquido(s) alterado(s) "
+                  f"em {feitos} registro(s), {time.perf_counter() - t0:.1f}s")
+
+# -----------------------
+# Resumo da folha por empresa e cargo: tabela mantida por triggers em colaboradores_base
+# (cada inclusão/alteração/exclusão soma ou subtrai a linha no seu grupo), então os
+# totais do painel custam O(nº de grupos), não uma varredura dos colaboradores. Valores
+# em centavos inteiros, para as somas e subtrações não acumularem erro de ponto
+# flutuante; texto não numérico conta como 0.
+_RESUMO_VALORES = (("bruto", "salario_bruto"), ("liquido", "salario_liquido"),
+                   ("passagem", "valor_passagem"), ("abono", "valor_abono"))
+COLUNAS_RESUMO = ("grupo", "quantidade") + tuple(r for r, _ in _RESUMO_VALORES)
+RESUMO_AGRUPAMENTOS = ("empresa", "cargo")
+
+def _sql_centavos(expr):
+    return f"CASE WHEN typeof({expr}) IN ('integer', 'real') THEN CAST(ROUND({expr} * 100) AS INTEGER) ELSE 0 END"
+
+def _sql_chave_resumo(p):
+    return f"IFNULL({p}.empresa_id, 0), IFNULL({p}.cargo, '')"
+
+def _sql_somar_resumo(p, sinal):
+    # upsert do grupo da linha p (new/old) com sinal +1 (entra) ou -1 (sai)
+    cols = ", ".join(r for r, _ in _RESUMO_VALORES)
+    vals = ", ".join(f"{sinal} * {_sql_centavos(f'{p}.{c}')}" for _, c in _RESUMO_VALORES)
+    sets = ", ".join(f"{r} = {r} + excluded.{r}" for r in COLUNAS_RESUMO[1:])
+    return (f"INSERT INTO resumo_folha (empresa_id, cargo, quantidade, {cols}) "
+            f"VALUES ({_sql_chave_resumo(p)}, {sinal}, {vals}) "
+            f"ON CONFLICT(empresa_id, cargo) DO UPDATE SET {sets};")
+
+def _sql_limpar_resumo(p):
+    return (f"DELETE FROM resumo_folha WHERE (empresa_id, cargo) = ({_sql_chave_resumo(p)}) "
+            f"AND quantidade = 0;")
+
+def _sql_resumo_completo():
+    somas = ", ".join(f"SUM({_sql_centavos(c)})" for _, c in _RESUMO_VALORES)
+    return (f"SELECT IFNULL(empresa_id, 0), IFNULL(cargo, ''), COUNT(*), {somas} "
+            f"FROM colaboradores_base GROUP BY 1, 2")
+
+def _garantir_resumo_folha(conn):
+    existe = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'resumo_folha'").fetchone()
+    campos = ["empresa_id", "cargo"] + [c for _, c in _RESUMO_VALORES]
+    mudou = " OR ".join(f"old.{c} IS NOT new.{c}" for c in campos)
+    _executar_script(conn, f"""
+        CREATE TABLE IF NOT EXISTS resumo_folha (
+            empresa_id INTEGER NOT NULL,  -- 0: sem empresa
+            cargo TEXT NOT NULL,
+            quantidade INTEGER NOT NULL,
+            {", ".join(f"{r} INTEGER NOT NULL" for r, _ in _RESUMO_VALORES)},
+            PRIMARY KEY (empresa_id, cargo)
+        ) WITHOUT ROWID;
+        CREATE TRIGGER IF NOT EXISTS resumo_folha_ai AFTER INSERT ON colaboradores_base BEGIN
+            {_sql_somar_resumo('new', 1)}
+        END;
+        CREATE TRIGGER IF NOT EXISTS resumo_folha_ad AFTER DELETE ON colaboradores_base BEGIN
+            {_sql_somar_resumo('old', -1)}
+            {_sql_limpar_resumo('old')}
+        END;
+        CREATE TRIGGER IF NOT EXISTS resumo_folha_au AFTER UPDATE OF {", ".join(campos)} ON colaboradores_base
+        WHEN {mudou} BEGIN
+            {_sql_somar_resumo('old', -1)}
+            {_sql_somar_resumo('new', 1)}
+            {_sql_limpar_resumo('old')}
+        END;
+    """)
+    if not existe:
+        # backfill único para bancos que já tinham registros
+        _reconstruir_resumo_folha(conn)
+
+def _reconstruir_resumo_folha(conn):
+    # na transação de quem chama (migração ou verificar_resumo_folha)
+    conn.execute("DELETE FROM resumo_folha")
+    conn.execute(f"INSERT INTO resumo_folha {_sql_resumo_completo()}")
+
+@diag.instrumentar("db", linhas=len)
+def resumo_folha(por="empresa"):
+    # [(grupo, quantidade, bruto, liquido, passagem, abono)] em reais, na ordem do grupo
+    if por not in RESUMO_AGRUPAMENTOS:
+        raise ValueError(f"agrupamento inválido: {por} (use {' ou '.join(RESUMO_AGRUPAMENTOS)})")
+    somas = ", ".join(f"SUM(r.{r}) / 100.0" for r, _ in _RESUMO_VALORES)
+    if por == "empresa":
+        # empresas sem CNPJ podem repetir o nome de outra: o CNPJ distingue no painel
+        grupo = ("CASE WHEN r.empresa_id = 0 THEN '(sem empresa)' "
+                 "ELSE COALESCE(NULLIF(e.empresa, ''), '(sem nome)') || IFNULL(' — ' || e.cnpj, '') END")
+        sql = (f"SELECT {grupo}, SUM(r.quantidade), {somas} FROM resumo_folha r "
+               f"LEFT JOIN empresas e ON e.id = r.empresa_id GROUP BY r.empresa_id ORDER BY 1 COLLATE NOCASE")
+    else:
+        sql = (f"SELECT COALESCE(NULLIF(r.cargo, ''), '(sem cargo)'), SUM(r.quantidade), {somas} "
+               f"FROM resumo_folha r GROUP BY r.cargo ORDER BY 1 COLLATE NOCASE")
+    with usar_leitura() as conn:
+        return conn.execute(sql).fetchall()
+
+@diag.instrumentar("db")
+def verificar_resumo_folha(corrigir=False):
+    # compara o resumo mantido pelos triggers com um recálculo completo (GROUP BY)
+    t0 = time.perf_counter()
+    completo = _sql_resumo_completo()
+    with usar_conexao() as conn:
+        faltando = conn.execute(f"{completo} EXCEPT SELECT * FROM resumo_folha").fetchall()
+        sobrando = conn.execute(f"SELECT * FROM resumo_folha EXCEPT {completo}").fetchall()
+        grupos = conn.execute("SELECT COUNT(*) FROM resumo_folha").fetchone()[0]
+        if (faltando or sobrando) and corrigir:
+            _reconstruir_resumo_folha(conn)
+    segundos = time.perf_counter() - t0
+    if not (faltando or sobrando):
+        return True, f"Resumo da folha consistente: {grupos} grupo(s) conferido(s) em {segundos:.1f}s"
+    chaves = sorted({(r[0], r[1]) for r in faltando + sobrando})
+    exemplos = "; ".join(f"empresa_id={e} cargo={c!r}" for e, c in chaves[:5])
+    msg = f"Resumo da folha divergente em {len(chaves)} grupo(s): {exemplos}"
+    if corrigir:
+        return True, msg + "\nResumo reconstruído a partir dos colaboradores."
+    return False, msg
+
+# -----------------------
+# Backup a quente e restauração sem reiniciar, pela API de backup do SQLite
+# (sqlite3.Connection.backup): cópia página a página, em passos, consistente mesmo com
+# WAL e transações abertas. Arquivos terminados em .gz são compactados/descompactados.
+BACKUP_PAGINAS_POR_PASSO = 256  # 1 MB por passo com páginas de 4 KB
+
+def _progresso_backup(progresso):
+    # adapta o callback do sqlite3 (status, restantes, total) para progresso(copiadas, total)
+    if progresso is None:
+        return None
+    return lambda status, restantes, total: progresso(total - restantes, total)
+
+def _verificar_integridade(path):
+    conn = sqlite3.connect(path)
+    try:
+        res = conn.execute("PRAGMA integrity_check").fetchone()[0]
+    except sqlite3.DatabaseError as e:
+        res = str(e)
+    finally:
+        conn.close()
+    return res == "ok", res
+
+def _temporario_ao_lado(path):
+    fd, tmp = tempfile.mkstemp(suffix=".db", dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    return tmp
+
+def _copiar_backup(origem, destino):
+    # .gz é descompactado; o arquivo do usuário nunca é aberto pelo SQLite
+    if origem.lower().endswith(".gz"):
+        with gzip.open(origem, "rb") as gz, open(destino, "wb") as f:
+            shutil.copyfileobj(gz, f, 1024 * 1024)
+    else:
+        shutil.copyfile(origem, destino)
+
+@diag.instrumentar("db")
+def backup_db(destino, progresso=None, verificar=False, comprimir=None, paginas=BACKUP_PAGINAS_POR_PASSO):
+    # lê por uma conexão própria, então o app segue gravando durante a cópia.
+    # comprimir=None decide pela extensão .gz.
+    # O destino só aparece quando a cópia (e a verificação) terminou.
+    if comprimir is None:
+        comprimir = destino.lower().endswith(".gz")
+    elif comprimir and not destino.lower().endswith(".gz"):
+        destino += ".gz"
+    t0 = time.perf_counter()
+    bruto = _temporario_ao_lado(destino)
+    try:
+        origem = sqlite3.connect(DB_PATH, isolation_level=None)
+        copia = sqlite3.connect(bruto)
+        try:
+            # transação de leitura aberta na origem: em WAL ela fixa um snapshot, e as
+            # escritas do app durante a cópia não fazem o SQLite recomeçar do zero
+            origem.execute("BEGIN")
+            seq = _seq_alteracoes(origem)
+            origem.backup(copia, pages=paginas, progress=_progresso_backup(progresso))
+            # arquivo avulso: sem -wal ao lado quando for aberto depois
+            copia.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            copia.close()
+            origem.close()
+        if verificar:
+            ok, res = _verificar_integridade(bruto)
+            if not ok:
+                return False, f"Backup descartado: integrity_check falhou ({res})"
+        if comprimir:
+            parcial = destino + ".parcial"
+            with open(bruto, "rb") as f, gzip.open(parcial, "wb", compresslevel=6) as gz:
+                shutil.copyfileobj(f, gz, 1024 * 1024)
+            os.replace(parcial, destino)
+        else:
+            os.replace(bruto, destino)
+    finally:
+        if os.path.exists(bruto):
+            os.remove(bruto)
+    # próximos incrementais partem desta cópia
+    _registrar_checkpoint(seq)
+    tamanho = os.path.getsize(destino) / (1024 * 1024)
+    extra = " (verificado)" if verificar else ""
+    return True, f"Backup salvo em:\n{destino}\n{tamanho:.1f} MB em {time.perf_counter() - t0:.1f}s{extra}"
+
+@diag.instrumentar("db")
+def restaurar_db(origem, progresso=None, verificar=True, paginas=BACKUP_PAGINAS_POR_PASSO):
+    # copia o backup para dentro do banco em uso pela API de backup: o conteúdo é trocado
+    # numa única transação de escrita (quem lê vê o antigo ou o novo, nunca um meio termo)
+    # e a conexão compartilhada continua válida, sem reiniciar o app. O arquivo do banco e o
+    # -wal/-shm nunca são trocados: as conexões de leitura abertas (busca, exportação) seguem válidas
+    bruto = _temporario_ao_lado(DB_PATH)
+    try:
+        _copiar_backup(origem, bruto)
+        if verificar:
+            ok, res = _verificar_integridade(bruto)
+            if not ok:
+                return False, f"Backup inválido: integrity_check falhou ({res})"
+        fonte = sqlite3.connect(bruto)
+        try:
+            with _db_lock:
+                tamanho = conectar().execute("PRAGMA page_size").fetchone()[0]
+            if fonte.execute("PRAGMA page_size").fetchone()[0] != tamanho:
+                # em WAL o tamanho de página do banco em uso não muda por backup: a cópia
+                # temporária é reescrita no tamanho dele (VACUUM, fora do modo WAL)
+                fonte.execute("PRAGMA journal_mode=DELETE")
+                fonte.execute(f"PRAGMA page_size={int(tamanho)}")
+                fonte.execute("VACUUM")
+            with _db_lock:
+                fonte.backup(conectar(), pages=paginas, progress=_progresso_backup(progresso))
+        finally:
+            fonte.close()
+    finally:
+        if os.path.exists(bruto):
+            os.remove(bruto)
+    # backup de versão anterior: migra o esquema e a busca como numa abertura
+    inicializar_sistema()
+    # o banco restaurado vira a base dos próximos incrementais
+    with usar_conexao() as conn:
+        _registrar_checkpoint(_seq_alteracoes(conn), conn)
+    return True, f"Backup restaurado de:\n{origem}"
+
+# -----------------------
+# Backups incrementais: triggers nas tabelas base anotam em `alteracoes` (seq crescente)
+# cada inserção/alteração/exclusão. Um incremental grava, compactado (JSON por linha), o
+# estado atual só das linhas tocadas desde o último checkpoint (backup completo ou
+# incremental anterior); restaurar = base completa + deltas reaplicados em ordem.
+DELTA_FORMATO = 1
+_TABELAS_DIARIO = ("empresas", "colaboradores_base")  # ordem de aplicação (FK empresa_id)
+
+def _garantir_diario_alteracoes(conn):
+    gatilhos = []
+    for tabela in _TABELAS_DIARIO:
+        for evento, op, ref in (("INSERT", "I", "new"), ("UPDATE", "U", "new"), ("DELETE", "D", "old")):
+            gatilhos.append(f"""
+            CREATE TRIGGER IF NOT EXISTS {tabela}_diario_{op.lower()} AFTER {evento} ON {tabela} BEGIN
+                INSERT INTO alteracoes (tabela, operacao, linha_id) VALUES ('{tabela}', '{op}', {ref}.id);
+            END;""")
+    _executar_script(conn, f"""
+        CREATE TABLE IF NOT EXISTS alteracoes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tabela TEXT NOT NULL,
+            operacao TEXT NOT NULL,  -- I, U, D
+            linha_id INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS backup_checkpoint (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            seq INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO backup_checkpoint (id, seq) VALUES (1, 0);
+        {"".join(gatilhos)}
+    """)
+
+def _seq_alteracoes(conn):
+    # último seq já atribuído (AUTOINCREMENT o preserva mesmo com o diário podado)
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'alteracoes'").fetchone()
+    return row[0] if row else 0
+
+def _registrar_checkpoint(seq, conn=None):
+    # o diário até seq já está coberto por um backup: pode ser descartado
+    if conn is None:
+        with usar_conexao() as conn:
+            return _registrar_checkpoint(seq, conn)
+    conn.execute("UPDATE backup_checkpoint SET seq = ? WHERE id = 1", (seq,))
+    conn.execute("DELETE FROM alteracoes WHERE seq <= ?", (seq,))
+
+@diag.instrumentar("db")
+def backup_incremental(destino, progresso=None):
+    # lê num snapshot (conexão própria) as linhas tocadas desde o checkpoint, uma vez cada
+    # (estado final); linhas que não existem mais viram exclusões
+    t0 = time.perf_counter()
+    if not destino.lower().endswith(".gz"):
+        destino += ".gz"
+    origem = sqlite3.connect(DB_PATH, isolation_level=None)
+    try:
+        origem.execute("BEGIN")
+        desde = origem.execute("SELECT seq FROM backup_checkpoint WHERE id = 1").fetchone()[0]
+        ate = _seq_alteracoes(origem)
+        if ate <= desde:
+            return True, "Nenhuma alteração desde o último backup"
+        tocadas = {tabela: [] for tabela in _TABELAS_DIARIO}
+        for tabela, linha_id in origem.execute(
+                "SELECT tabela, linha_id FROM alteracoes WHERE seq > ? AND seq <= ? GROUP BY tabela, linha_id",
+                (desde, ate)):
+            tocadas[tabela].append(linha_id)
+        total = sum(len(ids) for ids in tocadas.values())
+        colunas = {t: [r[1] for r in origem.execute(f"PRAGMA table_info({t})")] for t in _TABELAS_DIARIO}
+        parcial = destino + ".parcial"
+        feitos = 0
+        excluidas = {}
+        with gzip.open(parcial, "wt", encoding="utf-8", compresslevel=6) as f:
+            f.write(json.dumps({"formato": DELTA_FORMATO, "desde": desde, "ate": ate, "colunas": colunas,
+                                "criado_em": datetime.now().isoformat(timespec="seconds")}) + "\n")
+            for tabela in _TABELAS_DIARIO:
+                ids = tocadas[tabela]
+                existentes = set()
+                for lote in _lotes(ids, 500):
+                    marcas = ",".join("?" * len(lote))
+                    for row in origem.execute(f"SELECT * FROM {tabela} WHERE id IN ({marcas})", lote):
+                        existentes.add(row[0])
+                        f.write(json.dumps(["u", tabela, row], ensure_ascii=False) + "\n")
+                    feitos += len(lote)
+                    if progresso:
+                        progresso(feitos, total)
+                excluidas[tabela] = [i for i in ids if i not in existentes]
+            # exclusões depois das gravações, na ordem inversa (colaboradores antes das empresas)
+            for tabela in reversed(_TABELAS_DIARIO):
+                for linha_id in excluidas[tabela]:
+                    f.write(json.dumps(["d", tabela, linha_id]) + "\n")
+        os.replace(parcial, destino)
+    finally:
+        origem.close()
+    _registrar_checkpoint(ate)
+    tamanho = os.path.getsize(destino) / 1024
+    return True, (f"Backup incremental salvo em:\n{destino}\n{total} linhas alteradas (seq {desde + 1}–{ate}), "
+                  f"{tamanho:,.1f} KB em {time.perf_counter() - t0:.1f}s")
+
+def _cabecalho_delta(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        cab = json.loads(f.readline())
+    if cab.get("formato") != DELTA_FORMATO:
+        raise ValueError(f"{os.path.basename(path)}: não é um backup incremental reconhecido")
+    return cab
+
+def _indices_unicos(conn):
+    # (nome, sql) dos índices únicos das tabelas do diário (CNPJ, CPF)
+    marcas = ",".join("?" * len(_TABELAS_DIARIO))
+    return conn.execute(f"SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql LIKE 'CREATE UNIQUE%' "
+                        f"AND tbl_name IN ({marcas})", _TABELAS_DIARIO).fetchall()
+
+def _aplicar_delta(conn, path):
+    # o delta traz só o estado final de cada linha: reaplicado linha a linha, um CPF/CNPJ
+    # pode chegar ao registro novo antes de sair do antigo (exclusão, troca entre dois).
+    # Os índices únicos saem durante a reaplicação e voltam no fim, sobre o estado final
+    unicos = _indices_unicos(conn)
+    for nome, _ in unicos:
+        conn.execute(f"DROP INDEX {nome}")
+    upserts = {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        cab = json.loads(f.readline())
+        for t, cols in cab["colunas"].items():
+            upserts[t] = (f"INSERT INTO {t} ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+                          f"ON CONFLICT(id) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in cols[1:])}")
+        for linha in f:
+            op, tabela, dado = json.loads(linha)
+            if op == "u":
+                conn.execute(upserts[tabela], dado)
+            else:
+                conn.execute(f"DELETE FROM {tabela} WHERE id = ?", (dado,))
+    for _, sql in unicos:
+        conn.execute(sql)
+
+def _reconstruir_anexos(conn):
+    # `anexos` não entra no diário: depois dos deltas, as linhas dos arquivos guardados após a
+    # base e todas as contagens de referência saem do que colaboradores_base referencia
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'anexos'").fetchone():
+        return
+    novos = [c for (c,) in conn.execute(
+        "SELECT DISTINCT anexo_pdf FROM colaboradores_base WHERE anexo_pdf <> '' "
+        "AND anexo_pdf NOT IN (SELECT caminho FROM anexos)") if _ANEXO_DEPOSITO.match(c)]
+    agora = time.time()
+    linhas = []
+    for valor in novos:
+        path = caminho_anexo(valor)
+        linhas.append((valor, os.path.getsize(path) if os.path.exists(path) else 0, agora))
+    conn.executemany("INSERT INTO anexos (caminho, tamanho, guardado) VALUES (?, ?, ?)", linhas)
+    contagem = "(SELECT COUNT(*) FROM colaboradores_base WHERE anexo_pdf = anexos.caminho AND anexo_pdf <> '')"
+    conn.execute(f"UPDATE anexos SET referencias = {contagem} WHERE referencias IS NOT {contagem}")
+
+@diag.instrumentar("db")
+def restaurar_incremental(base, deltas, progresso=None, verificar=True):
+    # monta base + deltas num arquivo temporário e só então troca o banco em uso
+    # (restaurar_db): uma cadeia quebrada ou um delta ruim não tocam nos dados atuais
+    cabecalhos = sorted(((_cabecalho_delta(d), d) for d in deltas), key=lambda cd: cd[0]["desde"])
+    bruto = _temporario_ao_lado(DB_PATH)
+    try:
+        _copiar_backup(base, bruto)
+        if verificar:
+            ok, res = _verificar_integridade(bruto)
+            if not ok:
+                return False, f"Backup base inválido: integrity_check falhou ({res})"
+        conn = sqlite3.connect(bruto)
+        try:
+            if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'alteracoes'").fetchone():
+                return False, "O backup base é anterior aos backups incrementais: use um backup completo recente"
+            seq = _seq_alteracoes(conn)
+            for i, (cab, path) in enumerate(cabecalhos):
+                if cab["desde"] != seq:
+                    return False, (f"Cadeia de incrementais quebrada: {os.path.basename(path)} começa no seq "
+                                   f"{cab['desde'] + 1}, mas a base/delta anterior termina no {seq}")
+                with conn:
+                    conn.execute("BEGIN")  # o DROP INDEX do _aplicar_delta também volta num rollback
+                    inicio = _seq_alteracoes(conn)
+                    _aplicar_delta(conn, path)
+                    # a reaplicação passa pelos triggers do diário: não é alteração nova
+                    conn.execute("DELETE FROM alteracoes WHERE seq > ?", (inicio,))
+                    if not conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'alteracoes'",
+                                        (cab["ate"],)).rowcount:
+                        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('alteracoes', ?)", (cab["ate"],))
+                seq = cab["ate"]
+                if progresso:
+                    progresso(i + 1, len(cabecalhos))
+            with conn:
+                _reconstruir_anexos(conn)
+            conn.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            conn.close()
+        ok, msg = restaurar_db(bruto, verificar=False)
+    finally:
+        if os.path.exists(bruto):
+            os.remove(bruto)
+    if not ok:
+        return ok, msg
+    return True, f"Backup restaurado de:\n{base}\n+ {len(cabecalhos)} incremental(is) até o seq {seq}"
+
+# -----------------------
+# Anexos: depósito por conteúdo em APP_DIR/anexos. O PDF é copiado em blocos, com o SHA-256
+# calculado na mesma passada, para anexos/<2 primeiros>/<sha256>.pdf, e anexo_pdf guarda esse
+# caminho relativo (continua valendo se a pasta de dados mudar de lugar). O mesmo arquivo
+# anexado a centenas de colaboradores existe uma vez só. A tabela `anexos` conta as
+# referências por triggers em colaboradores_base; limpar_anexos só apaga arquivo sem
+# referência e guardado há mais de ANEXOS_CARENCIA_S (o anexo é guardado antes de o
+# formulário ser salvo). Valores antigos (caminho absoluto) continuam abrindo como antes;
+# internalizar_anexos copia esses arquivos para o depósito.
+ANEXO_BLOCO = 1024 * 1024
+ANEXOS_CARENCIA_S = 24 * 3600
+_ANEXO_DEPOSITO = re.compile(r"^anexos/[0-9a-f]{2}/([0-9a-f]{64})\.pdf$")
+
+def _garantir_anexos(conn):
+    _executar_script(conn, """
+        CREATE TABLE IF NOT EXISTS anexos (
+            caminho TEXT PRIMARY KEY,  -- valor gravado em anexo_pdf
+            tamanho INTEGER NOT NULL,
+            nome TEXT,  -- nome do arquivo no primeiro envio
+            referencias INTEGER NOT NULL DEFAULT 0,
+            guardado REAL NOT NULL  -- último envio (time.time), para a carência da limpeza
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_anexos_sem_referencia ON anexos(guardado) WHERE referencias <= 0;
+        CREATE INDEX IF NOT EXISTS idx_colaboradores_anexo ON colaboradores_base(anexo_pdf) WHERE anexo_pdf <> '';
+        CREATE TRIGGER IF NOT EXISTS anexos_ref_ins AFTER INSERT ON colaboradores_base
+        WHEN new.anexo_pdf <> '' BEGIN
+            UPDATE anexos SET referencias = referencias + 1 WHERE caminho = new.anexo_pdf;
+        END;
+        CREATE TRIGGER IF NOT EXISTS anexos_ref_upd AFTER UPDATE OF anexo_pdf ON colaboradores_base
+        WHEN old.anexo_pdf IS NOT new.anexo_pdf BEGIN
+            UPDATE anexos SET referencias = referencias - 1 WHERE caminho = old.anexo_pdf;
+            UPDATE anexos SET referencias = referencias + 1 WHERE caminho = new.anexo_pdf;
+        END;
+        CREATE TRIGGER IF NOT EXISTS anexos_ref_del AFTER DELETE ON colaboradores_base
+        WHEN old.anexo_pdf <> '' BEGIN
+            UPDATE anexos SET referencias = referencias - 1 WHERE caminho = old.anexo_pdf;
+        END;
+    """)
+
+def caminho_anexo(valor):
+    # valor de anexo_pdf -> arquivo no disco (None se vazio)
+    if not valor:
+        return None
+    if _ANEXO_DEPOSITO.match(valor):
+        return os.path.join(APP_DIR, *valor.split("/"))
+    return valor
+
+@diag.instrumentar("anexo")
+def guardar_anexo(origem, progresso=None):
+    # copia o PDF para o depósito e devolve o valor para anexo_pdf; conteúdo já guardado
+    # não é gravado de novo (a cópia temporária é descartada)
+    total = os.path.getsize(origem)
+    os.makedirs(ANEXOS_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=ANEXOS_DIR)
+    try:
+        sha = hashlib.sha256()
+        feitos = 0
+        with open(origem, "rb") as f, os.fdopen(fd, "wb") as saida:
+            bloco = f.read(ANEXO_BLOCO)
+            if b"%PDF-" not in bloco[:1024]:
+                raise ValueError(f"{os.path.basename(origem)} não é um arquivo PDF")
+            while bloco:
+                sha.update(bloco)
+                saida.write(bloco)
+                feitos += len(bloco)
+                if progresso:
+                    progresso(feitos, total)
+                bloco = f.read(ANEXO_BLOCO)
+        digest = sha.hexdigest()
+        valor = f"anexos/{digest[:2]}/{digest}.pdf"
+        destino = caminho_anexo(valor)
+        with usar_conexao() as conn:
+            # na transação de escrita: um limpar_anexos (mesmo de outro processo) não apaga
+            # o arquivo entre a conferência e o registro
+            if not conn.in_transaction:
+                conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT INTO anexos (caminho, tamanho, nome, guardado) VALUES (?, ?, ?, ?) "
+                         "ON CONFLICT (caminho) DO UPDATE SET guardado = excluded.guardado",
+                         (valor, feitos, os.path.basename(origem), time.time()))
+            if not os.path.exists(destino):
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                os.replace(tmp, destino)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return valor
+
+@diag.instrumentar("anexo")
+def limpar_anexos(carencia=ANEXOS_CARENCIA_S):
+    # apaga os arquivos do depósito sem nenhuma referência (e as cópias temporárias
+    # abandonadas) guardados há mais de `carencia` segundos
+    limite = time.time() - carencia
+    with usar_conexao() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        sobras = conn.execute(
+            "SELECT caminho, tamanho FROM anexos a WHERE referencias <= 0 AND guardado < ? AND NOT EXISTS "
+            "(SELECT 1 FROM colaboradores_base WHERE anexo_pdf = a.caminho AND anexo_pdf <> '')", (limite,)).fetchall()
+        conn.executemany("DELETE FROM anexos WHERE caminho = ?", [(c,) for c, _ in sobras])
+        for valor, _ in sobras:
+            try:
+                os.remove(caminho_anexo(valor))
+            except FileNotFoundError:
+                pass
+    if os.path.isdir(ANEXOS_DIR):
+        for e in os.scandir(ANEXOS_DIR):
+            if e.name.endswith(".tmp") and e.stat().st_mtime < limite:
+                os.remove(e.path)
+    mb = sum(t for _, t in sobras) / (1024 * 1024)
+    return True, f"{len(sobras)} anexo(s) sem referência removido(s) ({mb:.1f} MB liberados)"
+
+@diag.instrumentar("anexo")
+def verificar_anexos(corrigir=False):
+    # confere a contagem dos triggers contra as referências reais e se os arquivos existem
+    with usar_conexao() as conn:
+        divergentes = conn.execute("""
+            SELECT a.caminho, a.referencias, COALESCE(r.n, 0) FROM anexos a
+            LEFT JOIN (SELECT anexo_pdf, COUNT(*) AS n FROM colaboradores_base
+                       WHERE anexo_pdf <> '' GROUP BY anexo_pdf) r ON r.anexo_pdf = a.caminho
+            WHERE a.referencias <> COALESCE(r.n, 0)""").fetchall()
+        usados = conn.execute("SELECT caminho FROM anexos WHERE referencias > 0").fetchall()
+        if divergentes and corrigir:
+            conn.executemany("UPDATE anexos SET referencias = ? WHERE caminho = ?", [(n, c) for c, _, n in divergentes])
+    ausentes = [c for (c,) in usados if not os.path.exists(caminho_anexo(c))]
+    problemas = []
+    if divergentes:
+        problemas.append(f"{len(divergentes)} contagem(ns) de referência divergente(s)"
+                         + (" (corrigidas)" if corrigir else ""))
+    if ausentes:
+        problemas.append(f"{len(ausentes)} arquivo(s) referenciado(s) ausente(s) no depósito: "
+                         + ", ".join(ausentes[:5]) + (" ..." if len(ausentes) > 5 else ""))
+    if not problemas:
+        return True, f"Anexos consistentes ({len(usados)} em uso)"
+    return bool(corrigir and not ausentes), "; ".join(problemas)
+
+@diag.instrumentar("anexo")
+def internalizar_anexos(progresso=None):
+    # copia para o depósito os anexos gravados como caminho absoluto (antes do depósito) e
+    # troca o valor em todos os colaboradores que apontam para o mesmo arquivo
+    with usar_conexao() as conn:
+        externos = [v for (v,) in conn.execute("SELECT DISTINCT anexo_pdf FROM colaboradores_base WHERE anexo_pdf <> ''")
+                    if not _ANEXO_DEPOSITO.match(v)]
+    copiados, linhas, faltando = 0, 0, []
+    for i, valor in enumerate(externos):
+        try:
+            novo = guardar_anexo(valor)
+        except (OSError, ValueError):
+            faltando.append(valor)  # arquivo sumiu (a origem mudou de lugar) ou não é PDF
+        else:
+            with usar_conexao() as conn:
+                linhas += conn.execute("UPDATE colaboradores_base SET anexo_pdf = ? WHERE anexo_pdf = ?",
+                                       (novo, valor)).rowcount
+            copiados += 1
+        if progresso:
+            progresso(i + 1, len(externos))
+    msg = f"{copiados} arquivo(s) copiado(s) para o depósito ({linhas} colaborador(es))"
+    if faltando:
+        msg += f"; {len(faltando)} não encontrado(s) ou inválido(s): " + ", ".join(faltando[:5])
+    return not faltando, msg
+
+# Miniaturas da primeira página, geradas no primeiro pedido e guardadas como PNG em
+# MINIATURAS_DIR, com LRU limitado a MINIATURAS_MAX_BYTES. A ordem de uso é o mtime do
+# arquivo (tocado a cada acerto), então vale entre execuções; o índice em memória é montado
+# uma vez por processo. Renderização pelo pypdfium2 (opcional); sem ele, a maior imagem da
+# primeira página pelo pypdf, que cobre os PDFs digitalizados.
+MINIATURA_TAMANHO = (240, 320)
+MINIATURAS_MAX_BYTES = 32 * 1024 * 1024
+
+_miniaturas_lock = threading.Lock()
+_miniaturas = None  # nome do PNG -> bytes, do uso mais antigo ao mais recente
+_miniaturas_bytes = 0
+_sem_miniatura = set()  # PDFs sem nada para mostrar: não tenta de novo neste processo
+
+def _indice_miniaturas():
+    # chamado com _miniaturas_lock
+    global _miniaturas, _miniaturas_bytes
+    if _miniaturas is None:
+        itens = []
+        if os.path.isdir(MINIATURAS_DIR):
+            for e in os.scandir(MINIATURAS_DIR):
+                if e.name.endswith(".png"):
+                    st = e.stat()
+                    itens.append((st.st_mtime, e.name, st.st_size))
+        _miniaturas = OrderedDict((nome, tam) for _, nome, tam in sorted(itens))
+        _miniaturas_bytes = sum(_miniaturas.values())
+    return _miniaturas
+
+def _registrar_miniatura(nome, tamanho):
+    # chamado com _miniaturas_lock; descarta as de uso mais antigo até caber no limite
+    global _miniaturas_bytes
+    indice = _indice_miniaturas()
+    _miniaturas_bytes += tamanho - indice.pop(nome, 0)
+    indice[nome] = tamanho
+    while _miniaturas_bytes > MINIATURAS_MAX_BYTES and len(indice) > 1:
+        velho, tam = indice.popitem(last=False)
+        _miniaturas_bytes -= tam
+        try:
+            os.remove(os.path.join(MINIATURAS_DIR, velho))
+        except FileNotFoundError:
+            pass
+
+def _chave_miniatura(valor, caminho):
+    m = _ANEXO_DEPOSITO.match(valor)
+    if m:
+        return m.group(1)
+    # caminho antigo: o conteúdo pode mudar, então entra na chave o tamanho e o mtime
+    st = os.stat(caminho)
+    return hashlib.sha256(f"{os.path.abspath(caminho)}|{st.st_size}|{st.st_mtime_ns}".encode("utf-8")).hexdigest()
+
+def _renderizar_primeira_pagina(path, tamanho):
+    # imagem PIL que cabe em `tamanho`, ou None se o PDF não tiver o que mostrar
+    from PIL import Image
+    img = None
+    try:
+        if _carregar_pdfium() is not None:
+            pdf = pdfium.PdfDocument(path)
+            try:
+                pagina = pdf[0]
+                largura, altura = pagina.get_size()
+                img = pagina.render(scale=min(tamanho[0] / largura, tamanho[1] / altura)).to_pil()
+                pagina.close()
+            finally:
+                pdf.close()
+        else:
+            from pypdf import PdfReader
+            imagens = [i.image for i in PdfReader(path).pages[0].images]
+            if imagens:
+                img = max(imagens, key=lambda im: im.width * im.height)
+    except Exception:
+        return None  # PDF corrompido/criptografado ou sem pypdf
+    if img is None:
+        return None
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    img.thumbnail(tamanho, Image.LANCZOS)
+    return img
+
+@diag.instrumentar("anexo")
+def miniatura_anexo(valor, tamanho=MINIATURA_TAMANHO, gerar=True):
+    # PNG da primeira página do anexo (caminho) ou None: sem anexo, arquivo ausente, nada
+    # para mostrar ou, com gerar=False, ainda fora do cache
+    global _miniaturas_bytes
+    caminho = caminho_anexo(valor)
+    if not caminho or not os.path.isfile(caminho):
+        return None
+    nome = f"{_chave_miniatura(valor, caminho)}_{tamanho[0]}x{tamanho[1]}.png"
+    destino = os.path.join(MINIATURAS_DIR, nome)
+    with _miniaturas_lock:
+        indice = _indice_miniaturas()
+        if nome in indice:
+            try:
+                os.utime(destino)
+                indice.move_to_end(nome)
+                return destino
+            except FileNotFoundError:
+                # descartada por outro processo
+                _miniaturas_bytes -= indice.pop(nome)
+    if not gerar or nome in _sem_miniatura:
+        return None
+    img = _renderizar_primeira_pagina(caminho, tamanho)
+    if img is None:
+        _sem_miniatura.add(nome)
+        return None
+    os.makedirs(MINIATURAS_DIR, exist_ok=True)
+    tmp = f"{destino}.{threading.get_ident()}.tmp"
+    img.save(tmp, "PNG", optimize=True)
+    os.replace(tmp, destino)
+    with _miniaturas_lock:
+        _registrar_miniatura(nome, os.path.getsize(destino))
+    return destino
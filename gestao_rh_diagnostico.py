@@ -0,0 +1,311 @@
+# gestao_rh_diagnostico.py
+# Instrumentação opcional: tempo de parede das operações (helpers do banco, PDF, handlers
+# on_* da tela e redesenho da grade), linhas retornadas/gravadas e percentis numa janela
+# móvel por operação. Nas operações lentas guarda também o SQL executado, agrupado pela
+# forma do comando (literais trocados por ?), com quantidade, tempo aproximado (de cada
+# comando até o início do seguinte) e EXPLAIN QUERY PLAN.
+# Desligada, cada operação custa só um teste de `ativo`: os ganchos de SQL nem são instalados.
+#
+#   GESTAO_RH_DIAGNOSTICO=1               liga ao abrir (aplicativo ou CLI)
+#   GESTAO_RH_TRACE=/tmp/rastro.jsonl     liga e grava cada operação (JSON por linha)
+import functools
+import heapq
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+
+DIAGNOSTICO_ENV = "GESTAO_RH_DIAGNOSTICO"
+TRACE_ENV = "GESTAO_RH_TRACE"
+LENTO_MS = 100  # acima disso a operação entra no relatório de lentas, com o SQL
+AMOSTRAS = 512  # janela dos percentis, por operação
+LENTAS_MAX = 50
+FORMAS_POR_SPAN = 200  # formas de SQL distintas por operação; as demais vão para "(outros)"
+SQL_POR_LENTA = 5  # as formas mais demoradas de cada operação lenta
+_LITERAIS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?(?:[eE][+-]?\d+)?\b")
+
+ativo = False
+planejador = None  # fn(sql) -> linhas do EXPLAIN QUERY PLAN (definido pelo núcleo)
+
+_lock = threading.Lock()
+_local = threading.local()
+_conexoes = []  # sqlite3.Connection não aceita weakref: as fechadas saem em _podar()
+_estat = {}  # (tipo, nome) -> dict
+_lentas = []  # heap (ms, seq, registro) com as LENTAS_MAX mais lentas
+_seq = itertools.count()
+_trace = None
+
+# -----------------------
+# Ligar / desligar
+def ligar(trace=None):
+    global ativo, _trace
+    with _lock:
+        if trace and (_trace is None or _trace.name != trace):
+            if _trace is not None:
+                _trace.close()
+            _trace = open(trace, "a", encoding="utf-8", buffering=1)
+        ativo = True
+    for conn in _podar():
+        _instalar_gancho(conn)
+
+def desligar():
+    global ativo, _trace
+    with _lock:
+        ativo = False
+        if _trace is not None:
+            _trace.close()
+            _trace = None
+    for conn in _podar():
+        try:
+            conn.set_trace_callback(None)
+        except Exception:
+            pass
+
+def limpar():
+    with _lock:
+        _estat.clear()
+        _lentas.clear()
+
+def arquivo_trace():
+    return _trace.name if _trace is not None else None
+
+def observar_conexao(conn):
+    # conexões abertas pelo núcleo: recebem o gancho de SQL enquanto a instrumentação estiver ligada
+    with _lock:
+        _conexoes.append(conn)
+    if len(_conexoes) > 16:
+        _podar()
+    if ativo:
+        _instalar_gancho(conn)
+
+def _aberta(conn):
+    try:
+        conn.total_changes
+        return True
+    except Exception:  # sqlite3.ProgrammingError: conexão fechada
+        return False
+
+def _podar():
+    with _lock:
+        _conexoes[:] = [c for c in _conexoes if _aberta(c)]
+        return list(_conexoes)
+
+def _instalar_gancho(conn):
+    try:
+        conn.set_trace_callback(_anotar_sql)
+    except Exception:
+        pass  # fechada entre a poda e aqui
+
+def _anotar_sql(sql):
+    # chamado pelo sqlite3 no início de cada comando (SQL com os parâmetros expandidos)
+    # triggers reaparecem com o SQL do comando que os disparou (ou "-- ..." no caso do FTS):
+    # contam nesse comando
+    pilha = getattr(_local, "pilha", None)
+    if not pilha or sql.startswith(("--", "EXPLAIN")) or sql == getattr(_local, "ultimo", None):
+        return
+    _local.ultimo = sql
+    t = time.perf_counter()
+    atual = (t, _LITERAIS.sub("?", sql), sql)
+    for span in pilha:
+        span["comandos"] += 1
+        if span["anterior"] is not None:
+            _somar_comando(span, span["anterior"], t)
+        span["anterior"] = atual
+
+def _somar_comando(span, anterior, fim):
+    t0, forma, exemplo = anterior
+    formas = span["formas"]
+    e = formas.get(forma)
+    if e is None:
+        if len(formas) >= FORMAS_POR_SPAN:
+            forma, exemplo = "(outros)", ""
+            e = formas.get(forma)
+        if e is None:
+            e = formas[forma] = [0, 0.0, exemplo]  # quantidade, segundos, um SQL real (para o plano)
+    e[0] += 1
+    e[1] += fim - t0
+
+# -----------------------
+# Medição
+def instrumentar(tipo, nome=None, linhas=None):
+    # decorator; linhas(resultado) -> nº de linhas retornadas/gravadas (opcional)
+    def decorar(fn):
+        rotulo = nome or fn.__qualname__
+        @functools.wraps(fn)
+        def medido(*args, **kwargs):
+            if not ativo:
+                return fn(*args, **kwargs)
+            span = _abrir_span()
+            res = None
+            try:
+                res = fn(*args, **kwargs)
+                return res
+            finally:
+                n = None
+                if linhas is not None and res is not None:
+                    try:
+                        n = linhas(res)
+                    except Exception:
+                        pass
+                _fechar_span(span, tipo, rotulo, n)
+        return medido
+    return decorar
+
+def instrumentar_metodos(cls, tipo, prefixo="on_", extras=()):
+    # ex.: handlers App.on_* da tela, antes de instanciar a classe
+    for attr, valor in list(vars(cls).items()):
+        if callable(valor) and (attr.startswith(prefixo) or attr in extras):
+            setattr(cls, attr, instrumentar(tipo, f"{cls.__name__}.{attr}")(valor))
+
+class operacao:
+    # trecho avulso: `with operacao("ui", "grade.redesenho"):`
+    __slots__ = ("tipo", "nome", "span", "linhas")
+
+    def __init__(self, tipo, nome):
+        self.tipo, self.nome, self.span, self.linhas = tipo, nome, None, None
+
+    def __enter__(self):
+        if ativo:
+            self.span = _abrir_span()
+        return self
+
+    def __exit__(self, *exc):
+        if self.span is not None:
+            _fechar_span(self.span, self.tipo, self.nome, self.linhas)
+
+def _abrir_span():
+    pilha = getattr(_local, "pilha", None)
+    if pilha is None:
+        pilha = _local.pilha = []
+    span = {"t0": time.perf_counter(), "comandos": 0, "formas": {}, "anterior": None}
+    pilha.append(span)
+    return span
+
+def _fechar_span(span, tipo, nome, linhas):
+    fim = time.perf_counter()
+    pilha = _local.pilha
+    if pilha and pilha[-1] is span:
+        pilha.pop()
+    if span["anterior"] is not None:
+        _somar_comando(span, span["anterior"], fim)
+    ms = (fim - span["t0"]) * 1000
+    reg = {"t": time.time(), "tipo": tipo, "nome": nome, "ms": round(ms, 3), "linhas": linhas,
+           "comandos": span["comandos"], "thread": threading.current_thread().name}
+    if ms >= LENTO_MS and span["formas"]:
+        reg["sql"] = _formas_lentas(span["formas"])
+    _registrar(reg)
+
+def _formas_lentas(formas):
+    out = []
+    for forma, (qtd, seg, exemplo) in heapq.nlargest(SQL_POR_LENTA, formas.items(), key=lambda f: f[1][1]):
+        item = {"ms": round(seg * 1000, 3), "vezes": qtd, "sql": forma[:2000]}
+        plano = _plano(exemplo)
+        if plano:
+            item["plano"] = plano
+        out.append(item)
+    return out
+
+def _plano(sql):
+    # BEGIN/SAVEPOINT/PRAGMA etc. não têm plano
+    if planejador is None or not sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT", "WITH")):
+        return None
+    try:
+        return [linha[-1] for linha in planejador(sql)]
+    except Exception:
+        return None
+
+def _registrar(reg):
+    with _lock:
+        _acumular(reg)
+        if _trace is not None:
+            try:
+                _trace.write(json.dumps(reg, ensure_ascii=False) + "\n")
+            except (OSError, ValueError):
+                pass
+
+def _acumular(reg):
+    chave = (reg["tipo"], reg["nome"])
+    e = _estat.get(chave)
+    if e is None:
+        e = _estat[chave] = {"chamadas": 0, "total_ms": 0.0, "max_ms": 0.0, "linhas": 0,
+                             "comandos": 0, "amostras": deque(maxlen=AMOSTRAS)}
+    e["chamadas"] += 1
+    e["total_ms"] += reg["ms"]
+    e["max_ms"] = max(e["max_ms"], reg["ms"])
+    e["linhas"] += reg.get("linhas") or 0
+    e["comandos"] += reg.get("comandos") or 0
+    e["amostras"].append(reg["ms"])
+    if reg["ms"] >= LENTO_MS:
+        item = (reg["ms"], next(_seq), reg)
+        if len(_lentas) < LENTAS_MAX:
+            heapq.heappush(_lentas, item)
+        elif item > _lentas[0]:
+            heapq.heapreplace(_lentas, item)
+
+# -----------------------
+# Relatórios
+def _percentil(ordenadas, p):
+    if not ordenadas:
+        return 0.0
+    return ordenadas[min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))]
+
+def resumo():
+    # [{tipo, nome, chamadas, media_ms, p50_ms, p90_ms, p99_ms, max_ms, linhas, comandos}], pior p90 primeiro
+    with _lock:
+        itens = [(chave, dict(e, amostras=sorted(e["amostras"]))) for chave, e in _estat.items()]
+    out = []
+    for (tipo, nome), e in itens:
+        a = e["amostras"]
+        out.append({"tipo": tipo, "nome": nome, "chamadas": e["chamadas"],
+                    "media_ms": e["total_ms"] / e["chamadas"], "p50_ms": _percentil(a, 50),
+                    "p90_ms": _percentil(a, 90), "p99_ms": _percentil(a, 99), "max_ms": e["max_ms"],
+                    "linhas": e["linhas"], "comandos": e["comandos"]})
+    out.sort(key=lambda r: r["p90_ms"], reverse=True)
+    return out
+
+def lentas(n=20):
+    with _lock:
+        return [reg for _, _, reg in heapq.nlargest(n, _lentas)]
+
+def relatorio(n=20):
+    linhas = [f"{'tipo':<5}{'operação':<40}{'chamadas':>9}{'média':>10}{'p50':>10}{'p90':>10}"
+              f"{'p99':>10}{'máx':>10}{'linhas':>10}  (ms)"]
+    for r in resumo()[:n]:
+        linhas.append(f"{r['tipo']:<5}{r['nome'][:39]:<40}{r['chamadas']:>9}{r['media_ms']:>10.1f}"
+                      f"{r['p50_ms']:>10.1f}{r['p90_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['max_ms']:>10.1f}"
+                      f"{r['linhas']:>10}")
+    lentos = lentas(n)
+    if lentos:
+        linhas.append(f"\nOperações mais lentas (>= {LENTO_MS} ms):")
+    for reg in lentos:
+        quando = time.strftime("%H:%M:%S", time.localtime(reg["t"]))
+        extra = f", {reg['linhas']} linhas" if reg.get("linhas") is not None else ""
+        linhas.append(f"- {quando} {reg['tipo']} {reg['nome']}: {reg['ms']:.1f} ms, "
+                      f"{reg.get('comandos', 0)} comando(s) SQL{extra}")
+        for cmd in reg.get("sql", ()):
+            sql = " ".join(cmd["sql"].split())
+            linhas.append(f"    ~{cmd['ms']:.1f} ms  {cmd['vezes']}x  {sql[:160]}{'…' if len(sql) > 160 else ''}")
+            for passo in cmd.get("plano", ()):
+                linhas.append(f"        plano: {passo}")
+    if len(linhas) == 1:
+        return "Sem operações registradas (instrumentação desligada ou ainda sem uso)."
+    return "\n".join(linhas)
+
+def carregar_trace(path):
+    # reconstrói estatísticas e lentas a partir de um arquivo de trace (análise offline);
+    # devolve quantas operações foram lidas
+    limpar()
+    n = 0
+    with open(path, encoding="utf-8") as f, _lock:
+        for linha in f:
+            linha = linha.strip()
+            if linha:
+                _acumular(json.loads(linha))
+                n += 1
+    return n
+
+if os.environ.get(TRACE_ENV) or os.environ.get(DIAGNOSTICO_ENV):
+    ligar(trace=os.environ.get(TRACE_ENV) or None)
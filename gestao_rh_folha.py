@@ -0,0 +1,48 @@
+# gestao_rh_folha.py
+# Regras da folha num só lugar: o cálculo de um registro (formulário, edição na grade,
+# contracheque) e o recálculo vetorizado (NumPy) de muitos registros usam a mesma
+# regra_liquido(). As contas são feitas em centavos inteiros, com arredondamento
+# comercial (meio centavo para cima), então os dois caminhos dão o mesmo resultado.
+import math
+
+COLUNAS_FOLHA = ("salario_bruto", "valor_passagem", "valor_abono")
+_EPS = 1e-6  # absorve o erro binário de valores como 0.285 * 100 = 28.4999...
+
+def regra_liquido(bruto, passagem, abono):
+    # em centavos; funciona com int ou com arrays int64 do NumPy
+    return bruto - (passagem + abono)
+
+def para_real(v):
+    # número, "1234.56", "1.234,56" ou "1234,56"; None para vazio/inválido
+    if v is None or isinstance(v, bool):
+        return None
+    if isinstance(v, (int, float)):
+        return None if v != v else float(v)  # NaN -> NULL
+    txt = str(v).strip()
+    if "," in txt:  # 1.234,56
+        txt = txt.replace(".", "").replace(",", ".")
+    try:
+        return float(txt)
+    except ValueError:
+        return None
+
+def valor_moeda(v):
+    return para_real(v) or 0.0
+
+def centavos(valor):
+    c = math.floor(abs(valor) * 100 + 0.5 + _EPS)
+    return -c if valor < 0 else c
+
+def salario_liquido(d):
+    # d: dict com as colunas do cadastro (valores do formulário, do banco ou do PDF)
+    bruto, passagem, abono = (centavos(valor_moeda(d.get(c))) for c in COLUNAS_FOLHA)
+    return regra_liquido(bruto, passagem, abono) / 100
+
+# -----------------------
+# Versão vetorizada (NumPy importado só aqui): arrays float64, vazios já como 0
+def centavos_np(valores):
+    import numpy as np
+    return (np.floor(np.abs(valores) * 100 + 0.5 + _EPS) * np.sign(valores)).astype(np.int64)
+
+def liquido_centavos_np(bruto, passagem, abono):
+    return regra_liquido(centavos_np(bruto), centavos_np(passagem), centavos_np(abono))
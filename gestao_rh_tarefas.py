@@ -0,0 +1,172 @@
+# gestao_rh_tarefas.py
+# Tarefas em segundo plano (importação, exportação, PDFs, backup/restauração) fora da
+# thread do Tk. Cada tarefa roda numa thread do Agendador e publica progresso e estado em
+# atributos simples, que a tela lê por polling (after); nada aqui toca em widgets, então a
+# CLI e os benchmarks usam o mesmo agendador sem display.
+#
+# Conflitos: tarefa exclusiva (grava ou troca o banco: importação, restauração, folha) roda
+# sozinha; as demais (leituras: exportação, contracheques, backup) rodam juntas entre si.
+# A fila é FIFO: nenhuma tarefa passa na frente de outra enfileirada antes dela, então uma
+# restauração pedida depois de uma importação espera a importação terminar, e vice-versa.
+import itertools
+import threading
+import time
+import traceback
+from collections import deque
+from concurrent.futures import CancelledError
+
+import gestao_rh_diagnostico as diag
+
+TAREFAS_MAX = 4  # threads simultâneas (tarefas não exclusivas)
+
+# estados
+NA_FILA = "na fila"
+RODANDO = "rodando"
+CONCLUIDA = "concluída"
+CANCELADA = "cancelada"
+FALHOU = "falhou"
+
+_ids = itertools.count(1)
+
+class Tarefa:
+    # fn(tarefa) -> (ok, msg); dentro dela, tarefa.progresso é o callback progresso(feitos,
+    # total) das funções do núcleo e tarefa.cancelamento o Event para o parâmetro cancelar
+    def __init__(self, rotulo, fn, exclusiva=False, cancelavel=True):
+        self.id = next(_ids)
+        self.rotulo = rotulo
+        self.fn = fn
+        self.exclusiva = exclusiva
+        self.cancelavel = cancelavel
+        self.estado = NA_FILA
+        self.feitos = 0
+        self.total = None
+        self.texto = ""
+        self.ok = None
+        self.msg = ""
+        self.erro = None  # traceback, quando fn levanta exceção
+        self.criada = time.time()
+        self.inicio = self.fim = None
+        self.cancelamento = threading.Event()
+        self._terminou = threading.Event()
+
+    def progresso(self, feitos, total=None, texto=""):
+        # chamado da thread da tarefa; a tela só lê estes atributos
+        self.feitos, self.total, self.texto = feitos, total, texto
+
+    def cancelar(self):
+        if self.cancelavel:
+            self.cancelamento.set()
+        return self.cancelavel
+
+    @property
+    def cancelada(self):
+        return self.cancelamento.is_set()
+
+    @property
+    def terminada(self):
+        return self._terminou.is_set()
+
+    @property
+    def fracao(self):
+        # 0..1 para a barra de progresso; None se o total é desconhecido
+        if not self.total:
+            return None
+        return min(1.0, self.feitos / self.total)
+
+    def aguardar(self, timeout=None):
+        return self._terminou.wait(timeout)
+
+    def descricao(self):
+        if self.estado == NA_FILA:
+            return f"{self.rotulo}: na fila"
+        if self.estado != RODANDO:
+            return f"{self.rotulo}: {self.estado}"
+        if self.texto:
+            andamento = self.texto
+        elif self.total:
+            andamento = f"{self.feitos}/{self.total}"
+        else:
+            andamento = str(self.feitos) if self.feitos else "..."
+        return f"{self.rotulo}: {andamento}" + (" (cancelando)" if self.cancelada else "")
+
+    def __repr__(self):
+        return f"<Tarefa {self.id} {self.rotulo!r} {self.estado}>"
+
+class Agendador:
+    def __init__(self, max_threads=TAREFAS_MAX):
+        self.max_threads = max_threads
+        self._lock = threading.Lock()
+        self._fila = deque()
+        self._rodando = []
+
+    def enviar(self, rotulo, fn, exclusiva=False, cancelavel=True):
+        tarefa = Tarefa(rotulo, fn, exclusiva, cancelavel)
+        with self._lock:
+            self._fila.append(tarefa)
+            self._despachar()
+        return tarefa
+
+    def cancelar(self, tarefa):
+        # na fila: sai sem rodar; rodando: sinaliza (a função confere entre blocos)
+        with self._lock:
+            if tarefa in self._fila:
+                self._fila.remove(tarefa)
+                self._encerrar(tarefa, CANCELADA, False, "Cancelada antes de iniciar")
+                self._despachar()
+                return True
+        return tarefa.cancelar()
+
+    def tarefas(self):
+        # rodando primeiro, depois a fila, na ordem de envio
+        with self._lock:
+            return list(self._rodando) + list(self._fila)
+
+    def ocupado(self):
+        with self._lock:
+            return bool(self._rodando or self._fila)
+
+    def aguardar(self, timeout=None):
+        # espera todas as tarefas (enviadas até agora) terminarem
+        limite = None if timeout is None else time.monotonic() + timeout
+        for tarefa in self.tarefas():
+            restante = None if limite is None else max(0.0, limite - time.monotonic())
+            if not tarefa.aguardar(restante):
+                return False
+        return True
+
+    def _pode_iniciar(self, tarefa):
+        if len(self._rodando) >= self.max_threads:
+            return False
+        if tarefa.exclusiva:
+            return not self._rodando
+        return not any(t.exclusiva for t in self._rodando)
+
+    def _despachar(self):
+        # chamado com o lock; inicia, na ordem, as tarefas compatíveis com as que estão rodando
+        while self._fila and self._pode_iniciar(self._fila[0]):
+            tarefa = self._fila.popleft()
+            tarefa.estado = RODANDO
+            tarefa.inicio = time.time()
+            self._rodando.append(tarefa)
+            threading.Thread(target=self._executar, args=(tarefa,), daemon=True,
+                             name=f"tarefa-{tarefa.id}").start()
+
+    def _executar(self, tarefa):
+        try:
+            with diag.operacao("tarefa", tarefa.rotulo):
+                ok, msg = tarefa.fn(tarefa)
+            estado = CANCELADA if not ok and tarefa.cancelada else CONCLUIDA
+        except CancelledError:
+            ok, msg, estado = False, "Cancelada", CANCELADA
+        except Exception as e:
+            tarefa.erro = traceback.format_exc()
+            ok, msg, estado = False, f"Falha: {e}", FALHOU
+        with self._lock:
+            self._rodando.remove(tarefa)
+            self._encerrar(tarefa, estado, ok, msg)
+            self._despachar()
+
+    def _encerrar(self, tarefa, estado, ok, msg):
+        tarefa.estado, tarefa.ok, tarefa.msg = estado, ok, msg
+        tarefa.fim = time.time()
+        tarefa._terminou.set()
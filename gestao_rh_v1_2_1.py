@@ -1,305 +1,66 @@
 # gestao_rh.py
+import time
+_T0 = time.perf_counter()  # início do carregamento, para o perfil de abertura
 import os
-import shutil
-import sqlite3
+import queue
+import threading
 import traceback
 import sys
 from datetime import datetime
 import customtkinter as ctk
 from tkinter import ttk, filedialog, messagebox
-from PIL import Image, ImageDraw, ImageOps
+from PIL import Image, ImageOps
 
-# opcionais
-try:
-    import pandas as pd
-except Exception:
-    pd = None
-
-try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib import colors
-    from reportlab.pdfgen import canvas as rcanvas
-except Exception:
-    rcanvas = None
-
-# -----------------------
-# CONFIG
-APP_DIR = r"C:\GestaoRH"
-DB_PATH = os.path.join(APP_DIR, "employees.db")
-LOGO_PATH = os.path.join(APP_DIR, "logo.png")
-REPORTS_DIR = os.path.join(APP_DIR, "Relatorios")
-os.makedirs(REPORTS_DIR, exist_ok=True)
+import gestao_rh_core as core
+import gestao_rh_diagnostico as diag
+from gestao_rh_tarefas import Agendador, CANCELADA, RODANDO
+from gestao_rh_core import (
+    BASE_COLUMNS, EMPRESA_COLUMNS, GRID_PAGE_SIZE, PaginadorColaboradores, interromper_leitura,
+    inicializar_sistema, fechar_conexao, backup_db, restaurar_db,
+    backup_incremental, restaurar_incremental, inserir_colaborador, atualizar_colaborador_db,
+    atualizar_campo_db, alteraria_empresa, excluir_colaborador_db, import_csv, import_excel,
+    export_csv, export_excel, gerar_contracheque_pdf, gerar_contracheques_lote, recalcular_folha,
+    COLUNAS_RESUMO, resumo_folha, verificar_resumo_folha, verificar_cpf_duplicados, salvar_edicoes,
+    guardar_anexo, caminho_anexo, miniatura_anexo,
+)
+from gestao_rh_folha import salario_liquido, valor_moeda
 
 # -----------------------
-# DB: esquema base (colunas atuais)
-BASE_COLUMNS = [
-    ("id", "INTEGER PRIMARY KEY AUTOINCREMENT"),
-    ("nome", "TEXT"),
-    ("identidade", "TEXT"),
-    ("nome_mae", "TEXT"),
-    ("nome_pai", "TEXT"),
-    ("cpf", "TEXT"),
-    ("cep", "TEXT"),
-    ("endereco", "TEXT"),
-    ("numero", "TEXT"),
-    ("bairro", "TEXT"),
-    ("complemento", "TEXT"),
-    ("nascimento", "TEXT"),
-    ("telefone", "TEXT"),
-    ("email", "TEXT"),
-    ("cargo", "TEXT"),
-    ("salario_inicial", "REAL"),
-    ("salario_bruto", "REAL"),
-    ("optante_passagem", "TEXT"),
-    ("valor_passagem", "REAL"),
-    ("abono_salarial", "TEXT"),
-    ("valor_abono", "REAL"),
-    ("salario_liquido", "REAL"),
-    ("fim_contrato", "TEXT"),
-    ("empresa", "TEXT"),
-    ("endereco_empresa", "TEXT"),
-    ("numero_empresa", "TEXT"),
-    ("cidade", "TEXT"),
-    ("bairro_empresa", "TEXT"),
-    ("cnpj", "TEXT"),
-    ("telefone_empresa", "TEXT"),
-    ("email_empresa", "TEXT"),
-    ("anexo_pdf", "TEXT")  # caminho para PDF anexado (opcional)
-]
+# Grade / busca
+GRID_PREFETCH = 100  # linhas carregadas além da janela visível, em cada direção
+GRID_ROW_HEIGHT = 20  # altura padrão da linha da ttk.Treeview, em px
+BUSCA_DEBOUNCE_MS = 250  # espera após a última tecla antes de consultar
+BUSCA_POLL_MS = 30
+COLUNAS_MOEDA = ("salario_bruto", "valor_passagem", "valor_abono", "salario_liquido", "salario_inicial")
+CONFLITOS_LISTADOS = 15  # células em conflito mostradas na pergunta ao salvar a edição em lote
+TAREFAS_POLL_MS = 100  # leitura do progresso das tarefas em segundo plano
 
 # -----------------------
-# WIZARD / INIT
-def inicializar_sistema():
-    os.makedirs(APP_DIR, exist_ok=True)
-    os.makedirs(REPORTS_DIR, exist_ok=True)
-    # cria logo exemplo se não existir
-    if not os.path.exists(LOGO_PATH):
-        try:
-            img = Image.new("RGB", (480, 140), color="#2b5797")
-            draw = ImageDraw.Draw(img)
-            text = "Gestão RH"
-            # centraliza texto grosso
-            w, h = draw.textsize(text)
-            draw.text(((480 - w) / 2, (140 - h) / 2), text, fill="white")
-            img.save(LOGO_PATH)
-        except Exception:
-            pass
-    # criar DB e migrar esquema
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    # cria tabela se não existir (com apenas id e nome para evitar erros), depois atualiza colunas
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS colaboradores (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT
-        )
-    """)
-    conn.commit()
-    # garantir colunas do BASE_COLUMNS
-    cur_cols = {}
-    cur = conn.cursor()
-    cur.execute("PRAGMA table_info(colaboradores)")
-    for r in cur.fetchall():
-        cur_cols[r[1]] = r[2]  # name: type
-    # add missing columns
-    for col_name, col_type in BASE_COLUMNS:
-        if col_name in cur_cols:
-            continue
-        if col_name == "id":  # já existe
-            continue
-        try:
-            conn.execute(f"ALTER TABLE colaboradores ADD COLUMN {col_name} {col_type}")
-            conn.commit()
-        except Exception:
-            # se falhar, ignore e continue
-            pass
-    conn.close()
+# Perfil de abertura: GESTAO_RH_PERFIL_INICIO=1 registra o tempo até a primeira janela,
+# por fase, em stderr e em APP_DIR/inicio.log; =sair fecha o app logo depois (medições
+# automatizadas, ver benchmarks/bench_inicio.py).
+PERFIL_INICIO = os.environ.get("GESTAO_RH_PERFIL_INICIO", "")
+_fases_inicio = []
 
-# -----------------------
-# DB helpers
-def conectar():
-    return sqlite3.connect(DB_PATH)
-
-def listar_colaboradores(filtro=""):
-    conn = conectar()
-    cur = conn.cursor()
-    if filtro:
-        q = "SELECT * FROM colaboradores WHERE nome LIKE ? OR cargo LIKE ? ORDER BY id DESC"
-        cur.execute(q, (f"%{filtro}%", f"%{filtro}%"))
-    else:
-        q = "SELECT * FROM colaboradores ORDER BY id DESC"
-        cur.execute(q)
-    rows = cur.fetchall()
-    conn.close()
-    return rows
-
-def inserir_colaborador(d):
-    conn = conectar()
-    cur = conn.cursor()
-    cols = [c[0] for c in BASE_COLUMNS if c[0] != "id"]
-    placeholders = ",".join("?" for _ in cols)
-    q = f"INSERT INTO colaboradores ({','.join(cols)}) VALUES ({placeholders})"
-    cur.execute(q, tuple(d.get(col, "") for col in cols))
-    conn.commit()
-    conn.close()
-    return cur.lastrowid
-
-def atualizar_colaborador_db(id_, d):
-    conn = conectar()
-    cur = conn.cursor()
-    cols = [c[0] for c in BASE_COLUMNS if c[0] != "id"]
-    set_clause = ",".join(f"{c}=?" for c in cols)
-    q = f"UPDATE colaboradores SET {set_clause} WHERE id=?"
-    cur.execute(q, tuple(d.get(col, "") for col in cols) + (id_,))
-    conn.commit()
-    conn.close()
-
-def excluir_colaborador_db(id_):
-    conn = conectar()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM colaboradores WHERE id=?", (id_,))
-    conn.commit()
-    conn.close()
-
-# export/import helpers
-def export_csv(path):
-    rows = listar_colaboradores()
-    if not rows:
-        return False, "Nenhum registro"
-    import csv
-    cols = [c[0] for c in BASE_COLUMNS]
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        w.writerow(cols)
-        for r in rows:
-            w.writerow(r)
-    return True, f"CSV salvo em {path}"
-
-def import_csv(path):
-    import csv
-    with open(path, newline="", encoding="utf-8") as f:
-        r = csv.reader(f)
-        header = next(r, None)
-        # map header to our columns where possible
-        for row in r:
-            # build dict
-            d = {}
-            for i, v in enumerate(row):
-                if i < len(header):
-                    col = header[i]
-                    if col in [c[0] for c in BASE_COLUMNS]:
-                        d[col] = v
-            # insert
-            inserir_colaborador(d)
-    return True, "Importado CSV (tentativa) - verifique dados"
-
-def export_excel(path):
-    if pd is None:
-        return False, "pandas não instalado"
-    rows = listar_colaboradores()
-    cols = [c[0] for c in BASE_COLUMNS]
-    df = pd.DataFrame(rows, columns=cols)
-    df.to_excel(path, index=False)
-    return True, f"Excel salvo em {path}"
-
-def import_excel(path):
-    if pd is None:
-        return False, "pandas não instalado"
-    df = pd.read_excel(path)
-    for _, row in df.iterrows():
-        d = {}
-        for col in df.columns:
-            if col in [c[0] for c in BASE_COLUMNS]:
-                d[col] = row[col]
-        inserir_colaborador(d)
-    return True, "Excel importado"
+def _marcar_fase(nome):
+    if PERFIL_INICIO:
+        _fases_inicio.append((nome, time.perf_counter()))
 
-# -----------------------
-# PDF contracheque
-def gerar_contracheque_pdf(record):
-    if rcanvas is None:
-        raise RuntimeError("reportlab não instalado")
-    # record is tuple matching SELECT *
-    cols = [c[0] for c in BASE_COLUMNS]
-    data = dict(zip(cols, record))
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    safe_name = (data.get("nome") or "colaborador").replace(" ", "_")
-    out_path = os.path.join(REPORTS_DIR, f"contracheque_{safe_name}_{ts}.pdf")
-    c = rcanvas.Canvas(out_path, pagesize=A4)
-    w, h = A4
-
-    # header band
-    c.setFillColor(colors.HexColor("#2b5797"))
-    c.rect(0, h - 90, w, 90, fill=1, stroke=0)
-    c.setFillColor(colors.white)
-    c.setFont("Helvetica-Bold", 18)
-    c.drawString(40, h - 55, "CONTRACHEQUE")
-    # logo right
+def _relatorio_inicio():
+    anterior = _T0
+    linhas = []
+    for nome, t in _fases_inicio:
+        linhas.append(f"{nome:<22}{(t - anterior) * 1000:>9.1f} ms")
+        anterior = t
+    linhas.append(f"{'primeira janela':<22}{(anterior - _T0) * 1000:>9.1f} ms (total)")
+    texto = "\n".join(linhas)
+    print(texto, file=sys.stderr)
     try:
-        if os.path.exists(LOGO_PATH):
-            c.drawImage(LOGO_PATH, w - 160, h - 80, width=120, height=60, preserveAspectRatio=True)
-    except Exception:
+        with open(os.path.join(core.APP_DIR, "inicio.log"), "a", encoding="utf-8") as f:
+            f.write(f"{datetime.now():%Y-%m-%d %H:%M:%S}\n{texto}\n")
+    except OSError:
         pass
 
-    # sections
-    left_x = 40
-    right_x = w / 2 + 10
-    y = h - 120
-    line_h = 16
-    c.setFont("Helvetica", 10)
-    # employee & company
-    c.setFillColor(colors.black)
-    c.drawString(left_x, y, f"Nome: {data.get('nome','')}")
-    c.drawString(right_x, y, f"Empresa: {data.get('empresa','')}")
-    y -= line_h
-    c.drawString(left_x, y, f"Cargo: {data.get('cargo','')}")
-    c.drawString(right_x, y, f"CNPJ: {data.get('cnpj','')}")
-    y -= line_h
-    c.drawString(left_x, y, f"CPF: {data.get('cpf','')}")
-    c.drawString(right_x, y, f"Endereço: {data.get('endereco_empresa','')} {data.get('numero_empresa','')}")
-    y -= line_h * 1.2
-
-    # financial block with border
-    box_x = left_x
-    box_w = w - 2 * left_x
-    box_h = 140
-    c.setStrokeColor(colors.HexColor("#cfcfcf"))
-    c.setLineWidth(0.5)
-    c.rect(box_x, y - box_h + 20, box_w, box_h, stroke=1, fill=0)
-    inner_y = y - 10
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(box_x + 8, inner_y, "Detalhamento Salarial")
-    inner_y -= 18
-    c.setFont("Helvetica", 10)
-    bruto = float(data.get("salario_bruto") or 0)
-    passagem = float(data.get("valor_passagem") or 0)
-    abono = float(data.get("valor_abono") or 0)
-    liquido = float(data.get("salario_liquido") or max(0, bruto - (passagem + abono)))
-    c.drawString(box_x + 12, inner_y, f"Salário Bruto: R$ {bruto:,.2f}")
-    c.drawRightString(box_x + box_w - 12, inner_y, f"Salário Líquido: R$ {liquido:,.2f}")
-    inner_y -= 16
-    c.drawString(box_x + 12, inner_y, f"Valor Passagem: R$ {passagem:,.2f}")
-    c.drawString(box_x + 220, inner_y, f"Abono Salarial: R$ {abono:,.2f}")
-    inner_y -= 18
-    c.drawString(box_x + 12, inner_y, f"Fim do Contrato: {data.get('fim_contrato') or 'Indeterminado'}")
-
-    # signature lines
-    sig_y = box_y = y - box_h - 40
-    c.line(left_x + 20, sig_y, left_x + 200, sig_y)
-    c.drawString(left_x + 25, sig_y - 14, "Assinatura do Colaborador")
-    c.line(w - 220, sig_y, w - 40, sig_y)
-    c.drawString(w - 215, sig_y - 14, "Assinatura da Empresa")
-
-    c.showPage()
-    c.save()
-    # open file
-    try:
-        os.startfile(out_path)
-    except Exception:
-        # fallback: print path
-        messagebox.showinfo("Contracheque gerado", f"Arquivo salvo em:\n{out_path}")
-    return out_path
-
 # -----------------------
 # UI main
 class App(ctk.CTk):
@@ -321,9 +82,9 @@ class App(ctk.CTk):
         header.pack_propagate(False)
         tk_label = ctk.CTkLabel(header, text="Gestão RH — Colaboradores e Folha", font=ctk.CTkFont(size=18, weight="bold"))
         tk_label.pack(side="left", padx=20)
-        if os.path.exists(LOGO_PATH):
+        if os.path.exists(core.LOGO_PATH):
             try:
-                img = Image.open(LOGO_PATH)
+                img = Image.open(core.LOGO_PATH)
                 img = ImageOps.contain(img, (180, 60))
                 logo_img = ctk.CTkImage(img, size=(180, 60))
                 ctk.CTkLabel(header, image=logo_img, text="📷").pack(side="right", padx=20)
@@ -332,16 +93,45 @@ class App(ctk.CTk):
             except Exception:
                 pass
 
+        # importação, exportação, PDFs e backup rodam fora da thread do Tk
+        self.agendador = Agendador()
+        self._tarefas = {}  # tarefa -> concluir(tarefa), chamado no loop do Tk
+        self._tarefas_after = None
+        self._lote_tarefa = None
+
         # tabs
         self.tabs = ctk.CTkTabview(self)
         self.tabs.pack(expand=True, fill="both", padx=12, pady=12)
         self.tab_col = self.tabs.add("Colaboradores")
         self.tab_reg = self.tabs.add("Registros")
+        self.tab_painel = self.tabs.add("Painel")
+        self.tab_diag = self.tabs.add("Diagnóstico")
         # create tab contents
         self.create_colaboradores_tab()
         self.create_registros_tab()
+        self.create_painel_tab()
+        self.create_diagnostico_tab()
+        self.tabs.configure(command=self.on_trocar_aba)
         # menu quick
         self.create_menu()
+        self._inicio_registrado = False
+        if PERFIL_INICIO:
+            self.bind("<Map>", self._janela_exibida, add="+")
+        self.after_idle(self._avisar_cpf_duplicados)
+
+    def _janela_exibida(self, event):
+        # <Map> também chega dos widgets filhos; só a primeira da janela principal interessa
+        if event.widget is not self or self._inicio_registrado:
+            return
+        self._inicio_registrado = True
+        _marcar_fase("janela exibida")
+        _relatorio_inicio()
+        if PERFIL_INICIO == "sair":
+            self.after_idle(self._sair_sem_confirmar)
+
+    def _sair_sem_confirmar(self):
+        self.destroy()
+        fechar_conexao()
 
     # -----------------------
     # Aba Colaboradores (form 3 colunas)
@@ -397,7 +187,7 @@ class App(ctk.CTk):
             ("cnpj", "CNPJ"),
             ("telefone_empresa", "Telefone da empresa"),
             ("email_empresa", "E-mail da empresa"),
-            ("anexo_pdf", "Anexo PDF (caminho)")
+            ("anexo_pdf", "Anexo PDF")
         ]
 
         # store entries
@@ -417,16 +207,33 @@ class App(ctk.CTk):
         for k, label in right_fields:
             make_field(right, k, label)
 
-        # attach PDF button for anexo_pdf
+        # attach PDF button for anexo_pdf: copia para o depósito de anexos (em segundo plano)
         def attach_pdf():
             path = filedialog.askopenfilename(title="Selecionar PDF de anexo", filetypes=[("PDF files", "*.pdf")])
             if not path:
                 return
-            self.form_vars["anexo_pdf"].delete(0, "end")
-            self.form_vars["anexo_pdf"].insert(0, path)
+            def concluir(tarefa):
+                if not tarefa.ok:
+                    messagebox.showerror("Anexo", f"Não foi possível anexar {os.path.basename(path)}:\n{tarefa.msg}")
+                    return
+                self.form_vars["anexo_pdf"].delete(0, "end")
+                self.form_vars["anexo_pdf"].insert(0, tarefa.msg)
+                self._mostrar_anexo(tarefa.msg)
+            self._executar_tarefa("Anexo", lambda t: (True, guardar_anexo(path, progresso=t.progresso)),
+                                  concluir, cancelavel=False)
 
         attach_btn = ctk.CTkButton(right, text="Anexar PDF", command=attach_pdf)
         attach_btn.pack(pady=(0,6))
+        # prévia da primeira página; clique abre o PDF
+        self._anexo_vazio = ctk.CTkImage(Image.new("RGBA", (1, 1), (0, 0, 0, 0)), size=(1, 1))
+        self._anexo_imagem = None
+        self._anexo_geracao = 0
+        self._anexo_esperando = None
+        self._anexo_after = None
+        self._anexo_fila = queue.Queue()
+        self.anexo_preview = ctk.CTkLabel(right, text="Sem anexo", image=self._anexo_vazio, cursor="hand2")
+        self.anexo_preview.pack(pady=(0,6))
+        self.anexo_preview.bind("<Button-1>", lambda e: self.on_abrir_anexo())
 
         # action buttons
         actions = ctk.CTkFrame(card)
@@ -447,11 +254,21 @@ class App(ctk.CTk):
 
         top = ctk.CTkFrame(frame)
         top.pack(fill="x", pady=(6,8))
-        self.search_var = ctk.CTkEntry(top, placeholder_text="Buscar por nome ou cargo...")
+        self.search_var = ctk.CTkEntry(top, placeholder_text="Buscar por nome, cargo, empresa, CPF, e-mail ou cidade...")
         self.search_var.pack(side="left", padx=(8,4), fill="x", expand=True)
         ctk.CTkButton(top, text="Buscar", width=100, command=self.on_buscar).pack(side="left", padx=4)
+        # busca enquanto digita (debounce + consulta em thread)
+        self.search_var.bind("<KeyRelease>", self.on_search_key)
+        self._busca_after = None
+        self._busca_geracao = 0
+        self._busca_dono = None  # thread da busca em curso (para interrompê-la)
+        self._busca_fila = queue.Queue()
+        self._busca_aguardando = False
         # quick action buttons
         ctk.CTkButton(top, text="Gerar Contracheque", width=140, command=self.on_gerar_pdf_selected).pack(side="left", padx=6)
+        self.btn_lote = ctk.CTkButton(top, text="Contracheques (lote)", width=150, command=self.on_gerar_lote)
+        self.btn_lote.pack(side="left", padx=6)
+        ctk.CTkButton(top, text="Recalcular folha", width=130, command=self.on_recalcular_folha).pack(side="left", padx=6)
         ctk.CTkButton(top, text="Importar Excel/CSV", width=140, command=self.on_import).pack(side="left", padx=6)
         ctk.CTkButton(top, text="Exportar Excel/CSV", width=140, command=self.on_export).pack(side="left", padx=6)
         ctk.CTkButton(top, text="Backup DB", width=120, command=self.on_backup).pack(side="left", padx=6)
@@ -473,20 +290,26 @@ class App(ctk.CTk):
                 self.tree.column(col, width=220, anchor="w")
             else:
                 self.tree.column(col, width=140, anchor="center")
-        # scrollbars
-        ysb = ttk.Scrollbar(tv_frame, orient="vertical", command=self.tree.yview)
+        # scrollbars (a vertical percorre o total de registros, não só as linhas carregadas)
+        self.ysb = ysb = ttk.Scrollbar(tv_frame, orient="vertical", command=self.on_scroll_grid)
         xsb = ttk.Scrollbar(tv_frame, orient="horizontal", command=self.tree.xview)
-        self.tree.configure(yscroll=ysb.set, xscroll=xsb.set)
+        self.tree.configure(xscroll=xsb.set)
         ysb.pack(side="right", fill="y")
         xsb.pack(side="bottom", fill="x")
         self.tree.pack(fill="both", expand=True, side="left")
         # zebra tags
         self.tree.tag_configure('odd', background='#f0f0f0')
         self.tree.tag_configure('even', background='#e0e0e0')
+        self.tree.tag_configure('editado', background='#fff2a8')  # alterações da edição em lote ainda não salvas
 
         # bind selection / double click edit
         self.tree.bind("<<TreeviewSelect>>", self.on_tree_select)
         self.tree.bind("<Double-1>", self.on_double_click_cell)
+        # grade virtual: redesenha a janela visível ao redimensionar / rolar
+        self.tree.bind("<Configure>", lambda e: self._render_grid())
+        self.tree.bind("<MouseWheel>", self.on_mousewheel_grid)
+        self.tree.bind("<Button-4>", self.on_mousewheel_grid)
+        self.tree.bind("<Button-5>", self.on_mousewheel_grid)
 
         # navigation buttons
         nav = ctk.CTkFrame(frame)
@@ -497,12 +320,143 @@ class App(ctk.CTk):
         ctk.CTkButton(nav, text="< Anterior", command=self.on_prev).pack(side="left", padx=6)
         ctk.CTkButton(nav, text="Próximo >", command=self.on_next).pack(side="left", padx=6)
         ctk.CTkButton(nav, text="Último >>", command=self.on_last).pack(side="left", padx=6)
+        # edição em lote: células editadas ficam só na memória até "Salvar alterações"
+        self._edicoes = {}  # id -> {coluna: (original, novo)}
+        self._col_pos = {c[0]: i for i, c in enumerate(BASE_COLUMNS)}
+        self.edicao_lote = ctk.CTkSwitch(nav, text="Edição em lote", command=self.on_alternar_edicao_lote)
+        self.edicao_lote.pack(side="right", padx=8)
+        self.btn_descartar_edicoes = ctk.CTkButton(nav, text="Descartar", width=100, command=self.on_descartar_edicoes)
+        self.btn_salvar_edicoes = ctk.CTkButton(nav, text="Salvar alterações", width=150, command=self.on_salvar_edicoes)
 
         # load data
         self.current_index = 0
-        self.records_cache = []
+        self.grid_offset = 0
+        self._grid_itens = 0
+        self.fonte = PaginadorColaboradores()
         self.reload_records()
 
+    # -----------------------
+    # Aba Painel: totais da folha por empresa/cargo (tabela resumo_folha, O(nº de grupos))
+    def create_painel_tab(self):
+        frame = ctk.CTkFrame(self.tab_painel)
+        frame.pack(fill="both", expand=True, padx=8, pady=8)
+
+        top = ctk.CTkFrame(frame)
+        top.pack(fill="x", pady=(6,8))
+        self.painel_por = ctk.CTkSegmentedButton(top, values=["Por empresa", "Por cargo"],
+                                                 command=lambda _: self.atualizar_painel())
+        self.painel_por.set("Por empresa")
+        self.painel_por.pack(side="left", padx=8)
+        ctk.CTkButton(top, text="Atualizar", width=100, command=self.atualizar_painel).pack(side="left", padx=6)
+        ctk.CTkButton(top, text="Verificar consistência", width=160,
+                      command=self.on_verificar_painel).pack(side="left", padx=6)
+        self.painel_total = ctk.CTkLabel(top, text="")
+        self.painel_total.pack(side="right", padx=8)
+
+        tv_frame = ctk.CTkFrame(frame)
+        tv_frame.pack(fill="both", expand=True, padx=6, pady=6)
+        self.painel_tree = ttk.Treeview(tv_frame, columns=COLUNAS_RESUMO, show="headings")
+        for col in COLUNAS_RESUMO:
+            self.painel_tree.heading(col, text=col.capitalize())
+            if col == "grupo":
+                self.painel_tree.column(col, width=320, anchor="w")
+            else:
+                self.painel_tree.column(col, width=130, anchor="e")
+        ysb = ttk.Scrollbar(tv_frame, orient="vertical", command=self.painel_tree.yview)
+        self.painel_tree.configure(yscroll=ysb.set)
+        ysb.pack(side="right", fill="y")
+        self.painel_tree.pack(fill="both", expand=True, side="left")
+
+    def on_trocar_aba(self):
+        if self.tabs.get() == "Painel":
+            self.atualizar_painel()
+        elif self.tabs.get() == "Diagnóstico":
+            self.atualizar_diagnostico()
+
+    def atualizar_painel(self):
+        por = "cargo" if self.painel_por.get() == "Por cargo" else "empresa"
+        self.painel_tree.heading("grupo", text=por.capitalize())
+        self.painel_tree.delete(*self.painel_tree.get_children())
+        linhas = resumo_folha(por)
+        for grupo, qtd, *valores in linhas:
+            self.painel_tree.insert("", "end", values=[grupo, qtd] + [f"{v:,.2f}" for v in valores])
+        qtd = sum(r[1] for r in linhas)
+        bruto = sum(r[2] for r in linhas)
+        liquido = sum(r[3] for r in linhas)
+        self.painel_total.configure(
+            text=f"{len(linhas)} grupo(s) · {qtd} colaborador(es) · bruto R$ {bruto:,.2f} · líquido R$ {liquido:,.2f}")
+
+    def on_verificar_painel(self):
+        def reconstruido(t):
+            self.atualizar_painel()
+            (messagebox.showinfo if t.ok else messagebox.showerror)("Painel", t.msg)
+        def concluir(t):
+            if t.ok:
+                messagebox.showinfo("Painel", t.msg)
+            elif t.erro:
+                messagebox.showerror("Painel", t.msg)
+            elif messagebox.askyesno("Painel", f"{t.msg}\n\nReconstruir o resumo a partir dos colaboradores?"):
+                self._executar_tarefa("Reconstrução do painel", lambda t: verificar_resumo_folha(corrigir=True),
+                                      reconstruido, exclusiva=True, cancelavel=False)
+        self._executar_tarefa("Verificação do painel", lambda t: verificar_resumo_folha(), concluir,
+                              cancelavel=False)
+
+    # -----------------------
+    # Aba Diagnóstico: tempo por operação (p50/p90/p99) e SQL das operações lentas
+    def create_diagnostico_tab(self):
+        frame = ctk.CTkFrame(self.tab_diag)
+        frame.pack(fill="both", expand=True, padx=8, pady=8)
+
+        top = ctk.CTkFrame(frame)
+        top.pack(fill="x", pady=(6,8))
+        self.diag_ativo = ctk.CTkSwitch(top, text="Medir operações", command=self.on_alternar_diagnostico)
+        if diag.ativo:
+            self.diag_ativo.select()
+        self.diag_ativo.pack(side="left", padx=8)
+        ctk.CTkButton(top, text="Atualizar", width=100, command=self.atualizar_diagnostico).pack(side="left", padx=6)
+        ctk.CTkButton(top, text="Limpar", width=100, command=self.on_limpar_diagnostico).pack(side="left", padx=6)
+        ctk.CTkButton(top, text="Gravar trace...", width=130, command=self.on_trace_diagnostico).pack(side="left", padx=6)
+        self.diag_status = ctk.CTkLabel(top, text="")
+        self.diag_status.pack(side="right", padx=8)
+
+        self.diag_texto = ctk.CTkTextbox(frame, font=ctk.CTkFont(family="Courier", size=12), wrap="none")
+        self.diag_texto.pack(fill="both", expand=True, padx=6, pady=6)
+
+    def atualizar_diagnostico(self):
+        trace = diag.arquivo_trace()
+        self.diag_status.configure(text=("Medindo" if diag.ativo else "Desligado") +
+                                   (f" · trace em {trace}" if trace else ""))
+        texto = diag.relatorio() if diag.resumo() else \
+            "Nenhuma operação medida. Ligue \"Medir operações\" e use o sistema normalmente."
+        self.diag_texto.configure(state="normal")
+        self.diag_texto.delete("1.0", "end")
+        self.diag_texto.insert("1.0", texto)
+        self.diag_texto.configure(state="disabled")
+
+    def on_alternar_diagnostico(self):
+        if self.diag_ativo.get():
+            diag.ligar()
+        else:
+            diag.desligar()
+        self.atualizar_diagnostico()
+
+    def on_limpar_diagnostico(self):
+        diag.limpar()
+        self.atualizar_diagnostico()
+
+    def on_trace_diagnostico(self):
+        path = filedialog.asksaveasfilename(defaultextension=".jsonl", filetypes=[("JSON Lines", "*.jsonl")],
+                                            initialfile=f"trace_{datetime.now():%Y%m%d_%H%M%S}.jsonl")
+        if not path:
+            return
+        try:
+            diag.ligar(trace=path)
+        except OSError as e:
+            messagebox.showerror("Diagnóstico", f"Não foi possível gravar em {path}: {e}")
+            return
+        self.diag_ativo.select()
+        self.atualizar_diagnostico()
+
     # -----------------------
     # Actions: form handlers
     def on_salvar(self):
@@ -511,23 +465,14 @@ class App(ctk.CTk):
             for col in [c[0] for c in BASE_COLUMNS if c[0] != "id"]:
                 v = self.form_vars[col].get() if hasattr(self.form_vars[col], "get") else ""
                 d[col] = v
-            # calculate salario_liquido if not provided
-            try:
-                bruto = float(d.get("salario_bruto") or 0)
-            except Exception:
-                bruto = 0
-            try:
-                passagem = float(d.get("valor_passagem") or 0)
-            except Exception:
-                passagem = 0
-            try:
-                abono = float(d.get("valor_abono") or 0)
-            except Exception:
-                abono = 0
-            d["salario_liquido"] = round(bruto - (passagem + abono), 2)
-            inserir_colaborador(d)
+            d["salario_liquido"] = salario_liquido(d)
+            cascata = alteraria_empresa(d)
+            row = inserir_colaborador(d)
             messagebox.showinfo("Sucesso", "Colaborador salvo.")
-            self.reload_records()
+            if cascata:
+                self.reload_records(self.fonte.filtro)
+            else:
+                self._grid_aplicar(*self.fonte.aplicar_insercao(row), row=row)
             self.on_limpar()
         except Exception as e:
             messagebox.showerror("Erro", f"Falha ao salvar:\n{e}\n\n{traceback.format_exc()}")
@@ -541,17 +486,18 @@ class App(ctk.CTk):
         d = {}
         for col in [c[0] for c in BASE_COLUMNS if c[0] != "id"]:
             d[col] = self.form_vars[col].get()
-        # recalc
+        d["salario_liquido"] = salario_liquido(d)
+        cascata = alteraria_empresa(d)
         try:
-            bruto = float(d.get("salario_bruto") or 0)
-            passagem = float(d.get("valor_passagem") or 0)
-            abono = float(d.get("valor_abono") or 0)
-            d["salario_liquido"] = round(bruto - (passagem + abono), 2)
-        except Exception:
-            pass
-        atualizar_colaborador_db(id_, d)
+            row = atualizar_colaborador_db(id_, d)
+        except ValueError as e:  # CPF de outro colaborador
+            messagebox.showerror("Erro", str(e))
+            return
         messagebox.showinfo("Atualizado", "Registro atualizado.")
-        self.reload_records()
+        if cascata:
+            self.reload_records(self.fonte.filtro)
+        else:
+            self._grid_aplicar(*self.fonte.aplicar_atualizacao(row), row=row)
 
     def on_excluir(self):
         sel = self.tree.selection()
@@ -562,7 +508,7 @@ class App(ctk.CTk):
         id_ = int(self.tree.item(sel[0], "values")[0])
         excluir_colaborador_db(id_)
         messagebox.showinfo("Excluído", "Registro excluído.")
-        self.reload_records()
+        self._grid_aplicar(*self.fonte.aplicar_remocao(id_))
         self.on_limpar()
 
     def on_limpar(self):
@@ -573,41 +519,251 @@ class App(ctk.CTk):
                     widget.delete(0, "end")
                 except Exception:
                     pass
+        self._mostrar_anexo(None)
+
+    # -----------------------
+    # Prévia do anexo: do cache de miniaturas na hora; fora dele, gerada numa thread
+    # (o resultado de uma seleção anterior é descartado pela geração)
+    def _mostrar_anexo(self, valor):
+        self._anexo_geracao += 1
+        caminho = None
+        if valor:
+            try:
+                caminho = miniatura_anexo(valor, gerar=False)
+            except OSError:
+                pass
+        if caminho or not valor:
+            self._exibir_miniatura(valor, caminho)
+            return
+        self.anexo_preview.configure(image=self._anexo_vazio, text="Gerando prévia...")
+        self._anexo_esperando = self._anexo_geracao
+        threading.Thread(target=self._gerar_miniatura, args=(self._anexo_geracao, valor), daemon=True).start()
+        if self._anexo_after is None:
+            self._anexo_after = self.after(BUSCA_POLL_MS, self._verificar_miniatura)
+
+    def _gerar_miniatura(self, geracao, valor):
+        try:
+            caminho = miniatura_anexo(valor)
+        except Exception:
+            caminho = None
+        self._anexo_fila.put((geracao, valor, caminho))
+
+    def _verificar_miniatura(self):
+        self._anexo_after = None
+        while True:
+            try:
+                geracao, valor, caminho = self._anexo_fila.get_nowait()
+            except queue.Empty:
+                break
+            if geracao == self._anexo_geracao:
+                self._exibir_miniatura(valor, caminho)
+        if self._anexo_esperando == self._anexo_geracao:
+            self._anexo_after = self.after(BUSCA_POLL_MS, self._verificar_miniatura)
+
+    def _exibir_miniatura(self, valor, caminho):
+        self._anexo_esperando = None
+        if caminho:
+            try:
+                img = Image.open(caminho)
+                img.load()
+                self._anexo_imagem = ctk.CTkImage(img, size=img.size)
+                self.anexo_preview.configure(image=self._anexo_imagem, text="")
+                return
+            except OSError:
+                pass
+        if not valor:
+            texto = "Sem anexo"
+        elif not os.path.isfile(caminho_anexo(valor)):
+            texto = "Anexo não encontrado"
+        else:
+            texto = "Sem prévia (clique para abrir)"
+        self._anexo_imagem = None
+        self.anexo_preview.configure(image=self._anexo_vazio, text=texto)
+
+    def on_abrir_anexo(self):
+        caminho = caminho_anexo(self.form_vars["anexo_pdf"].get().strip())
+        if not caminho:
+            return
+        if not os.path.isfile(caminho):
+            messagebox.showwarning("Anexo", f"Arquivo não encontrado:\n{caminho}")
+            return
+        try:
+            os.startfile(caminho)
+        except Exception:
+            messagebox.showinfo("Anexo", f"Anexo em:\n{caminho}")  # sem visualizador (ex.: Linux)
 
     # -----------------------
     # Tree / navigation operations
     def reload_records(self, filtro=""):
-        rows = listar_colaboradores(filtro)
-        self.records_cache = rows
-        # clear tree
-        for it in self.tree.get_children():
-            self.tree.delete(it)
-        # insert
-        for idx, r in enumerate(rows):
-            tag = 'odd' if idx % 2 == 0 else 'even'
-            self.tree.insert("", "end", values=r, tags=(tag,))
-        self.idx_label.configure(text=f"Registros: {len(rows)}")
+        self._exibir_fonte(PaginadorColaboradores(filtro))
+
+    def _exibir_fonte(self, fonte):
+        self.fonte = fonte
+        self.grid_offset = 0
+        self.idx_label.configure(text=f"Registros: {self.fonte.total}")
         # auto select first
-        if rows:
-            self.tree.selection_set(self.tree.get_children()[0])
-            self.tree.focus(self.tree.get_children()[0])
-            self.on_tree_select(None)
+        if self.fonte.total:
             self.current_index = 0
+            self._render_grid()
+            self._select_index(0)
         else:
             self.current_index = -1
+            self._render_grid()
+
+    def _linhas_visiveis(self):
+        altura = self.tree.winfo_height()
+        if altura <= 1:  # ainda não mapeada
+            return GRID_PAGE_SIZE // 4
+        return max(1, altura // GRID_ROW_HEIGHT - 1)
+
+    def _render_grid(self):
+        # a Treeview contém só a janela visível; os itens "r0".."rN" são reaproveitados
+        n = self._linhas_visiveis()
+        total = self.fonte.total
+        self.grid_offset = max(0, min(self.grid_offset, total - n))
+        rows = self.fonte.linhas(self.grid_offset, n)
+        self.fonte.prefetch(self.grid_offset - GRID_PREFETCH, self.grid_offset + n + GRID_PREFETCH)
+        # self._grid_itens: quantos "r<i>" existem (sem get_children()/exists() a cada passo)
+        for i, r in enumerate(rows):
+            idx = self.grid_offset + i
+            tag = 'odd' if idx % 2 == 0 else 'even'
+            if r[0] in self._edicoes:
+                r, tag = self._com_edicoes(r), 'editado'
+            if i < self._grid_itens:
+                self.tree.item(f"r{i}", values=r, tags=(tag,))
+            else:
+                self.tree.insert("", "end", iid=f"r{i}", values=r, tags=(tag,))
+        if len(rows) < self._grid_itens:
+            self.tree.delete(*(f"r{i}" for i in range(len(rows), self._grid_itens)))
+        self._grid_itens = len(rows)
+        # mantém a seleção no registro corrente, não na posição da tela
+        pos = self.current_index - self.grid_offset
+        if 0 <= pos < len(rows):
+            if self.tree.selection() != (f"r{pos}",):
+                self.tree.selection_set(f"r{pos}")
+        elif self.tree.selection():
+            self.tree.selection_remove(self.tree.selection())
+        if total:
+            self.ysb.set(self.grid_offset / total, (self.grid_offset + len(rows)) / total)
+        else:
+            self.ysb.set(0, 1)
+
+    def _grid_aplicar(self, tipo, pos, row=None):
+        # aplica uma mudança vinda dos helpers do DB sem recarregar a grade
+        if tipo is None:
+            return
+        if tipo == "atualizado":
+            i = pos - self.grid_offset
+            if 0 <= i < self._grid_itens:
+                if row[0] in self._edicoes:
+                    self.tree.item(f"r{i}", values=self._com_edicoes(row), tags=('editado',))
+                else:
+                    self.tree.item(f"r{i}", values=row, tags=('odd' if pos % 2 == 0 else 'even',))
+                if pos == self.current_index:
+                    self.on_tree_select(None)
+            return
+        if pos is None:  # a posição mudou fora do cache: volta ao início
+            self.current_index = 0 if self.fonte.total else -1
+        elif tipo == "inserido" and pos <= self.current_index:
+            self.current_index += 1
+        elif tipo == "removido" and pos < self.current_index:
+            self.current_index -= 1
+        self.current_index = min(self.current_index, self.fonte.total - 1)
+        self.idx_label.configure(text=f"Registros: {self.fonte.total}")
+        # só a janela visível é redesenhada (zebra inclusive)
+        self._render_grid()
+
+    def on_scroll_grid(self, *args):
+        if args[0] == "moveto":
+            self.grid_offset = int(float(args[1]) * self.fonte.total)
+        elif args[0] == "scroll":
+            passo = int(args[1])
+            if args[2] == "pages":
+                passo *= self._linhas_visiveis()
+            self.grid_offset += passo
+        self._render_grid()
+
+    def on_mousewheel_grid(self, event):
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self.on_scroll_grid("scroll", -3, "units")
+        else:
+            self.on_scroll_grid("scroll", 3, "units")
+        return "break"
 
     def on_buscar(self):
+        if self._busca_after:
+            self.after_cancel(self._busca_after)
+            self._busca_after = None
+        self._iniciar_busca()
+
+    def on_search_key(self, event=None):
+        # cada tecla reinicia a espera e aborta a consulta que ainda estiver rodando
+        if self._busca_after:
+            self.after_cancel(self._busca_after)
+        self._interromper_busca()
+        self._busca_after = self.after(BUSCA_DEBOUNCE_MS, self._iniciar_busca)
+
+    def _interromper_busca(self):
+        dono = self._busca_dono
+        if dono is not None:
+            interromper_leitura(dono)
+
+    def _iniciar_busca(self):
+        self._busca_after = None
+        self._busca_geracao += 1
+        geracao = self._busca_geracao
         filtro = self.search_var.get()
-        self.reload_records(filtro)
+        threading.Thread(target=self._executar_busca, args=(geracao, filtro), daemon=True).start()
+        if not self._busca_aguardando:
+            self._busca_aguardando = True
+            self.after(BUSCA_POLL_MS, self._verificar_busca)
+
+    def _executar_busca(self, geracao, filtro):
+        # roda fora do mainloop, pela conexão de leitura do core (usar_leitura); uma busca
+        # mais nova interrompe esta sem afetar as leituras da grade
+        fonte = None
+        self._interromper_busca()
+        eu = threading.get_ident()
+        self._busca_dono = eu
+        try:
+            fonte = PaginadorColaboradores(filtro)
+            fonte.prefetch(0, GRID_PAGE_SIZE)
+        except Exception:
+            fonte = None  # interrompida por uma busca mais nova (ou falhou)
+        finally:
+            if self._busca_dono == eu:
+                self._busca_dono = None
+            self._busca_fila.put((geracao, fonte))
+
+    def _verificar_busca(self):
+        while True:
+            try:
+                geracao, fonte = self._busca_fila.get_nowait()
+            except queue.Empty:
+                break
+            # resultados de buscas antigas são descartados
+            if geracao == self._busca_geracao:
+                self._busca_aguardando = False
+                if fonte is not None:
+                    self._exibir_fonte(fonte)
+                return
+        self.after(BUSCA_POLL_MS, self._verificar_busca)
 
     def on_tree_select(self, event):
         sel = self.tree.selection()
         if not sel:
             return
-        vals = self.tree.item(sel[0], "values")
+        # update current_index (itens da grade são posicionais: "r<i>" = grid_offset + i)
+        try:
+            self.current_index = self.grid_offset + int(sel[0][1:])
+        except Exception:
+            return
+        # a linha vem do cache do paginador (já carregada pela grade), não da Treeview
+        vals = self.fonte.linha(self.current_index)
+        if vals is None:
+            return
         # map to form
-        cols = [c[0] for c in BASE_COLUMNS]
-        for i, col in enumerate(cols):
+        for i, (col, _) in enumerate(BASE_COLUMNS):
             if col == "id":
                 continue
             widget = self.form_vars.get(col)
@@ -617,16 +773,7 @@ class App(ctk.CTk):
                     widget.insert(0, vals[i] if vals[i] is not None else "")
                 except Exception:
                     pass
-        # update current_index
-        try:
-            # find index in cache by id
-            id_ = int(vals[0])
-            for idx, r in enumerate(self.records_cache):
-                if r[0] == id_:
-                    self.current_index = idx
-                    break
-        except Exception:
-            pass
+        self._mostrar_anexo(vals[self._col_pos["anexo_pdf"]])
 
     def on_double_click_cell(self, event):
         # enable quick edit cell (creates entry over cell; updates DB only on Enter)
@@ -649,35 +796,146 @@ class App(ctk.CTk):
         def salvar_edicao(e=None):
             nv = edit.get()
             edit.destroy()
-            self.tree.set(row_id, column=col, value=nv)
-            # atualizar DB (somente essa coluna)
-            id_ = int(self.tree.item(row_id, "values")[0])
             col_name = [c[0] for c in BASE_COLUMNS][col_index]
-            # leitura row values into dict
-            conn = conectar(); cur = conn.cursor()
+            pos = self.grid_offset + int(row_id[1:])
+            if self.edicao_lote.get():
+                self._guardar_edicao(pos, col_name, nv)
+                return
+            # atualizar DB (somente essa coluna); a célula só muda com o valor gravado
+            valores = list(self.tree.item(row_id, "values"))
+            id_ = int(valores[0])
+            valores[col_index] = nv
+            row = None
+            cascata = col_name in EMPRESA_COLUMNS and alteraria_empresa(
+                dict(zip([c[0] for c in BASE_COLUMNS], valores)))
             try:
                 # type handling numeric
-                if col_name in ("salario_bruto","valor_passagem","valor_abono","salario_liquido","salario_inicial"):
-                    try:
-                        nv_eval = float(nv.replace(",",".")) if isinstance(nv, str) else float(nv)
-                    except Exception:
-                        nv_eval = 0.0
-                    cur.execute(f"UPDATE colaboradores SET {col_name}=? WHERE id=?", (nv_eval, id_))
+                # (salário bruto/passagem/abono recalculam o líquido no banco)
+                if col_name in COLUNAS_MOEDA:
+                    row = atualizar_campo_db(id_, col_name, valor_moeda(nv))
                 else:
-                    cur.execute(f"UPDATE colaboradores SET {col_name}=? WHERE id=?", (nv, id_))
-                conn.commit()
-            except Exception:
-                pass
-            finally:
-                conn.close()
-            # reload to recalc zebra & values
-            self.reload_records(self.search_var.get())
+                    row = atualizar_campo_db(id_, col_name, nv)
+            except ValueError as erro:  # CPF de outro colaborador
+                messagebox.showerror("Erro", str(erro))
+            except Exception as erro:
+                messagebox.showerror("Erro", f"Falha ao salvar:\n{erro}")
+            if row is None:
+                # não gravou (erro ou registro excluído): a linha volta ao que a grade tem
+                atual = self.fonte.linha(pos)
+                if atual is not None:
+                    self._grid_aplicar("atualizado", pos, row=atual)
+                return
+            if cascata:  # mudou a empresa: outras linhas também mudaram
+                self.reload_records(self.fonte.filtro)
+                return
+            # aplica só essa linha na grade (valores já convertidos pelo banco)
+            self._grid_aplicar(*self.fonte.aplicar_atualizacao(row), row=row)
         edit.bind("<Return>", salvar_edicao)
         edit.bind("<FocusOut>", salvar_edicao)
 
+    # -----------------------
+    # Edição em lote: cada célula guarda o valor lido do banco (original) e o editado;
+    # salvar grava tudo numa transação (salvar_edicoes), conferindo se o original mudou
+    def _com_edicoes(self, row):
+        valores = list(row)
+        for col, (_, novo) in self._edicoes[row[0]].items():
+            valores[self._col_pos[col]] = novo
+        return valores
+
+    def _guardar_edicao(self, pos, col_name, texto):
+        row = self.fonte.linha(pos)
+        if row is None:
+            return
+        id_ = row[0]
+        novo = valor_moeda(texto) if col_name in COLUNAS_MOEDA else texto
+        celulas = self._edicoes.setdefault(id_, {})
+        original = celulas[col_name][0] if col_name in celulas else row[self._col_pos[col_name]]
+        if novo == original or str(novo) == str(original if original is not None else ""):
+            celulas.pop(col_name, None)  # voltou ao valor do banco
+            if not celulas:
+                del self._edicoes[id_]
+        else:
+            celulas[col_name] = (original, novo)
+        self._grid_aplicar("atualizado", pos, row=row)
+        self._mostrar_edicoes()
+
+    def _mostrar_edicoes(self):
+        n = sum(len(c) for c in self._edicoes.values())
+        if n:
+            self.btn_salvar_edicoes.configure(text=f"Salvar alterações ({n})")
+            if not self.btn_salvar_edicoes.winfo_ismapped():
+                self.btn_salvar_edicoes.pack(side="right", padx=6, before=self.edicao_lote)
+                self.btn_descartar_edicoes.pack(side="right", padx=6, before=self.btn_salvar_edicoes)
+        else:
+            self.btn_salvar_edicoes.pack_forget()
+            self.btn_descartar_edicoes.pack_forget()
+
+    def on_alternar_edicao_lote(self):
+        if self.edicao_lote.get() or not self._edicoes:
+            return
+        # desligando com alterações pendentes: salvar, descartar ou continuar no modo lote
+        r = messagebox.askyesnocancel("Edição em lote", "Salvar as alterações pendentes antes de sair da edição em lote?")
+        if r is None:
+            self.edicao_lote.select()
+        elif r:
+            if not self.on_salvar_edicoes():
+                self.edicao_lote.select()
+        else:
+            self.on_descartar_edicoes()
+
+    def on_descartar_edicoes(self):
+        self._edicoes.clear()
+        self._mostrar_edicoes()
+        self._render_grid()
+        if 0 <= self.current_index < self.fonte.total:
+            self.on_tree_select(None)
+
+    def on_salvar_edicoes(self, sobrescrever=False):
+        edicoes = [(id_, col, original, novo) for id_, celulas in self._edicoes.items()
+                   for col, (original, novo) in celulas.items()]
+        if not edicoes:
+            return True
+        try:
+            linhas, conflitos = salvar_edicoes(edicoes, sobrescrever=sobrescrever)
+        except Exception as e:
+            messagebox.showerror("Edição em lote", f"Falha ao salvar:\n{e}")
+            return False
+        if conflitos and not sobrescrever:
+            texto = "\n".join(f"id {id_}: excluído" if col is None else f"id {id_}, {col}: {original!r} → agora {atual!r}"
+                              for id_, col, original, atual in conflitos[:CONFLITOS_LISTADOS])
+            if len(conflitos) > CONFLITOS_LISTADOS:
+                texto += f"\n... e mais {len(conflitos) - CONFLITOS_LISTADOS}"
+            r = messagebox.askyesnocancel(
+                "Edição em lote",
+                f"{len(conflitos)} alteração(ões) em registros que mudaram no banco depois de editados:\n\n{texto}\n\n"
+                "Sim: gravar por cima\nNão: descartar essas e gravar as demais\nCancelar: continuar editando")
+            if r is None:
+                return False
+            if not r:
+                for id_, col, _, _ in conflitos:
+                    celulas = self._edicoes.get(id_, {})
+                    if col is None:
+                        celulas.clear()
+                    else:
+                        celulas.pop(col, None)
+                    if not celulas:
+                        self._edicoes.pop(id_, None)
+            return self.on_salvar_edicoes(sobrescrever=r)
+        cascata = any(col in EMPRESA_COLUMNS for _, col, _, _ in edicoes)
+        self._edicoes.clear()
+        self._mostrar_edicoes()
+        if cascata:  # dados da empresa mudaram: outras linhas também
+            self.reload_records(self.fonte.filtro)
+        else:
+            for row in linhas:
+                self._grid_aplicar(*self.fonte.aplicar_atualizacao(row), row=row)
+            self._render_grid()  # tira o destaque das linhas salvas fora do cache
+        messagebox.showinfo("Edição em lote", f"{len(edicoes)} alteração(ões) gravada(s) em {len(linhas)} registro(s).")
+        return True
+
     # navigation
     def on_first(self): 
-        if not self.records_cache:
+        if not self.fonte.total:
             return
         self.current_index = 0
         self._select_index(self.current_index)
@@ -688,19 +946,25 @@ class App(ctk.CTk):
             self._select_index(self.current_index)
 
     def on_next(self):
-        if self.current_index < len(self.records_cache) - 1:
+        if self.current_index < self.fonte.total - 1:
             self.current_index += 1
             self._select_index(self.current_index)
 
     def on_last(self):
-        if self.records_cache:
-            self.current_index = len(self.records_cache) - 1
+        if self.fonte.total:
+            self.current_index = self.fonte.total - 1
             self._select_index(self.current_index)
 
     def _select_index(self, idx):
-        if idx < 0 or idx >= len(self.records_cache):
+        if idx < 0 or idx >= self.fonte.total:
             return
-        rid = self.tree.get_children()[idx]
+        self.current_index = idx
+        n = self._linhas_visiveis()
+        if not (self.grid_offset <= idx < self.grid_offset + min(n, self._grid_itens)):
+            # traz o registro para dentro da janela visível; dentro dela, só move a seleção
+            self.grid_offset = idx if idx < self.grid_offset else idx - n + 1
+            self._render_grid()
+        rid = f"r{idx - self.grid_offset}"
         self.tree.selection_set(rid)
         self.tree.focus(rid)
         self.tree.see(rid)
@@ -708,64 +972,192 @@ class App(ctk.CTk):
 
     # -----------------------
     # Import / Export / Backup / Restore / Attach
+    def _avisar_cpf_duplicados(self):
+        # banco com CPFs repetidos: a migração não apaga nada, o usuário decide
+        if core.CPF_UNICO:
+            return
+        def removidos(t):
+            self.reload_records(self.search_var.get())
+            (messagebox.showinfo if t.ok else messagebox.showerror)("CPF repetido", t.msg)
+        def concluir(t):
+            if t.erro:
+                messagebox.showerror("CPF repetido", t.msg)
+            elif not t.ok and messagebox.askyesno("CPF repetido", f"{t.msg}\n\nRemover agora os registros repetidos?"):
+                self._executar_tarefa("Remoção de CPFs repetidos", lambda t: verificar_cpf_duplicados(corrigir=True),
+                                      removidos, exclusiva=True, cancelavel=False)
+        self._executar_tarefa("Verificação de CPFs", lambda t: verificar_cpf_duplicados(), concluir, cancelavel=False)
+
     def on_import(self):
         path = filedialog.askopenfilename(title="Importar (Excel ou CSV)", filetypes=[("Excel/CSV", "*.xlsx;*.xls;*.csv")])
         if not path:
             return
-        try:
-            if path.lower().endswith((".xls", ".xlsx")):
-                if pd is None:
-                    messagebox.showerror("Erro", "pandas não instalado. Instale pandas e openpyxl para importar Excel.")
-                    return
-                ok, msg = import_excel(path)
-            else:
-                ok, msg = import_csv(path)
-            if ok:
-                messagebox.showinfo("Importar", msg)
+        if path.lower().endswith((".xls", ".xlsx")):
+            if core._carregar_pandas() is None and not path.lower().endswith(".xlsx"):
+                messagebox.showerror("Erro", "pandas não instalado. Instale pandas e openpyxl para importar Excel.")
+                return
+            importar = import_excel
+        else:
+            importar = import_csv
+        por_cpf = messagebox.askyesnocancel(
+            "Importar", "Atualizar pelo CPF os colaboradores já cadastrados?\n\n"
+            "Sim: CPF já cadastrado atualiza o registro, CPF novo é incluído\n"
+            "Não: todas as linhas são incluídas (CPF já cadastrado é rejeitado)")
+        if por_cpf is None:
+            return
+        def trabalho(t):
+            def progresso(linhas, taxa):
+                t.progresso(linhas, texto=f"{linhas} linhas ({taxa:,.0f}/s)")
+            return importar(path, progresso=progresso, cancelar=t.cancelamento, por_cpf=por_cpf)
+        def concluir(t):
+            if t.ok:
+                messagebox.showinfo("Importar", t.msg)
                 self.reload_records()
+            elif t.estado == CANCELADA:
+                messagebox.showinfo("Importar", t.msg)
             else:
-                messagebox.showerror("Importar", msg)
-        except Exception as e:
-            messagebox.showerror("Erro", f"Falha na importação:\n{e}")
+                messagebox.showerror("Importar", f"Falha na importação:\n{t.msg}")
+        self._executar_tarefa("Importação", trabalho, concluir, exclusiva=True)
 
     def on_export(self):
         path = filedialog.asksaveasfilename(title="Exportar (CSV/Excel)", defaultextension=".csv", filetypes=[("CSV", "*.csv"), ("Excel", "*.xlsx")])
         if not path:
             return
-        try:
-            if path.lower().endswith(".xlsx"):
-                ok, msg = export_excel(path)
-            else:
-                ok, msg = export_csv(path)
-            if ok:
-                messagebox.showinfo("Exportar", msg)
-            else:
-                messagebox.showerror("Exportar", msg)
-        except Exception as e:
-            messagebox.showerror("Erro", f"Falha na exportação:\n{e}")
+        # exporta respeitando o filtro de busca atual (total já conhecido pela grade)
+        filtro = self.search_var.get()
+        total = self.fonte.total if filtro == self.fonte.filtro else None
+        exportar = export_excel if path.lower().endswith(".xlsx") else export_csv
+        def trabalho(t):
+            return exportar(path, filtro, progresso=lambda feitos, _: t.progresso(feitos, total),
+                            cancelar=t.cancelamento)
+        def concluir(t):
+            (messagebox.showinfo if t.ok or t.estado == CANCELADA else messagebox.showerror)("Exportar", t.msg)
+        self._executar_tarefa("Exportação", trabalho, concluir)
 
     def on_backup(self):
-        path = filedialog.asksaveasfilename(title="Salvar backup do DB", defaultextension=".db", initialfile=f"employees_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db")
+        path = filedialog.asksaveasfilename(
+            title="Salvar backup do DB", defaultextension=".db",
+            initialfile=f"employees_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db",
+            filetypes=[("DB", "*.db"), ("DB compactado", "*.gz")])
         if not path:
             return
-        try:
-            shutil.copy2(DB_PATH, path)
-            messagebox.showinfo("Backup", f"Backup salvo em:\n{path}")
-        except Exception as e:
-            messagebox.showerror("Erro", f"Falha no backup:\n{e}")
+        # cópia a quente em segundo plano; o app continua utilizável
+        def concluir(t):
+            (messagebox.showinfo if t.ok else messagebox.showerror)("Backup", t.msg)
+        self._executar_tarefa("Backup", lambda t: backup_db(path, progresso=t.progresso, verificar=True),
+                              concluir, cancelavel=False)
 
     def on_restore(self):
-        path = filedialog.askopenfilename(title="Selecionar backup para restaurar", filetypes=[("DB", "*.db")])
+        path = filedialog.askopenfilename(title="Selecionar backup para restaurar",
+                                          filetypes=[("DB", "*.db"), ("DB compactado", "*.gz")])
         if not path:
             return
+        incrementais = ()
+        if messagebox.askyesno("Restaurar", "Aplicar backups incrementais sobre este backup completo?"):
+            incrementais = filedialog.askopenfilenames(title="Selecionar backups incrementais",
+                                                       filetypes=[("Incremental", "*.jsonl.gz")])
         if not messagebox.askyesno("Restaurar", "Restaurar sobrescreverá o banco atual. Continuar?"):
             return
-        try:
-            shutil.copy2(path, DB_PATH)
-            messagebox.showinfo("Restaurar", "Backup restaurado. Reinicie o aplicativo.")
-            # optional: reload
-        except Exception as e:
-            messagebox.showerror("Erro", f"Falha ao restaurar:\n{e}")
+        def concluir(t):
+            if t.ok:
+                # banco trocado na mesma conexão: basta recarregar a grade
+                self.reload_records(self.search_var.get())
+                messagebox.showinfo("Restaurar", t.msg)
+                self._avisar_cpf_duplicados()
+            else:
+                messagebox.showerror("Restaurar", t.msg)
+        if incrementais:
+            trabalho = lambda t: restaurar_incremental(path, incrementais, progresso=t.progresso)
+        else:
+            trabalho = lambda t: restaurar_db(path, progresso=t.progresso)
+        # exclusiva: espera importações/exportações em andamento e bloqueia as seguintes
+        self._executar_tarefa("Restauração", trabalho, concluir, exclusiva=True, cancelavel=False)
+
+    def on_backup_incremental(self):
+        path = filedialog.asksaveasfilename(
+            title="Salvar backup incremental", defaultextension=".gz",
+            initialfile=f"employees_incremental_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl.gz",
+            filetypes=[("Incremental", "*.jsonl.gz")])
+        if not path:
+            return
+        def concluir(t):
+            (messagebox.showinfo if t.ok else messagebox.showerror)("Backup incremental", t.msg)
+        # exclusiva: marca o ponto do diário de alterações a partir do qual o próximo continua
+        self._executar_tarefa("Backup incremental", lambda t: backup_incremental(path, progresso=t.progresso),
+                              concluir, exclusiva=True, cancelavel=False)
+
+    # -----------------------
+    # Tarefas em segundo plano (gestao_rh_tarefas): a fila do Agendador serializa as que
+    # conflitam; aqui só se acompanha o progresso por polling e se chama concluir(tarefa)
+    # na thread do Tk quando cada uma termina
+    def _executar_tarefa(self, rotulo, fn, concluir, exclusiva=False, cancelavel=True):
+        tarefa = self.agendador.enviar(rotulo, fn, exclusiva=exclusiva, cancelavel=cancelavel)
+        self._tarefas[tarefa] = concluir
+        self._mostrar_tarefas()
+        if self._tarefas_after is None:
+            self._tarefas_after = self.after(TAREFAS_POLL_MS, self._acompanhar_tarefas)
+        return tarefa
+
+    def _acompanhar_tarefas(self):
+        self._tarefas_after = None
+        terminadas = [(t, self._tarefas.pop(t)) for t in list(self._tarefas) if t.terminada]
+        self._mostrar_tarefas()
+        # reagenda antes dos concluir(): as caixas de mensagem são modais
+        if self._tarefas:
+            self._tarefas_after = self.after(TAREFAS_POLL_MS, self._acompanhar_tarefas)
+        for tarefa, concluir in terminadas:
+            concluir(tarefa)
+
+    def _mostrar_tarefas(self):
+        ativas = [t for t in self.agendador.tarefas() if t in self._tarefas]
+        if not ativas:
+            self.tarefa_label.configure(text="")
+            self.tarefa_barra.stop()
+            self.tarefa_barra.configure(mode="determinate")
+            self.tarefa_barra.pack_forget()
+            self.btn_cancelar_tarefa.pack_forget()
+            return
+        atual = ativas[0]
+        texto = atual.descricao()
+        if len(ativas) > 1:
+            texto += f"  (+{len(ativas) - 1}: {', '.join(t.rotulo for t in ativas[1:])})"
+        self.tarefa_label.configure(text=texto)
+        if not self.tarefa_barra.winfo_ismapped():
+            self.tarefa_barra.pack(side="right", padx=6, pady=6, before=self.tarefa_label)
+        fracao = atual.fracao
+        if fracao is None:
+            if self.tarefa_barra.cget("mode") != "indeterminate":
+                self.tarefa_barra.configure(mode="indeterminate")
+                self.tarefa_barra.start()
+        else:
+            if self.tarefa_barra.cget("mode") != "determinate":
+                self.tarefa_barra.stop()
+                self.tarefa_barra.configure(mode="determinate")
+            self.tarefa_barra.set(fracao)
+        if atual.cancelavel and not atual.cancelada:
+            if not self.btn_cancelar_tarefa.winfo_ismapped():
+                self.btn_cancelar_tarefa.pack(side="right", padx=6, pady=6)
+        else:
+            self.btn_cancelar_tarefa.pack_forget()
+
+    def on_cancelar_tarefa(self):
+        ativas = [t for t in self.agendador.tarefas() if t in self._tarefas]
+        if ativas:
+            self.agendador.cancelar(ativas[0])
+            self._mostrar_tarefas()
+
+    # -----------------------
+    # Recalcula o salário líquido (filtro atual ou todos) em segundo plano
+    def on_recalcular_folha(self):
+        filtro = self.fonte.filtro
+        alvo = "dos registros filtrados" if filtro else "de todos os colaboradores"
+        if not messagebox.askyesno("Folha", f"Recalcular o salário líquido {alvo}?"):
+            return
+        def concluir(t):
+            if t.ok:
+                self.reload_records(filtro)
+            (messagebox.showinfo if t.ok else messagebox.showerror)("Folha", t.msg)
+        self._executar_tarefa("Folha", lambda t: recalcular_folha(filtro, progresso=t.progresso), concluir,
+                              exclusiva=True, cancelavel=False)
 
     # -----------------------
     # Gerar contracheque para registro selecionado
@@ -774,12 +1166,52 @@ class App(ctk.CTk):
         if not sel:
             messagebox.showwarning("Aviso", "Selecione um registro para gerar o contracheque.")
             return
-        vals = self.tree.item(sel[0], "values")
+        # valores gravados (cache do paginador), não os textos da grade: na edição em lote
+        # a Treeview mostra alterações ainda não salvas
         try:
-            out = gerar_contracheque_pdf(vals)
-            messagebox.showinfo("OK", f"Contracheque gerado:\n{out}")
-        except Exception as e:
-            messagebox.showerror("Erro", f"Falha ao gerar o PDF:\n{e}\n\nVerifique se reportlab está instalado.")
+            self.current_index = self.grid_offset + int(sel[0][1:])
+        except Exception:
+            return
+        vals = self.fonte.linha(self.current_index)
+        if vals is None:
+            return
+        if vals[0] in self._edicoes and not messagebox.askyesno(
+                "Contracheque", "Este registro tem alterações não salvas, que não entram no contracheque.\n\n"
+                "Gerar com os valores gravados?"):
+            return
+        def concluir(t):
+            if t.ok:
+                messagebox.showinfo("OK", f"Contracheque gerado:\n{t.msg}")
+            else:
+                messagebox.showerror("Erro", f"Falha ao gerar o PDF:\n{t.msg}\n\nVerifique se reportlab está instalado.")
+        self._executar_tarefa("Contracheque", lambda t: (True, gerar_contracheque_pdf(vals)), concluir,
+                              cancelavel=False)
+
+    # -----------------------
+    # Contracheques em lote (filtro atual ou todos), em segundo plano e cancelável
+    def on_gerar_lote(self):
+        if self._lote_tarefa is not None:
+            # já está na fila ou rodando: o botão funciona como "Cancelar"
+            self.agendador.cancelar(self._lote_tarefa)
+            return
+        combinado = messagebox.askyesnocancel(
+            "Contracheques em lote",
+            "Gerar um único PDF com todos os contracheques?\n\nSim: arquivo único\nNão: um arquivo por colaborador")
+        if combinado is None:
+            return
+        filtro = self.fonte.filtro
+        def trabalho(t):
+            return gerar_contracheques_lote(filtro, combinado=combinado, cancelar=t.cancelamento,
+                                            progresso=t.progresso)
+        def concluir(t):
+            self._lote_tarefa = None
+            self.btn_lote.configure(text="Contracheques (lote)")
+            if t.ok:
+                messagebox.showinfo("Contracheques", t.msg)
+            else:
+                messagebox.showwarning("Contracheques", t.msg)
+        self._lote_tarefa = self._executar_tarefa("Contracheques", trabalho, concluir)
+        self.btn_lote.configure(text="Cancelar lote")
 
     # -----------------------
     # Menu
@@ -790,20 +1222,54 @@ class App(ctk.CTk):
         ctk.CTkButton(menubar, text="Importar", width=120, command=self.on_import).pack(side="left", padx=6, pady=6)
         ctk.CTkButton(menubar, text="Exportar", width=120, command=self.on_export).pack(side="left", padx=6, pady=6)
         ctk.CTkButton(menubar, text="Backup", width=120, command=self.on_backup).pack(side="left", padx=6, pady=6)
+        ctk.CTkButton(menubar, text="Backup incremental", width=140, command=self.on_backup_incremental).pack(side="left", padx=6, pady=6)
         ctk.CTkButton(menubar, text="Restaurar", width=120, command=self.on_restore).pack(side="left", padx=6, pady=6)
+        # tarefas em segundo plano: a mais antiga em andamento (+ as demais na fila)
+        self.btn_cancelar_tarefa = ctk.CTkButton(menubar, text="Cancelar", width=90, command=self.on_cancelar_tarefa)
+        self.tarefa_label = ctk.CTkLabel(menubar, text="")
+        self.tarefa_label.pack(side="right", padx=6, pady=6)
+        self.tarefa_barra = ctk.CTkProgressBar(menubar, width=180)
 
     # -----------------------
     def on_close(self):
-        # aqui poderia fechar conexões, etc.
-        if messagebox.askokcancel("Sair", "Deseja sair do sistema?"):
-            self.destroy()
+        pendentes = self.agendador.tarefas()
+        # restauração, folha etc. não param no meio: sair só depois que terminarem
+        presas = [t.rotulo for t in pendentes if t.estado == RODANDO and not t.cancelavel]
+        if presas:
+            messagebox.showwarning("Sair", f"Aguarde o término de: {', '.join(presas)}.\n"
+                                           "Essas tarefas não podem ser interrompidas.")
+            return
+        avisos = []
+        if pendentes:
+            avisos.append(f"Em andamento: {', '.join(t.rotulo for t in pendentes)}.\nSair cancela essas tarefas.")
+        if self._edicoes:
+            avisos.append(f"{sum(len(c) for c in self._edicoes.values())} alteração(ões) da edição em lote "
+                          "não foram salvas e serão perdidas.")
+        pergunta = "\n\n".join(avisos + ["Deseja sair mesmo assim?"]) if avisos else "Deseja sair do sistema?"
+        if not messagebox.askokcancel("Sair", pergunta):
+            return
+        # cancela e espera: a conexão só fecha depois que cada tarefa desfez o que gravava
+        for tarefa in pendentes:
+            self.agendador.cancelar(tarefa)
+        self.agendador.aguardar()
+        self.destroy()
+        fechar_conexao()
+
+# handlers da tela e redesenho da grade entram no relatório de diagnóstico (tipo "ui")
+diag.instrumentar_metodos(App, "ui", extras=("_render_grid", "_exibir_fonte", "reload_records", "atualizar_painel"))
 
 # -----------------------
 # Exec
 def main():
+    _marcar_fase("imports")
     inicializar_sistema()
+    _marcar_fase("inicializar_sistema")
     app = App()
+    _marcar_fase("widgets (App)")
     app.mainloop()
 
 if __name__ == "__main__":
+    # necessário para o ProcessPoolExecutor no executável congelado (PyInstaller)
+    import multiprocessing
+    multiprocessing.freeze_support()
     main()